@@ -0,0 +1,124 @@
+"""
+Time the validation and Arrow conversion of parquetize snapshots, with jsonschema.validate
+and Table.from_pylist on every snapshot as before, and with CompiledSchema.
+
+Snapshots are synthetic STIB vehicle distances (one hour at 20 s, 600 items each, 36
+invalid snapshots), with the schema of stib_vehicle_distance and lineId as strings,
+integers or both.
+
+Run from the repository root: python -m benchmarks.json_schema
+"""
+
+import argparse
+import random
+import time
+
+import jsonschema
+import pyarrow as pa
+
+from src.utilities.json_schema import CompiledSchema
+
+_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "directionId": {"type": "string"},
+            "distanceFromPoint": {"type": "integer"},
+            "pointId": {"type": "string"},
+        },
+    },
+}
+
+
+def _snapshots(count: int, items: int, line_ids: str, invalid: int):
+    random.seed(0)
+    invalid_indexes = set(random.sample(range(count), invalid))
+    snapshots = []
+
+    for index in range(count):
+        snapshot = []
+
+        for item in range(items):
+            line_id = 1 + item % 80
+
+            if line_ids == "strings" or (line_ids == "mixed" and item % 2):
+                line_id = str(line_id)
+
+            snapshot.append(
+                {
+                    "lineId": line_id,
+                    "directionId": str(8000 + item % 40),
+                    "distanceFromPoint": random.randint(0, 2000),
+                    "pointId": str(5000 + item),
+                }
+            )
+
+        if index in invalid_indexes:
+            snapshot[0]["distanceFromPoint"] = "far"
+
+        snapshots.append(snapshot)
+
+    return snapshots
+
+
+def _before(snapshots) -> int:
+    rows = 0
+
+    for snapshot in snapshots:
+        try:
+            jsonschema.validate(snapshot, _SCHEMA)
+        except jsonschema.ValidationError:
+            continue
+
+        rows += pa.Table.from_pylist(
+            [{**item, "lineId": str(item["lineId"])} for item in snapshot]
+        ).num_rows
+
+    return rows
+
+
+def _after(snapshots) -> int:
+    compiled_schema = CompiledSchema(_SCHEMA)
+    rows = 0
+
+    for snapshot in snapshots:
+        try:
+            batch = compiled_schema.validate(snapshot)
+        except jsonschema.ValidationError:
+            continue
+
+        if batch is None:
+            batch = pa.RecordBatch.from_pylist(
+                [{**item, "lineId": str(item["lineId"])} for item in snapshot]
+            )
+
+        rows += batch.num_rows
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshots", type=int, default=180)
+    parser.add_argument("--items", type=int, default=600)
+    parser.add_argument("--invalid", type=int, default=36)
+    args = parser.parse_args()
+
+    for line_ids in ("strings", "integers", "mixed"):
+        snapshots = _snapshots(args.snapshots, args.items, line_ids, args.invalid)
+        timings = []
+
+        for function in (_before, _after):
+            started = time.perf_counter()
+            rows = function(snapshots)
+            timings.append((time.perf_counter() - started, rows))
+
+        (before, before_rows), (after, after_rows) = timings
+        assert before_rows == after_rows
+
+        print(f"lineId {line_ids}: {before:.2f} s -> {after:.2f} s, {after_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
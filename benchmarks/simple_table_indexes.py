@@ -0,0 +1,137 @@
+"""
+Time the retrieve functions on a synthetic simple table, with the index of previous
+versions and after sync_db_from_configuration migrated it to the current indexes.
+
+Rows are 20 s apart, 5% of them are empty and 20% are copies of the previous row. With
+--empty-tail, the latest rows are all empty, as the None results of a harvester.
+
+Run from the repository root on a scratch database, which is overwritten:
+DATABASE_URL=sqlite:////tmp/indexes.db python -m benchmarks.simple_table_indexes
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, text
+
+from src.data.engine import engine
+from src.data.retrieve import (
+    retrieve_after_datetime,
+    retrieve_between_datetime,
+    retrieve_fingerprint_between_datetime,
+    retrieve_latest_row,
+)
+from src.data.sync_db import _sync_indexes
+from src.data.table import (
+    load_simple_table_from_configuration,
+    obsolete_simple_table_indexes,
+)
+
+_START = datetime(2020, 1, 1)
+_STEP = timedelta(seconds=20)
+_CHUNK_SIZE = 100_000
+
+
+def _fill(table, rows: int, empty_tail: int):
+    random.seed(0)
+
+    with engine.begin() as connection:
+        for chunk_start in range(0, rows, _CHUNK_SIZE):
+            chunk = []
+
+            for index in range(chunk_start, min(chunk_start + _CHUNK_SIZE, rows)):
+                draw = random.random()
+                row = {
+                    "id": index + 1,
+                    "date": _START + index * _STEP,
+                    "data": None,
+                    "type": "json",
+                    "hash": None,
+                    "copy_id": None,
+                }
+
+                if index >= rows - empty_tail or draw < 0.05:
+                    pass
+                elif draw < 0.25 and index > 0:
+                    row["copy_id"] = index
+                else:
+                    row["data"] = f"{table.name}/{index}"
+                    row["hash"] = f"{index:032x}"
+
+                chunk.append(row)
+
+            connection.execute(table.insert(), chunk)
+
+
+def _median_ms(function, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings) * 1000
+
+
+def _queries(table, rows: int):
+    middle = _START + rows // 2 * _STEP
+
+    return {
+        "retrieve_latest_row": lambda: retrieve_latest_row(table),
+        "retrieve_between_datetime (1 h)": lambda: retrieve_between_datetime(
+            table, middle, middle + timedelta(hours=1), 1000
+        ),
+        "retrieve_fingerprint (1 h)": lambda: retrieve_fingerprint_between_datetime(
+            table, middle, middle + timedelta(hours=1)
+        ),
+        "retrieve_after_datetime (1)": lambda: retrieve_after_datetime(
+            table, middle, 1
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--empty-tail", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    metadata = MetaData()
+    table = load_simple_table_from_configuration("benchmark_indexes", metadata)
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+
+    # Start from the layout of previous versions: a plain date index only
+    with engine.begin() as connection:
+        for index in table.indexes:
+            connection.execute(text(f'DROP INDEX "{index.name}"'))
+
+        for name in obsolete_simple_table_indexes(table.name):
+            connection.execute(text(f'CREATE INDEX "{name}" ON "{table.name}" (date)'))
+
+    started = time.perf_counter()
+    _fill(table, args.rows, args.empty_tail)
+    print(f"Filled {args.rows} rows in {time.perf_counter() - started:.0f} s")
+
+    queries = _queries(table, args.rows)
+    before = {name: _median_ms(query, args.repeat) for name, query in queries.items()}
+
+    started = time.perf_counter()
+    _sync_indexes(metadata)
+    print(f"Migrated the indexes in {time.perf_counter() - started:.0f} s")
+
+    after = {name: _median_ms(query, args.repeat) for name, query in queries.items()}
+
+    for name in queries:
+        print(f"  {name:<40}{before[name]:>8.1f} ms ->{after[name]:>8.1f} ms")
+
+    table.drop(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Time STIBStopsCollector.unofficial_fetch_stops_by_line against a local fixture server
+answering every line page after a fixed latency, cold and when every page is answered
+with a 304.
+
+Run from the repository root: python -m benchmarks.stib_stops
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from components.stib.collectors import stops
+
+
+def _page() -> bytes:
+    items = "".join(
+        f'<li class="thermometer__stop" id="{5000 + index}F">Stop {index}</li>'
+        for index in range(20)
+    )
+    return f"<html><body><ul>{items}</ul></body></html>".encode("utf8")
+
+
+def _fixture_handler(latency: float):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+
+            body = _page()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return FixtureHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--workers", type=int, default=stops.STOPS_FETCH_WORKERS)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _fixture_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = (
+        f"http://127.0.0.1:{server.server_address[1]}/"
+        "?_line={line}&_directioncode={direction}"
+    )
+
+    try:
+        for label in ("cold", "304"):
+            started = time.perf_counter()
+            data = stops.STIBStopsCollector.unofficial_fetch_stops_by_line(
+                url, max_workers=args.workers
+            )
+            print(
+                f"{label}: {time.perf_counter() - started:.2f} s, {len(data)} stops, "
+                f"{args.workers} workers"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,15 @@
 import os
 
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class DeLijnGTFSRealtimeCollector(Collector):
-    def run(self):
+class DeLijnGTFSRealtimeCollector(AsyncCollector):
+    async def run(self):
         endpoint = (
             "https://api.delijn.be/gtfs/v2/realtime?json=false&delay=true&canceled=true"
         )
-        response_data = requests.get(
+        response = await self.client.get(
             endpoint, headers={"Ocp-Apim-Subscription-Key": os.environ["DE_LIJN_API_KEY"]}
-        ).content
+        )
 
-        return response_data
+        return response.content
@@ -0,0 +1,80 @@
+from typing import Dict, List, Optional
+
+from src.components import Handler
+from src.data.history import fingerprint_history, query_history
+from src.utilities.mf_json import utc_time_window
+
+
+class ParquetHistoryHandler(Handler):
+    """
+    Rows parquetized by a component in a time window, as an Arrow table.
+
+    filters are comma-separated "column=value" pairs, values of the same column are
+    alternatives: "lineId=1,lineId=5,direction=City". columns are comma-separated.
+    """
+
+    def run(
+        self,
+        component: str,
+        start_timestamp: int = None,
+        end_timestamp: int = None,
+        columns: str = None,
+        filters: str = None,
+    ):
+        parquet_table = self._parquet_table(component)
+
+        if parquet_table is None:
+            return
+
+        return query_history(
+            parquet_table,
+            *utc_time_window(start_timestamp, end_timestamp),
+            _parse_filters(filters),
+            _parse_columns(columns),
+        )
+
+    def fingerprint(
+        self,
+        component: str,
+        start_timestamp: int = None,
+        end_timestamp: int = None,
+        columns: str = None,
+        filters: str = None,
+    ):
+        parquet_table = self._parquet_table(component)
+
+        if parquet_table is None:
+            return None
+
+        return fingerprint_history(
+            parquet_table,
+            *utc_time_window(start_timestamp, end_timestamp),
+            _parse_filters(filters),
+        )
+
+    def _parquet_table(self, component: str):
+        try:
+            return self.get_table_by_name(f"{component}_parquetize")
+        except KeyError:
+            return None
+
+
+def _parse_filters(filters: Optional[str]) -> Dict[str, List[str]]:
+    parsed = {}
+
+    for pair in (filters or "").split(","):
+        if "=" not in pair:
+            continue
+
+        name, value = pair.split("=", 1)
+        parsed.setdefault(name.strip(), []).append(value.strip())
+
+    return parsed
+
+
+def _parse_columns(columns: Optional[str]) -> Optional[List[str]]:
+    columns = [
+        column.strip() for column in (columns or "").split(",") if column.strip()
+    ]
+
+    return columns or None
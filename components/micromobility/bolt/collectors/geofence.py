@@ -1,10 +1,8 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class BoltGeofenceCollector(Collector):
-    def run(self):
+class BoltGeofenceCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://mds.bolt.eu/gbfs/2/336/geofencing_zones"
-        response_json = requests.get(endpoint).json()
+        response_json = await self.client.get_json(endpoint)
         return response_json["data"]["geofencing_zones"]
@@ -2,16 +2,15 @@ import json
 
 import geopandas as gpd
 import pandas as pd
-import requests
 import shapely
 
-from src.components import Collector
+from src.components import AsyncCollector
 
 
-class DottVehiclePositionCollector(Collector):
-    def run(self):
+class DottVehiclePositionCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://gbfs.api.ridedott.com/public/v2/brussels/free_bike_status.json"
-        response_json = requests.get(endpoint).json()
+        response_json = await self.client.get_json(endpoint)
         response_df = pd.json_normalize(response_json["data"]["bikes"])
         response_gdf = gpd.GeoDataFrame(
             response_df,
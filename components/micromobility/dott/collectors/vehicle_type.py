@@ -1,10 +1,8 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class DottVehicleTypeCollector(Collector):
-    def run(self):
+class DottVehicleTypeCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://gbfs.api.ridedott.com/public/v2/brussels/vehicle_types.json"
-        response_json = requests.get(endpoint).json()
+        response_json = await self.client.get_json(endpoint)
         return response_json
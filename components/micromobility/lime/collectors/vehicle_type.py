@@ -1,10 +1,8 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class LimeVehicleTypeCollector(Collector):
-    def run(self):
+class LimeVehicleTypeCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://data.lime.bike/api/partners/v2/gbfs/brussels/vehicle_types"
-        response_json = requests.get(endpoint).json()
+        response_json = await self.client.get_json(endpoint)
         return response_json
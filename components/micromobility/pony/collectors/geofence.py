@@ -1,10 +1,8 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class PonyGeofenceCollector(Collector):
-    def run(self):
+class PonyGeofenceCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://gbfs.getapony.com/v1/Brussels/en/geofencing_zones.json"
-        response_json = requests.get(endpoint).json()
+        response_json = await self.client.get_json(endpoint)
         return response_json["data"]["geofencing_zones"]
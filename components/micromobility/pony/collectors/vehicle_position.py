@@ -1,18 +1,17 @@
 import json
+from json import JSONDecodeError
 
 import geopandas as gpd
 import pandas as pd
-import requests
 import shapely
-from requests import JSONDecodeError
 
-from src.components import Collector
+from src.components import AsyncCollector
 
 
-class PonyVehiclePositionCollector(Collector):
-    def run(self):
+class PonyVehiclePositionCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://gbfs.getapony.com/v1/Brussels/en/free_bike_status.json"
-        response = requests.get(endpoint)
+        response = await self.client.get(endpoint)
         try:
             response_json = response.json()
             response_df = pd.json_normalize(response_json["data"]["bikes"])
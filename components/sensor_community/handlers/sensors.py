@@ -1,6 +1,6 @@
 from src.components import Handler
 
-from src.utilities.geo_json import fetch_geojson_simple
+from src.utilities.geo_json import fetch_geojson_simple, fingerprint_geojson_simple
 
 
 class SensorCommunityHandler(Handler):
@@ -10,3 +10,10 @@ class SensorCommunityHandler(Handler):
             start_timestamp,
             end_timestamp,
         )
+
+    def fingerprint(self, start_timestamp: int = None, end_timestamp: int = None):
+        return fingerprint_geojson_simple(
+            self.get_table_by_name("sensor_community_sensors"),
+            start_timestamp,
+            end_timestamp,
+        )
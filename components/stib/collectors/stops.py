@@ -1,15 +1,74 @@
 import json
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain, product
+from typing import Dict, List, Tuple
 
 import geopandas as gpd
+import lxml.html
 import pandas as pd
-import requests
 import shapely
-from bs4 import BeautifulSoup
 
+from components.stib.utils.constant import STIB_LINE_STOPS_URL
 from components.stib.utils.converter import convert_dataframe_column_stop_to_generic
 from src.components import Collector
+from src.utilities.http import http_session
+
+# Number of line pages fetched at the same time
+STOPS_FETCH_WORKERS = 8
+
+
+# Page URL to (ETag, Last-Modified, parsed stops), kept between runs so that unchanged
+# pages are answered with a 304 and not parsed again
+_line_pages: Dict[str, Tuple[str, str, List[Dict]]] = {}
+
+
+def _parse_line_page(content: bytes) -> List[Dict]:
+    if not content.strip():
+        return []
+
+    document = lxml.html.fromstring(content)
+
+    return [
+        {
+            "stop_id": li.get("id"),
+            "stop_name": li.text_content().replace("\n", "").strip(),
+        }
+        for li in document.xpath(
+            "//li[contains(concat(' ', normalize-space(@class), ' '), ' thermometer__stop ')]"
+        )
+    ]
+
+
+def _fetch_line_page(url: str) -> List[Dict]:
+    """
+    Fetch and parse the stops of a line page, using a conditional request when the
+    page has already been fetched.
+    """
+    headers = {}
+    cached = _line_pages.get(url)
+
+    if cached is not None:
+        etag, last_modified, stops = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    response = http_session().get(url, headers=headers)
+
+    if response.status_code == 304 and cached is not None:
+        return cached[2]
+
+    stops = _parse_line_page(response.content)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+
+    if response.ok and (etag or last_modified):
+        _line_pages[url] = (etag, last_modified, stops)
+
+    return stops
 
 
 class STIBStopsCollector(Collector):
@@ -60,9 +119,12 @@ class STIBStopsCollector(Collector):
         return merged
 
     @staticmethod
-    def unofficial_fetch_stops_by_line():
+    def unofficial_fetch_stops_by_line(
+        url: str = STIB_LINE_STOPS_URL, max_workers: int = STOPS_FETCH_WORKERS
+    ):
         """
         Fetches the stops by line from the unofficial STIB API (web scraping).
+        The line pages are fetched concurrently by a pool of max_workers threads.
         """
         stops_by_line = defaultdict(lambda: defaultdict(list))
 
@@ -82,27 +144,19 @@ class STIBStopsCollector(Collector):
             "N18",
         ]
 
-        for line, direction in product(chain(range(1, 100), noctis), direction_choice):
-            response = requests.get(
-                f"https://www.stib-mivb.be/irj/servlet/prt/portal/prtroot/pcd!3aportal_content!2fSTIBMIVB!2fWebsite!2fFrontend!2fPublic!2fiViews!2fcom.stib.HorairesServletService?l=fr&_line={line}&_directioncode={direction}&_mode=rt"
+        pages = list(product(chain(range(1, 100), noctis), direction_choice))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                _fetch_line_page,
+                [
+                    url.format(line=line, direction=direction)
+                    for line, direction in pages
+                ],
             )
 
-            # parse the HTML content of the response using Beautiful Soup
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # find all the li elements with class "thermometer__stop"
-            li_elements = soup.find_all("li", class_="thermometer__stop")
-
-            # extract the id and inner text of each li element
-            for li in li_elements:
-                stop_id = li.get("id")
-                stop_text = li.text.replace("\n", "").strip()
-                stops_by_line[line][direction].append(
-                    {
-                        "stop_id": stop_id,
-                        "stop_name": stop_text,
-                    }
-                )
+            for (line, direction), stops in zip(pages, results):
+                stops_by_line[line][direction].extend(stops)
 
         data = []
 
@@ -1,14 +1,26 @@
 from src.components import Handler
 
-from src.utilities.mf_json import fetch_geojsons_and_return_mf_json
+from src.utilities.trajectories import (
+    fetch_trajectories_and_return_mf_json,
+    fingerprint_trajectories,
+)
 
 
 class STIBTripsHandler(Handler):
     def run(self, start_timestamp: int = None, end_timestamp: int = None):
-        return fetch_geojsons_and_return_mf_json(
+        return fetch_trajectories_and_return_mf_json(
+            self.get_table_by_name("stib_trajectories"),
             self.get_table_by_name("stib_vehicle_identify"),
             "uuid",
             start_timestamp,
             end_timestamp,
             ["distance", "distanceFromPoint", "pointId"],
         )
+
+    def fingerprint(self, start_timestamp: int = None, end_timestamp: int = None):
+        return fingerprint_trajectories(
+            self.get_table_by_name("stib_trajectories"),
+            self.get_table_by_name("stib_vehicle_identify"),
+            start_timestamp,
+            end_timestamp,
+        )
@@ -0,0 +1,9 @@
+from src.components import Harvester
+from src.utilities.trajectories import build_trajectory_partition
+
+
+class STIBTrajectoriesHarvester(Harvester):
+    def run(self, sources):
+        return build_trajectory_partition(
+            sources, "uuid", ["distance", "distanceFromPoint", "pointId"]
+        )
@@ -3,6 +3,12 @@ STIB_OPEN_DATA_URL_DATASET = f"{STIB_OPEN_DATA_URL}/catalog/datasets"
 
 VEHICLE_POSITION_DATASET = "vehicle-position-rt-production"
 
+STIB_LINE_STOPS_URL = (
+    "https://www.stib-mivb.be/irj/servlet/prt/portal/prtroot/pcd!3aportal_content!2fSTIBMIVB!2fWebsite"
+    "!2fFrontend!2fPublic!2fiViews!2fcom.stib.HorairesServletService"
+    "?l=fr&_line={line}&_directioncode={direction}&_mode=rt"
+)
+
 METRO = [
     1,
     2,
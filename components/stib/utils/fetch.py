@@ -1,34 +1,64 @@
 import os
-from typing import Union
+from typing import Union, Iterator
 
 import requests
 
 from components.stib.utils.constant import STIB_OPEN_DATA_URL_DATASET
+from src.utilities.http import http_session
+
+# Maximum number of records per page allowed by the Opendatasoft API
+STIB_PAGE_SIZE = 100
 
 
 def fetch_stib_dataset_records(dataset: str, limit=100, offset=0) -> Union[dict, list]:
-    assert limit <= 100, "Limit must be less than 100"
+    assert limit <= STIB_PAGE_SIZE, "Limit must be less than 100"
+
+    return _records_from_page(_fetch_stib_dataset_page(dataset, limit, offset))
+
+
+def iter_stib_dataset_records(dataset: str) -> Iterator[dict]:
+    """
+    Iterate over all the records of a STIB dataset.
+    The records API refuses offsets past 10000 records and pages shift when the
+    dataset is updated between two requests, so the whole dataset is read from a
+    single export instead, which is a consistent snapshot without any size limit.
+    :param dataset: The dataset name
+    :return: An iterator over the fields of the records
+    """
+    url = f"{STIB_OPEN_DATA_URL_DATASET}/{dataset}/exports/json?timezone=UTC"
+
+    response = auth_request_to_stib(url)
 
+    if not response.ok:
+        raise ValueError(
+            f"Error while exporting STIB dataset {dataset}: {response.text}"
+        )
+
+    yield from response.json()
+
+
+def _fetch_stib_dataset_page(dataset: str, limit: int, offset: int) -> dict:
     url = f"{STIB_OPEN_DATA_URL_DATASET}/{dataset}/records?offset={offset}&limit={limit}&timezone=UTC"
 
     response = auth_request_to_stib(url)
 
     if response.ok:
-        records = []
-        for record in response.json()["records"]:
-            records.append(record["record"])
-        return records
+        return response.json()
 
     raise ValueError(
         f"Error while fetching STIB dataset {dataset} records: {response.text}"
     )
 
 
+def _records_from_page(page: dict) -> list:
+    return [record["record"] for record in page["records"]]
+
+
 def auth_request_to_stib(url: str, headers=None) -> requests.Response:
     if headers is None:
         headers = {}
 
-    response = requests.get(
+    response = http_session().get(
         url,
         headers={
             "Accept": "application/json",
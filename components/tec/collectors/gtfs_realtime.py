@@ -1,10 +1,10 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class TECGTFSRealtimeCollector(Collector):
-    def run(self):
+class TECGTFSRealtimeCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://gtfsrt.tectime.be/proto/RealTime/trips?key=DDEBFA42173D45C08E710C7E9DDE8BDE"
 
-        return requests.get(endpoint).content
+        response = await self.client.get(endpoint)
+
+        return response.content
@@ -1,13 +1,11 @@
 import os
 
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class TelraamTrafficCollector(Collector):
-    def run(self):
-        return requests.get(
+class TelraamTrafficCollector(AsyncCollector):
+    async def run(self):
+        return await self.client.get_json(
             "https://telraam-api.net/v1/reports/traffic_snapshot_live",
             headers={"X-Api-Key": os.environ["TELRAAM_API_KEY"]},
-        ).json()
+        )
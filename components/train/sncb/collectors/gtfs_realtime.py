@@ -1,15 +1,13 @@
-import requests
+from src.components import AsyncCollector
 
-from src.components import Collector
 
-
-class SNCBGTFSRealtimeCollector(Collector):
-    def run(self):
+class SNCBGTFSRealtimeCollector(AsyncCollector):
+    async def run(self):
         endpoint = "https://sncb-opendata.hafas.de/gtfs/realtime/c21ac6758dd25af84cca5b707f3cb3de"
 
-        response = requests.get(endpoint)
+        response = await self.client.get(endpoint)
 
-        if response.status_code >= 500:
+        if response.status >= 500:
             raise ValueError("SNCB gtfs realtime is down.")
 
         return response.content
@@ -1,12 +1,24 @@
 from src.components import Handler
-from src.utilities.mf_json import fetch_geojsons_and_return_mf_json
+from src.utilities.trajectories import (
+    fetch_trajectories_and_return_mf_json,
+    fingerprint_trajectories,
+)
 
 
 class SNCBTripsHandler(Handler):
     def run(self, start_timestamp: int = None, end_timestamp: int = None):
-        return fetch_geojsons_and_return_mf_json(
+        return fetch_trajectories_and_return_mf_json(
+            self.get_table_by_name("sncb_trajectories"),
             self.get_table_by_name("sncb_vehicle_position_geometry"),
             "trip_id",
             start_timestamp,
             end_timestamp,
         )
+
+    def fingerprint(self, start_timestamp: int = None, end_timestamp: int = None):
+        return fingerprint_trajectories(
+            self.get_table_by_name("sncb_trajectories"),
+            self.get_table_by_name("sncb_vehicle_position_geometry"),
+            start_timestamp,
+            end_timestamp,
+        )
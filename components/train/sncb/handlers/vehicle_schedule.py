@@ -2,7 +2,7 @@ from datetime import datetime
 
 from src.components import Handler
 from src.data.retrieve import retrieve_latest_rows_before_datetime
-from src.utilities.gtfs import schedule_from_gtfs, load_gtfs_kit_from_zip_string
+from src.utilities.gtfs import schedule_from_gtfs, load_gtfs_feed
 
 
 class SNCBVehicleScheduleHandler(Handler):
@@ -18,6 +18,4 @@ class SNCBVehicleScheduleHandler(Handler):
 
         gtfs = gtfs[0]
 
-        return schedule_from_gtfs(
-            load_gtfs_kit_from_zip_string(gtfs.data), start_timestamp, end_timestamp
-        )
+        return schedule_from_gtfs(load_gtfs_feed(gtfs), start_timestamp, end_timestamp)
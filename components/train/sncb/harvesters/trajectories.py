@@ -0,0 +1,7 @@
+from src.components import Harvester
+from src.utilities.trajectories import build_trajectory_partition
+
+
+class SNCBTrajectoriesHarvester(Harvester):
+    def run(self, sources):
+        return build_trajectory_partition(sources, "trip_id")
@@ -6,21 +6,21 @@ import pandas as pd
 from src.components import Harvester
 from src.utilities.gtfs import (
     load_gtfs_realtime_from_bytes_to_df,
-    load_gtfs_kit_from_zip_string,
+    load_gtfs_feed,
 )
 
 
 class _CachedStopTimes:
     stop_times = None
-    date = None
+    key = None
 
 
-def _cached_stop_times(gtfs_static: gpd.GeoDataFrame, date: str):
-    if _CachedStopTimes.stop_times is None or _CachedStopTimes.date != date:
+def _cached_stop_times(gtfs_static: gpd.GeoDataFrame, feed_key: str, date: str):
+    if _CachedStopTimes.stop_times is None or _CachedStopTimes.key != (feed_key, date):
         _CachedStopTimes.stop_times = gtfs_static.get_stop_times(date)[
             ["trip_id", "stop_id", "stop_sequence", "arrival_time", "departure_time"]
         ].copy()
-        _CachedStopTimes.date = date
+        _CachedStopTimes.key = (feed_key, date)
 
     return _CachedStopTimes.stop_times
 
@@ -33,12 +33,14 @@ class SNCBVehiclePositionGeometryHarvester(Harvester):
 
         segments = gpd.GeoDataFrame.from_features(infrabel_segments.data["features"])
 
-        gtfs_static = load_gtfs_kit_from_zip_string(sncb_gtfs.data)
+        gtfs_static = load_gtfs_feed(sncb_gtfs)
         gtfs_rt = load_gtfs_realtime_from_bytes_to_df(source.data)
 
         current_date = source.date.strftime("%Y%m%d")
 
-        stop_times = _cached_stop_times(gtfs_static, current_date)
+        stop_times = _cached_stop_times(
+            gtfs_static, sncb_gtfs.hash or sncb_gtfs._url, current_date
+        )
 
         stop_times["arrival_delay"] = 0
 
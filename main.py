@@ -6,11 +6,15 @@ from dotenv import load_dotenv
 from parser import parse_arguments, setup_logging
 
 if load_dotenv():
+    from src.components import AsyncCollector
     from src.configuration.load import (
         load_all_components,
     )
+    from src.data.bulk import import_snapshots
     from src.data.sync_db import sync_db_from_configuration
     from src.runners import (
+        run_async_collectors,
+        run_async_collectors_on_schedule,
         run_collector,
         run_collector_on_schedule,
         run_handlers,
@@ -47,7 +51,8 @@ def launch_harvesters(args, config, processes, tables):
 
 def launch_collectors(args, config, processes, tables):
     """
-    Launch collector processes.
+    Launch collector processes. Each collector runs in its own process, except the
+    async collectors which all share a single process and event loop.
 
     Parameters:
         args (argparse.Namespace): Parsed command-line arguments.
@@ -59,8 +64,14 @@ def launch_collectors(args, config, processes, tables):
         config.collectors.keys() if "all" in args.collectors else args.collectors
     )
 
+    async_collectors = []
+
     for name, collector_config in config.collectors.items():
         if name in collector_names_to_run:
+            if issubclass(collector_config.component, AsyncCollector):
+                async_collectors.append(collector_config)
+                continue
+
             process = Process(
                 target=run_collector if args.now else run_collector_on_schedule,
                 args=(collector_config, tables[name]),
@@ -69,6 +80,19 @@ def launch_collectors(args, config, processes, tables):
             process.start()
             processes.append(process)
 
+    if async_collectors:
+        process = Process(
+            target=(
+                run_async_collectors
+                if args.now
+                else run_async_collectors_on_schedule
+            ),
+            args=(async_collectors, tables),
+            kwargs={"fail_on_error": False},
+        )
+        process.start()
+        processes.append(process)
+
 
 def launch_handlers(args, config, processes, tables):
     """
@@ -95,7 +119,14 @@ def launch_handlers(args, config, processes, tables):
             raise ValueError("Cannot run handlers with --now flag.")
         handler_process = Process(
             target=run_handlers,
-            args=(handlers_to_run, tables, args.host, args.port, args.allowed_hosts),
+            args=(
+                handlers_to_run,
+                tables,
+                args.host,
+                args.port,
+                args.allowed_hosts,
+                args.handler_workers,
+            ),
         )
         handler_process.start()
         processes.append(handler_process)
@@ -119,7 +150,7 @@ def launch_parquetize(args, config, processes, tables):
         if name in parquetize_names_to_run:
             process = Process(
                 target=run_parquetize if args.now else run_parquetize_on_schedule,
-                args=(parquetize_config, tables),
+                args=(parquetize_config, tables, args.parquetize_workers),
             )
             process.start()
             processes.append(process)
@@ -131,6 +162,12 @@ def main():
     args = parse_arguments()
     setup_logging(args.log_level)
 
+    if args.import_snapshots:
+        name, directory = args.import_snapshots
+        component_config = config.collectors.get(name) or config.harvesters[name]
+        import_snapshots(component_config, tables[name], directory)
+        return
+
     processes = []
 
     # Launch handlers server
@@ -74,6 +74,21 @@ def parse_arguments():
         default=["localhost", "127.0.0.1"],
         help="Allowed hosts for the handlers server (default: localhost, 127.0.0.1).",
     )
+    parser.add_argument(
+        "--handler-workers",
+        type=int,
+        default=8,
+        help="Number of handlers the handlers server runs at the same time (default: 8).",
+    )
+    parser.add_argument(
+        "--import-snapshots",
+        nargs=2,
+        metavar=("COMPONENT", "DIRECTORY"),
+        help=(
+            "Import a directory of historic snapshots, named after their date "
+            "(%%Y-%%m-%%d_%%H-%%M-%%S), into the table of a collector or harvester and exit."
+        ),
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -87,5 +102,14 @@ def parse_arguments():
         default=[],
         help="List of harvester names to run.",
     )
+    parser.add_argument(
+        "--parquetize-workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of processes each parquetize process converts periods and key "
+            "partitions with (default: 1)."
+        ),
+    )
 
     return parser.parse_args()
@@ -1,7 +1,7 @@
 from typing import Union
 
-from .collector import Collector, CollectorClass
-from .handler import Handler, HandlerClass
+from .collector import Collector, AsyncCollector, CollectorClass
+from .handler import Handler, HandlerClass, HandlerRequestError
 from .harvester import Harvester, HarvesterClass
 
 ComponentClass = Union[CollectorClass, HandlerClass, HarvesterClass]
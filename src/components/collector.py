@@ -1,6 +1,8 @@
 import abc
 from typing import Type
 
+from src.utilities.http import AsyncHttpClient
+
 
 class Collector(abc.ABC):
     def __init__(self, **kwargs):
@@ -11,4 +13,19 @@ class Collector(abc.ABC):
         pass
 
 
+class AsyncCollector(Collector):
+    """
+    A collector whose run method is a coroutine. Async collectors fetch through the
+    HTTP client shared by the process, so that they can all run in the same event loop.
+    """
+
+    def __init__(self, client: AsyncHttpClient, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    @abc.abstractmethod
+    async def run(self):
+        pass
+
+
 CollectorClass = Type[Collector]
@@ -1,5 +1,5 @@
 import abc
-from typing import Type, Dict
+from typing import Type, Dict, Optional
 
 from sqlalchemy import Table
 
@@ -15,5 +15,27 @@ class Handler(abc.ABC):
     def run(self, **kwargs):
         pass
 
+    def fingerprint(self, **kwargs) -> Optional[str]:
+        """
+        Identify the data the handler builds its result from for the given parameters,
+        for instance from the ids of the rows it reads. Two calls returning the same
+        fingerprint must yield the same result. It is used to answer conditional requests
+        without running the handler, so it should be cheap to compute.
+        :return: The fingerprint, or None if the handler does not support it
+        """
+        return None
+
+
+class HandlerRequestError(Exception):
+    """
+    Raised by a handler when a request cannot be answered as asked, for instance when it
+    covers too much data. The request is answered with the status and the message of the
+    error instead of a 500.
+    """
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
 
 HandlerClass = Type[Handler]
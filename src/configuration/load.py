@@ -9,6 +9,9 @@ from src.configuration.model import (
     ComponentsConfiguration,
     ComponentConfiguration,
     ComponentParquetizeConfig, ComponentParquetizeGroupConfig,
+    ComponentCacheConfig,
+    ComponentPartitionConfig,
+    ComponentRetentionConfig,
 )
 
 logger = logging.getLogger("Load")
@@ -125,8 +128,43 @@ def extract_components(
                     ) for group in parquetize.get("GROUPS", [])
                 ],
                 schema=parquetize.get("SCHEMA", None),
+                compression=parquetize.get("COMPRESSION", "zstd"),
+                compression_level=parquetize.get("COMPRESSION_LEVEL", None),
+                row_group_size=parquetize.get("ROW_GROUP_SIZE", 128 * 1024),
             ) if parquetize is not None else None
 
+        cache = component.get("CACHE", None)
+        cache_config = (
+            ComponentCacheConfig(
+                ttl=cache["TTL"],
+                bucket=cache.get("BUCKET", None),
+            )
+            if cache is not None
+            else None
+        )
+
+        partition = component.get("PARTITION", None)
+        partition_config = (
+            ComponentPartitionConfig(
+                interval=partition["INTERVAL"],
+                premake=partition.get("PREMAKE", 3),
+                detach_parquetized=partition.get("DETACH_PARQUETIZED", False),
+            )
+            if partition is not None
+            else None
+        )
+
+        retention = component.get("RETENTION", None)
+        retention_config = (
+            ComponentRetentionConfig(
+                keep=retention["KEEP"],
+                mode=retention.get("MODE", "delete"),
+                batch=retention.get("BATCH", 1000),
+            )
+            if retention is not None
+            else None
+        )
+
         component_configuration = ComponentConfiguration(
             name=name,
             data_type=component["DATA_TYPE"],
@@ -144,6 +182,10 @@ def extract_components(
             source_range_strict=component.get("SOURCE_RANGE_STRICT", True),
             multiple_results=component.get("MULTIPLE_RESULTS", False),
             query_parameters=component.get("QUERY_PARAMETERS", None),
+            cache=cache_config,
+            write_behind=component.get("WRITE_BEHIND", False),
+            partition=partition_config,
+            retention=retention_config,
         )
 
         target_list[name] = component_configuration
@@ -15,6 +15,29 @@ class ComponentParquetizeConfig:
     batch: str
     groups: List[ComponentParquetizeGroupConfig]
     schema: Dict[str, Any]
+    compression: str = "zstd"
+    compression_level: Optional[int] = None
+    row_group_size: int = 128 * 1024
+
+
+@dataclass
+class ComponentCacheConfig:
+    ttl: str
+    bucket: Optional[str] = None
+
+
+@dataclass
+class ComponentPartitionConfig:
+    interval: str
+    premake: int = 3
+    detach_parquetized: bool = False
+
+
+@dataclass
+class ComponentRetentionConfig:
+    keep: str
+    mode: str = "delete"
+    batch: int = 1000
 
 
 @dataclass
@@ -33,6 +56,10 @@ class ComponentConfiguration:
     source_range_strict: bool = True
     multiple_results: bool = False
     query_parameters: Optional[Dict[str, str]] = None
+    cache: Optional[ComponentCacheConfig] = None
+    write_behind: bool = False
+    partition: Optional[ComponentPartitionConfig] = None
+    retention: Optional[ComponentRetentionConfig] = None
 
     def __hash__(self):
         return hash(self.name)
@@ -0,0 +1,186 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Table, select
+from sqlalchemy.engine import Connection
+
+from src.configuration.model import ComponentConfiguration
+from src.data.engine import engine
+from src.data.storage import storage_manager
+
+logger = logging.getLogger("Bulk")
+
+# Format of the snapshot file names, the same as the storage paths of write_result
+SNAPSHOT_DATE_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# Snapshots imported per transaction
+IMPORT_BATCH_SIZE = 1000
+# Snapshots read and uploaded to the storage at the same time
+IMPORT_WORKERS = 16
+
+
+def bulk_insert(connection: Connection, table: Table, rows: List[dict]):
+    """
+    Insert many rows in a table, in the transaction of the connection.
+
+    On PostgreSQL the rows are streamed with COPY FROM STDIN, which skips the parsing and
+    planning of an INSERT per row. Other databases get a regular executemany.
+    :param connection: The connection, the caller commits
+    :param table: The table
+    :param rows: The rows, all with the same columns
+    """
+    if not rows:
+        return
+
+    if connection.dialect.name != "postgresql":
+        connection.execute(table.insert(), rows)
+        return
+
+    # Make sure SQLAlchemy commits the transaction the COPY runs in
+    if not connection.in_transaction():
+        connection.begin()
+
+    columns = list(rows[0].keys())
+    preparer = connection.dialect.identifier_preparer
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[name]) for name in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.format_table(table)} "
+            f"({', '.join(preparer.quote(name) for name in columns)}) FROM STDIN",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _copy_value(value) -> str:
+    """
+    Encode a value in the text format of COPY.
+    """
+    if value is None:
+        return "\\N"
+    elif isinstance(value, bool):
+        return "t" if value else "f"
+    elif isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def import_snapshots(
+    configuration: ComponentConfiguration,
+    table: Table,
+    directory: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> int:
+    """
+    Import a directory of historic snapshots into the table of a component, as if the
+    component had written them.
+
+    Each file is a snapshot whose name is its date (see SNAPSHOT_DATE_FORMAT). Files are
+    uploaded to the storage concurrently and their rows inserted with bulk_insert, one
+    transaction per batch. Snapshots whose date is already in the table are skipped, so an
+    interrupted import can be run again.
+    :param configuration: The configuration of the component
+    :param table: The table of the component
+    :param directory: The directory of the snapshots
+    :param batch_size: The number of snapshots per transaction
+    :return: The number of imported snapshots
+    """
+    snapshots = sorted(
+        snapshot
+        for snapshot in map(_snapshot_date, os.scandir(directory))
+        if snapshot is not None
+    )
+
+    logger.info(f"Importing {len(snapshots)} snapshots into {configuration.name}")
+
+    imported = 0
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(
+        max_workers=IMPORT_WORKERS, thread_name_prefix="Import"
+    ) as executor:
+        for offset in range(0, len(snapshots), batch_size):
+            batch = snapshots[offset : offset + batch_size]
+
+            with engine.connect() as connection:
+                existing = set(
+                    connection.execute(
+                        select(table.c.date).where(
+                            table.c.date.between(batch[0][0], batch[-1][0])
+                        )
+                    ).scalars()
+                )
+
+                batch = [snapshot for snapshot in batch if snapshot[0] not in existing]
+
+                rows = list(
+                    executor.map(
+                        lambda snapshot: _upload_snapshot(configuration, *snapshot),
+                        batch,
+                    )
+                )
+
+                bulk_insert(connection, table, rows)
+                connection.commit()
+
+            imported += len(rows)
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Imported {imported} snapshots into {configuration.name} "
+                f"({imported / max(elapsed, 1e-9) * 60:.0f} per minute)"
+            )
+
+    return imported
+
+
+def _snapshot_date(entry: os.DirEntry) -> Optional[Tuple[datetime, str]]:
+    if not entry.is_file():
+        return None
+
+    try:
+        return datetime.strptime(entry.name, SNAPSHOT_DATE_FORMAT), entry.path
+    except ValueError:
+        logger.warning(f"Skipping {entry.path}, its name is not a snapshot date")
+        return None
+
+
+def _upload_snapshot(
+    configuration: ComponentConfiguration, date: datetime, path: str
+) -> dict:
+    with open(path, "rb") as file:
+        data_bytes = file.read()
+
+    url = storage_manager.write(
+        f"{configuration.name}/{date.strftime(SNAPSHOT_DATE_FORMAT)}", data_bytes
+    )
+
+    return {
+        "date": date,
+        "data": url,
+        "type": configuration.data_type,
+        "hash": hashlib.md5(data_bytes).hexdigest(),
+    }
@@ -0,0 +1,215 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import polars
+import pyarrow as pa
+from sqlalchemy import Table, select
+
+from src.components import HandlerRequestError
+from src.data.engine import engine
+from src.data.storage import storage_manager
+
+
+@dataclass
+class HistorySegment:
+    """
+    Files of one period of an aggregation level, read between start and end.
+    """
+
+    aggregation: str
+    start: datetime
+    end: datetime
+    files: List[tuple] = field(default_factory=list)
+
+
+def select_history_segments(
+    parquet_table: Table,
+    start: datetime,
+    end: datetime,
+    filters: Dict[str, List[str]] = None,
+) -> List[HistorySegment]:
+    """
+    Choose the parquetize files to read to cover a time window.
+
+    Parquetize keeps several aggregation levels (the batches and each group) whose files
+    cover different periods, and keyed levels split each period by key values. At each
+    point of the window, the coarsest level covering it is read, so that few files are
+    opened, preferring keyed levels whose keys are all filtered on, whose files only hold
+    the matching rows. Keyed levels whose keys are not filtered on are only read when
+    nothing else covers a period, as every key file of the period is then needed.
+    :param parquet_table: The parquetize table of the component
+    :param start: The start of the window (included)
+    :param end: The end of the window (excluded)
+    :param filters: The accepted values of key columns
+    :return: The segments, by ascending date, without overlap
+    """
+    filters = filters or {}
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(
+                parquet_table.c.id,
+                parquet_table.c.data,
+                parquet_table.c.aggregation,
+                parquet_table.c.start_date,
+                parquet_table.c.end_date,
+                parquet_table.c["keys"],
+            )
+            .where(
+                (parquet_table.c.start_date < end) & (parquet_table.c.end_date > start)
+            )
+            .order_by(parquet_table.c.start_date, parquet_table.c.id)
+        ).fetchall()
+
+    # Candidate periods by (aggregation, start, end), with the rank of their level
+    periods: Dict[tuple, HistorySegment] = {}
+    ranks = {}
+
+    for row_id, url, aggregation, start_date, end_date, keys in rows:
+        key = (aggregation, start_date, end_date)
+        segment = periods.get(key)
+
+        if segment is None:
+            segment = periods[key] = HistorySegment(aggregation, start_date, end_date)
+            ranks[key] = (_level_preference(keys, filters), start_date - end_date)
+
+        if all(
+            str(value) in filters[name]
+            for name, value in (keys or {}).items()
+            if name in filters
+        ):
+            segment.files.append((row_id, url, keys or {}))
+
+    candidates = sorted(periods, key=lambda key: (key[1], ranks[key]))
+
+    segments = []
+    cursor = start
+
+    while cursor < end:
+        covering = [key for key in candidates if key[1] <= cursor < key[2]]
+
+        if not covering:
+            following = [key[1] for key in candidates if key[1] > cursor]
+
+            if not following:
+                break
+
+            cursor = min(following)
+            continue
+
+        best = min(covering, key=lambda key: ranks[key])
+        segment = periods[best]
+        segment_end = min(segment.end, end)
+
+        segments.append(
+            HistorySegment(segment.aggregation, cursor, segment_end, segment.files)
+        )
+        cursor = segment_end
+
+    return segments
+
+
+def _level_preference(keys: Optional[dict], filters: Dict[str, List[str]]) -> int:
+    if not keys:
+        return 1
+    elif all(name in filters for name in keys):
+        return 0
+
+    return 2
+
+
+def query_history(
+    parquet_table: Table,
+    start: datetime,
+    end: datetime,
+    filters: Dict[str, List[str]] = None,
+    columns: List[str] = None,
+) -> pa.Table:
+    """
+    Read the parquetized rows of a component in a time window.
+
+    The files chosen by select_history_segments are scanned lazily with Polars, so the
+    time window and the filters are pushed down to the scans: only the row groups whose
+    statistics match them, and only the requested columns, are read.
+    :param parquet_table: The parquetize table of the component
+    :param start: The start of the window (included)
+    :param end: The end of the window (excluded)
+    :param filters: The accepted values of columns, compared as strings
+    :param columns: The columns to return, all by default
+    :return: The rows, by ascending segment
+    :raise HandlerRequestError: If a filter or a column is in none of the files
+    """
+    filters = filters or {}
+    scans = []
+
+    for segment in select_history_segments(parquet_table, start, end, filters):
+        for _, url, _ in segment.files:
+            scan_source = storage_manager.scan_source(url)
+
+            if scan_source is None:
+                # The file cannot be read in place, it is downloaded
+                frame = polars.read_parquet(storage_manager.read(url)).lazy()
+            else:
+                source, storage_options = scan_source
+                frame = polars.scan_parquet(source, storage_options=storage_options)
+
+            # Read from the metadata of the file
+            scans.append((segment, frame, set(frame.collect_schema().names())))
+
+    if not scans:
+        return pa.table({})
+
+    # Files of a component gain columns over time, a column is known if any file has it
+    unknown = sorted(
+        (set(filters) | set(columns or []))
+        - set().union(*(names for _, _, names in scans))
+    )
+    if unknown:
+        raise HandlerRequestError(f"Unknown columns: {', '.join(unknown)}", 400)
+
+    frames = []
+
+    for segment, frame, names in scans:
+        if not names.issuperset(filters):
+            # No row of the file can match a filter on a column it does not have
+            continue
+
+        predicate = (polars.col("date") >= segment.start) & (
+            polars.col("date") < segment.end
+        )
+        for name, values in filters.items():
+            predicate &= polars.col(name).cast(polars.String).is_in(values)
+
+        frame = frame.filter(predicate)
+
+        if columns:
+            frame = frame.select(
+                [
+                    polars.col(name) if name in names else polars.lit(None).alias(name)
+                    for name in columns
+                ]
+            )
+
+        frames.append(frame)
+
+    if not frames:
+        return pa.table({})
+
+    return polars.concat(frames, how="diagonal_relaxed").collect().to_arrow()
+
+
+def fingerprint_history(
+    parquet_table: Table,
+    start: datetime,
+    end: datetime,
+    filters: Dict[str, List[str]] = None,
+) -> str:
+    """
+    Fingerprint of the files query_history reads, see Handler.fingerprint.
+    """
+    return "|".join(
+        f"{segment.aggregation}:{segment.start.isoformat()}:"
+        + ",".join(str(row_id) for row_id, _, _ in segment.files)
+        for segment in select_history_segments(parquet_table, start, end, filters)
+    )
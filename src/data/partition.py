@@ -0,0 +1,357 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import MetaData, Table, text, select, func
+
+from src.configuration.model import ComponentConfiguration, ComponentPartitionConfig
+from src.data.engine import engine
+from src.data.retention import RETENTION_WORKERS, hand_over_to_copies, remove_blobs
+
+logger = logging.getLogger("Database")
+
+PARTITION_INTERVALS = ("day", "week", "month")
+# How the blobs of dropped partitions are removed when the component has no retention
+# policy, they are only archived as the partitions may predate the policy
+DETACHED_BLOBS_MODE = "archive"
+# Rows whose blobs are removed per transaction when dropping a detached partition
+DETACHED_BATCH_SIZE = 1000
+
+
+def partitioning_supported() -> bool:
+    """
+    Range partitioning is only available on PostgreSQL, other databases keep a single table.
+    """
+    return engine.dialect.name == "postgresql"
+
+
+def partition_start(interval: str, date: datetime) -> datetime:
+    """
+    Get the start of the partition a date belongs to.
+    :param interval: The partition interval, one of PARTITION_INTERVALS
+    :param date: The date
+    :return: The start of the partition
+    """
+    date = date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if interval == "day":
+        return date
+    elif interval == "week":
+        return date - timedelta(days=date.weekday())
+    elif interval == "month":
+        return date.replace(day=1)
+
+    raise ValueError(f"Invalid partition interval: {interval}")
+
+
+def partition_end(interval: str, start: datetime) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    elif interval == "week":
+        return start + timedelta(weeks=1)
+    elif interval == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+
+    raise ValueError(f"Invalid partition interval: {interval}")
+
+
+def partition_name(table: Table, start: datetime) -> str:
+    return f"{table.name}_p{start.strftime('%Y%m%d')}"
+
+
+def ensure_partitions(
+    table: Table, partition_config: ComponentPartitionConfig, now: datetime = None
+):
+    """
+    Create the default partition of a table, the partition of the current period and the
+    next partition_config.premake ones. Existing partitions are left untouched.
+
+    Rows outside of every partition (backfills of old data for instance) go to the default
+    partition. The rows it holds for a period are moved to the partition of the period
+    when it is created, in the same transaction.
+    :param table: The partitioned table
+    :param partition_config: The partitioning configuration
+    :param now: The current date, defaults to now
+    """
+    if not partitioning_supported():
+        return
+
+    start = partition_start(partition_config.interval, now or datetime.now())
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{table.name}_default" '
+                f'PARTITION OF "{table.name}" DEFAULT'
+            )
+        )
+
+        attached = {name for name, _ in _attached_partitions(connection, table)}
+
+        for _ in range(partition_config.premake + 1):
+            end = partition_end(partition_config.interval, start)
+
+            if partition_name(table, start) not in attached:
+                _create_partition(connection, table, start, end)
+
+            start = end
+
+
+def _create_partition(connection, table: Table, start: datetime, end: datetime):
+    """
+    Create the partition of a period. PostgreSQL refuses to create it while the default
+    partition holds rows of the period, these are then moved to it: the default partition
+    is detached, the partition created, the rows moved and the default partition attached
+    back.
+    """
+    name = partition_name(table, start)
+    default = f"{table.name}_default"
+    period = {"start": start, "end": end}
+    create = text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table.name}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+    in_default = connection.execute(
+        text(
+            f'SELECT EXISTS (SELECT 1 FROM "{default}" '
+            "WHERE date >= :start AND date < :end)"
+        ),
+        period,
+    ).scalar()
+
+    if not in_default:
+        connection.execute(create)
+        return
+
+    logger.warning(f"Moving the rows of {name} out of the default partition")
+
+    connection.execute(text(f'ALTER TABLE "{table.name}" DETACH PARTITION "{default}"'))
+    connection.execute(create)
+    connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{default}" '
+            "WHERE date >= :start AND date < :end RETURNING *) "
+            f'INSERT INTO "{table.name}" SELECT * FROM moved'
+        ),
+        period,
+    )
+    connection.execute(
+        text(f'ALTER TABLE "{table.name}" ATTACH PARTITION "{default}" DEFAULT')
+    )
+
+
+def maintain_partitions(table: Table, partition_config: ComponentPartitionConfig):
+    """
+    ensure_partitions for scheduled runs, failures are logged and retried on the next run.
+    """
+    try:
+        ensure_partitions(table, partition_config)
+    except Exception as e:
+        logger.exception(f"Could not create the partitions of {table.name}: {e}")
+
+
+def _attached_partitions(connection, table: Table) -> List[Tuple[str, datetime]]:
+    """
+    Get the partitions of a table created by ensure_partitions, with their start.
+    """
+    names = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :name"
+        ),
+        {"name": table.name},
+    ).scalars()
+
+    partitions = []
+    prefix = f"{table.name}_p"
+
+    for name in names:
+        try:
+            partitions.append(
+                (name, datetime.strptime(name.removeprefix(prefix), "%Y%m%d"))
+            )
+        except ValueError:
+            continue  # Default partition
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _detached_partitions(connection, table: Table) -> List[str]:
+    """
+    Get the partitions of a table detached by detach_parquetized_partitions and not
+    dropped yet: the tables named like its partitions that are no longer attached.
+    """
+    names = connection.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND relname ~ :pattern "
+            "AND NOT EXISTS "
+            "(SELECT 1 FROM pg_inherits WHERE pg_inherits.inhrelid = pg_class.oid)"
+        ),
+        {"pattern": f"^{re.escape(table.name)}_p[0-9]{{8}}$"},
+    ).scalars()
+
+    return sorted(names)
+
+
+def detach_parquetized_partitions(
+    table: Table,
+    parquet_table: Table,
+    partition_config: ComponentPartitionConfig,
+    until: datetime = None,
+) -> List[str]:
+    """
+    Detach the partitions of a table whose whole period has been parquetized.
+
+    Detached partitions become regular tables: their rows are no longer returned by
+    queries on the table, and drop_detached_partitions removes them. Rows of a partition
+    whose data newer rows still refer to (copy_id) first hand it over to them, see
+    hand_over_to_copies, so that the copies keep their data.
+    :param table: The partitioned table
+    :param parquet_table: The parquetize table of the component
+    :param partition_config: The partitioning configuration
+    :param until: Only detach partitions ending before this date as well, the retention
+    cutoff of the component so that its rows are removed with their blobs first
+    :return: The names of the detached partitions
+    """
+    if not partitioning_supported():
+        return []
+
+    detached = []
+
+    with engine.begin() as connection:
+        parquetized_until = connection.execute(
+            select(func.max(parquet_table.c.end_date))
+        ).scalar()
+
+        if parquetized_until is None:
+            return []
+
+        if until is not None:
+            parquetized_until = min(parquetized_until, until)
+
+        for name, start in _attached_partitions(connection, table):
+            if partition_end(partition_config.interval, start) > parquetized_until:
+                break
+
+            _hand_over_to_newer_copies(
+                connection,
+                table,
+                start,
+                partition_end(partition_config.interval, start),
+            )
+
+            logger.info(f"Detaching parquetized partition {name}")
+            connection.execute(
+                text(f'ALTER TABLE "{table.name}" DETACH PARTITION "{name}"')
+            )
+            detached.append(name)
+
+    return detached
+
+
+def _hand_over_to_newer_copies(
+    connection, table: Table, start: datetime, end: datetime
+):
+    """
+    Hand the data of the rows of a period over to their copies after it, and clear it from
+    the rows so that dropping the period does not remove the blobs the copies refer to.
+    """
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.data, table.c.hash)
+            .where(
+                table.c.date >= start,
+                table.c.date < end,
+                table.c.data.isnot(None),
+                table.c.id.in_(
+                    select(table.c.copy_id).where(
+                        table.c.date >= end, table.c.copy_id.isnot(None)
+                    )
+                ),
+            )
+            .limit(DETACHED_BATCH_SIZE)
+        ).all()
+
+        if not rows:
+            return
+
+        handed_over = hand_over_to_copies(connection, table, rows)
+        connection.execute(
+            table.update()
+            .where(
+                table.c.date >= start,
+                table.c.date < end,
+                table.c.id.in_(handed_over),
+            )
+            .values(data=None)
+        )
+
+
+def drop_detached_partitions(
+    configuration: ComponentConfiguration, table: Table
+) -> List[str]:
+    """
+    Drop the partitions of a table detached by detach_parquetized_partitions, removing
+    the blobs of their rows first, by batches. Blobs are removed like the retention
+    policy of the component does, and archived without one (see DETACHED_BLOBS_MODE).
+
+    A partition is only dropped once all its blobs are removed, so that an interrupted
+    run is resumed by the next one.
+    :param configuration: The configuration of the component
+    :param table: The partitioned table
+    :return: The names of the dropped partitions
+    """
+    if not partitioning_supported():
+        return []
+
+    mode = (
+        configuration.retention.mode
+        if configuration.retention is not None
+        else DETACHED_BLOBS_MODE
+    )
+
+    with engine.connect() as connection:
+        names = _detached_partitions(connection, table)
+
+    with ThreadPoolExecutor(
+        max_workers=RETENTION_WORKERS, thread_name_prefix="Partition"
+    ) as executor:
+        for name in names:
+            partition = table.to_metadata(MetaData(), name=name)
+
+            while True:
+                with engine.connect() as connection:
+                    rows = connection.execute(
+                        select(
+                            partition.c.id,
+                            partition.c.date,
+                            partition.c.data,
+                            partition.c.hash,
+                        )
+                        .where(partition.c.data.isnot(None))
+                        .order_by(partition.c.date)
+                        .limit(DETACHED_BATCH_SIZE)
+                    ).all()
+
+                    if not rows:
+                        break
+
+                    remove_blobs(configuration, mode, rows, executor)
+                    connection.execute(
+                        partition.delete().where(
+                            partition.c.id.in_([row.id for row in rows])
+                        )
+                    )
+                    connection.commit()
+
+            logger.info(f"Dropping detached partition {name}")
+            with engine.begin() as connection:
+                connection.execute(text(f'DROP TABLE "{name}"'))
+
+    return names
@@ -0,0 +1,266 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from sqlalchemy import INTEGER, Table, bindparam, column, select, func, values
+
+from src.configuration.model import ComponentConfiguration
+from src.data.engine import engine
+from src.data.storage import storage_manager
+
+logger = logging.getLogger("Retention")
+
+RETENTION_MODES = ("delete", "archive")
+# Blobs measured and deleted or archived at the same time
+RETENTION_WORKERS = 16
+# Batches removed per call to apply_retention, so that a backlog is worked through over
+# several runs instead of blocking the parquetize loop
+RETENTION_MAX_BATCHES = 100
+# Directory of a component in the storage holding the manifests of its archived blobs
+ARCHIVE_MANIFEST_DIRECTORY = "archived"
+
+
+@dataclass
+class RetentionReport:
+    rows: int = 0
+    bytes: int = 0
+
+
+def retention_cutoff(
+    parquet_table: Table, keep: timedelta, now: datetime = None
+) -> Optional[datetime]:
+    """
+    Get the date before which the raw rows of a component can be removed: rows covered by
+    the parquetize batches for longer than the retention period.
+    :param parquet_table: The parquetize table of the component
+    :param keep: The retention period
+    :param now: The current date, defaults to now
+    :return: The cutoff, or None if nothing has been parquetized yet
+    """
+    with engine.connect() as connection:
+        parquetized_until = connection.execute(
+            select(func.max(parquet_table.c.end_date))
+        ).scalar()
+
+    if parquetized_until is None:
+        return None
+
+    return min(parquetized_until, now or datetime.now()) - keep
+
+
+def apply_retention(
+    configuration: ComponentConfiguration,
+    table: Table,
+    cutoff: datetime,
+    max_batches: int = RETENTION_MAX_BATCHES,
+) -> RetentionReport:
+    """
+    Remove the raw rows of a component older than a cutoff (see retention_cutoff), and
+    their blobs.
+
+    Rows are removed oldest first, by batches of configuration.retention.batch, each in its
+    own transaction. The blobs of a batch are deleted (or archived, with the "archive"
+    mode) before its rows, so that an interrupted run leaves rows whose blob is gone, which
+    the next run removes, rather than blobs nothing refers to. With the "archive" mode, a
+    manifest of the archived blobs (see ARCHIVE_MANIFEST_DIRECTORY) is written before they
+    are archived, so that they can still be found once their rows are gone.
+
+    A removed row whose data is still referred to by newer copies (copy_id) hands its data
+    over to the newest of them, which the other copies then refer to, and its blob is kept.
+    :param configuration: The configuration of the component, with a retention policy
+    :param table: The table of the component
+    :param cutoff: The date before which rows are removed
+    :param max_batches: The maximum number of batches to remove
+    :return: The number of removed rows and reclaimed bytes
+    """
+    retention = configuration.retention
+
+    if retention.mode not in RETENTION_MODES:
+        raise ValueError(f"Invalid retention mode: {retention.mode}")
+
+    report = RetentionReport()
+
+    with ThreadPoolExecutor(
+        max_workers=RETENTION_WORKERS, thread_name_prefix="Retention"
+    ) as executor:
+        for _ in range(max_batches):
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.date, table.c.data, table.c.hash)
+                    .where(table.c.date < cutoff)
+                    .order_by(table.c.date)
+                    .limit(retention.batch)
+                ).all()
+
+                if not rows:
+                    break
+
+                ids = [row.id for row in rows]
+                handed_over = hand_over_to_copies(connection, table, rows)
+
+                report.bytes += remove_blobs(
+                    configuration,
+                    retention.mode,
+                    [
+                        row
+                        for row in rows
+                        if row.data is not None and row.id not in handed_over
+                    ],
+                    executor,
+                )
+
+                connection.execute(
+                    table.delete().where(table.c.date < cutoff, table.c.id.in_(ids))
+                )
+                connection.commit()
+
+            report.rows += len(rows)
+
+            if len(rows) < retention.batch:
+                break
+
+    if report.rows:
+        logger.info(
+            f"Removed {report.rows} rows of {configuration.name} older than "
+            f"{cutoff}, reclaiming {report.bytes} bytes ({retention.mode})"
+        )
+
+    return report
+
+
+def hand_over_to_copies(connection, table: Table, rows) -> Set[int]:
+    """
+    Move the data of removed rows to the newest of their copies that are kept, and make
+    their other kept copies refer to it.
+
+    The copies of all the rows are updated by two statements: on PostgreSQL they join the
+    table to a VALUES list of the handed over data, other databases get an executemany.
+    :param connection: The connection, the caller commits
+    :param table: The table
+    :param rows: The removed rows, with their id, data and hash
+    :return: The ids of the rows whose data has been handed over
+    """
+    originals = {row.id: row for row in rows if row.data is not None}
+
+    if not originals:
+        return set()
+
+    removed = [row.id for row in rows]
+    heirs = {}
+
+    # The newest copy of each original comes first
+    for copy in connection.execute(
+        select(table.c.id, table.c.copy_id)
+        .where(table.c.copy_id.in_(originals), table.c.id.notin_(removed))
+        .order_by(table.c.copy_id, table.c.date.desc(), table.c.id.desc())
+    ):
+        heirs.setdefault(copy.copy_id, copy.id)
+
+    if not heirs:
+        return set()
+
+    handed_over = [
+        (original, heir, originals[original].data, originals[original].hash)
+        for original, heir in heirs.items()
+    ]
+
+    if connection.dialect.name == "postgresql":
+        source = values(
+            column("original", INTEGER),
+            column("heir", INTEGER),
+            column("heir_data", table.c.data.type),
+            column("heir_hash", table.c.hash.type),
+            name="handed_over",
+        ).data(handed_over)
+        parameters = None
+    else:
+        source = None
+        parameters = [
+            dict(zip(("original", "heir", "heir_data", "heir_hash"), row))
+            for row in handed_over
+        ]
+
+    def handed_over_column(name: str):
+        return source.c[name] if source is not None else bindparam(name)
+
+    # Heirs first, they then no longer refer to the original
+    connection.execute(
+        table.update()
+        .where(table.c.id == handed_over_column("heir"))
+        .values(
+            data=handed_over_column("heir_data"),
+            hash=handed_over_column("heir_hash"),
+            copy_id=None,
+        ),
+        parameters,
+    )
+    connection.execute(
+        table.update()
+        .where(
+            table.c.copy_id == handed_over_column("original"),
+            table.c.id.notin_(removed),
+        )
+        .values(copy_id=handed_over_column("heir")),
+        parameters,
+    )
+
+    return set(heirs)
+
+
+def remove_blobs(
+    configuration: ComponentConfiguration,
+    mode: str,
+    rows,
+    executor: ThreadPoolExecutor,
+) -> int:
+    """
+    Delete or archive the blobs of removed rows. With the "archive" mode, a manifest of
+    the blobs is written first, see ARCHIVE_MANIFEST_DIRECTORY.
+    :param configuration: The configuration of the component
+    :param mode: One of RETENTION_MODES
+    :param rows: The removed rows, with their id, date, data and hash
+    :param executor: The pool removing the blobs
+    :return: The number of reclaimed bytes
+    """
+    if not rows:
+        return 0
+
+    if mode == "archive":
+        _write_archive_manifest(configuration, rows)
+
+    return sum(executor.map(_remove_blob(mode), [row.data for row in rows]))
+
+
+def _write_archive_manifest(configuration: ComponentConfiguration, rows):
+    """
+    List the blobs of a batch about to be archived, named after its first row so that a
+    batch retried after an interruption overwrites its manifest.
+    """
+    first = rows[0]
+    manifest = [
+        {"date": row.date.isoformat(), "url": row.data, "hash": row.hash}
+        for row in rows
+    ]
+
+    storage_manager.write(
+        f"{configuration.name}/{ARCHIVE_MANIFEST_DIRECTORY}/"
+        f"{first.date.strftime('%Y-%m-%d_%H-%M-%S')}_{first.id}.json",
+        json.dumps(manifest).encode("utf-8"),
+    )
+
+
+def _remove_blob(mode: str):
+    def remove(url: str) -> int:
+        size = storage_manager.size(url)
+
+        if mode == "archive":
+            storage_manager.archive(url)
+        else:
+            storage_manager.delete(url)
+
+        return size
+
+    return remove
@@ -1,25 +1,39 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Iterator
 
-from sqlalchemy import Table, select
+from sqlalchemy import Table, select, func, tuple_
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.functions import coalesce
 
 from src.data.engine import engine
 from src.data.storage import storage_manager
 
+# Rows per page of iter_between_datetime
+ITER_PAGE_SIZE = 100
+# Number of payloads iter_between_datetime reads from the storage at the same time
+ITER_READ_WORKERS = 8
+
 
 @dataclass
 class Data:
     date: datetime
     _url: str
     _data_type: str = None
+    # Payload already read from the storage, if any
+    _content: Optional[bytes] = None
+    id: Optional[int] = None
+    # MD5 of the payload, shared by the rows storing the same payload
+    hash: Optional[str] = None
 
     @property
     def data(self) -> Union[str, bytes]:
-        bytes_data = storage_manager.read(self._url)
+        if self._content is not None:
+            bytes_data = self._content
+        else:
+            bytes_data = storage_manager.read(self._url)
 
         if self._data_type == "json":
             return json.loads(bytes_data)
@@ -38,10 +52,19 @@ def data_result(func) -> Optional[Union[Data, List[Data]]]:
 
         # If the result is a single row, return a single Data object
         if not isinstance(result, list):
-            return Data(date=result.date, _url=result.data)
+            return Data(
+                date=result.date, _url=result.data, id=result.id, hash=result.hash
+            )
 
         return [
-            Data(date=row.date, _url=row.data, _data_type=row.type) for row in result
+            Data(
+                date=row.date,
+                _url=row.data,
+                _data_type=row.type,
+                id=row.id,
+                hash=row.hash,
+            )
+            for row in result
         ]
 
     return wrapper
@@ -63,6 +86,7 @@ def base_query(table: Table, with_null: bool = False):
         table.c.date,
         coalesce(t2.c.data, table.c.data).label("data"),
         table.c.type,
+        coalesce(t2.c.hash, table.c.hash).label("hash"),
     )
 
     if not with_null:
@@ -164,3 +188,99 @@ def retrieve_latest_rows_before_datetime(
             .order_by(table.c.date.desc())
             .limit(limit)
         ).fetchall()
+
+
+def iter_between_datetime(
+    table: Table,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    page_size: int = ITER_PAGE_SIZE,
+) -> Iterator[Data]:
+    """
+    Iterate over all the rows between two dates, by ascending date.
+
+    Rows are fetched by pages, using the (date, id) of the last row of a page as the
+    start of the next one, so that each page is a cheap index range scan whatever its
+    position. The payloads of the next page are read from the storage while the current
+    one is consumed, and at most two pages are held in memory.
+    :param table: The table
+    :param start_date: The start date (excluded), None for no start
+    :param end_date: The end date (excluded), None for no end
+    :param page_size: The number of rows per page
+    :return: The rows, with their payload already read
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=ITER_READ_WORKERS, thread_name_prefix="Retrieve"
+    )
+
+    def fetch_page(after):
+        query = base_query(table)
+
+        if start_date is not None:
+            query = query.where(table.c.date > start_date)
+        if end_date is not None:
+            query = query.where(table.c.date < end_date)
+        if after is not None:
+            query = query.where(tuple_(table.c.date, table.c.id) > after)
+
+        with engine.connect() as connection:
+            rows = connection.execute(
+                query.order_by(table.c.date.asc(), table.c.id.asc()).limit(page_size)
+            ).fetchall()
+
+        return [(row, executor.submit(storage_manager.read, row.data)) for row in rows]
+
+    try:
+        page = fetch_page(None)
+
+        while page:
+            next_page = None
+
+            if len(page) == page_size:
+                last, _ = page[-1]
+                next_page = fetch_page((last.date, last.id))
+
+            for row, content in page:
+                yield Data(
+                    date=row.date,
+                    _url=row.data,
+                    _data_type=row.type,
+                    _content=content.result(),
+                    id=row.id,
+                    hash=row.hash,
+                )
+
+            page = next_page
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def retrieve_fingerprint_between_datetime(
+    table: Table, start_date: datetime, end_date: datetime
+) -> str:
+    """
+    Get a fingerprint of the rows between two dates: their count and id range, and the
+    count and sum of their copy_ids.
+    Rows are inserted with increasing ids, and only updated when retention hands the data
+    of a removed row over to its copies (see hand_over_to_copies), which changes their
+    copy_ids. The same fingerprint then means the same rows.
+    :param table: The table
+    :param start_date: The start date (excluded)
+    :param end_date: The end date (excluded)
+    :return: The fingerprint
+    """
+    with engine.connect() as connection:
+        count, min_id, max_id, copies, copy_ids = connection.execute(
+            select(
+                func.count(),
+                func.min(table.c.id),
+                func.max(table.c.id),
+                func.count(table.c.copy_id),
+                func.sum(table.c.copy_id),
+            )
+            .where(table.c.date > start_date)
+            .where(table.c.date < end_date)
+            .where((table.c.copy_id.isnot(None)) | (table.c.hash.isnot(None)))
+        ).one()
+
+    return f"{table.name}:{count}:{min_id}:{max_id}:{copies}:{copy_ids}"
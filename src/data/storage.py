@@ -1,8 +1,17 @@
 import abc
 import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import unquote, urlparse
 
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient
 
+# Files read at the same time by read_many
+READ_MANY_WORKERS = 8
+
 
 class StorageManager(abc.ABC):
     @abc.abstractmethod
@@ -14,6 +23,43 @@ class StorageManager(abc.ABC):
     @abc.abstractmethod
     def delete(self, file_name: str): ...
 
+    @abc.abstractmethod
+    def size(self, file_name: str) -> int: ...
+
+    @abc.abstractmethod
+    def archive(self, file_name: str): ...
+
+    @abc.abstractmethod
+    def scan_source(
+        self, file_name: str
+    ) -> Optional[Tuple[str, Optional[Dict[str, str]]]]: ...
+
+    def read_many(
+        self, file_names: Iterable[str], workers: int = READ_MANY_WORKERS
+    ) -> Iterator[bytes]:
+        """
+        Read files concurrently, yielding their data in the order of the names. At most
+        `workers` files are read ahead of the one consumed.
+
+        :param file_names: Names of the files to read from.
+        :param workers: Number of files read at the same time.
+        :return: Data read from each file as bytes.
+        """
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="Storage"
+        ) as executor:
+            pending = deque()
+
+            for file_name in file_names:
+                pending.append(executor.submit(self.read, file_name))
+
+                if len(pending) > workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+
 class AzureBlobManager(StorageManager):
     def __init__(self, connection_string, container_name):
         self.blob_service_client = BlobServiceClient.from_connection_string(
@@ -48,22 +94,91 @@ class AzureBlobManager(StorageManager):
         :param file_name: Name of the blob to read from.
         :return: Data read from the blob as bytes.
         """
-        blob_client = self.container_client.get_blob_client(
-            file_name.split(self.container_client.container_name + "/")[1]
-        )
+        blob_client = self.container_client.get_blob_client(self._blob_name(file_name))
         blob_data = blob_client.download_blob().readall()
         return blob_data
 
     def delete(self, file_name: str):
         """
-        Delete a blob in Azure Blob Storage.
+        Delete a blob in Azure Blob Storage, deleting a missing blob is not an error.
 
         :param file_name: Name of the blob to delete.
         """
-        blob_client = self.container_client.get_blob_client(
-            file_name.split(self.container_client.container_name + "/")[1]
-        )
-        blob_client.delete_blob()
+        blob_client = self.container_client.get_blob_client(self._blob_name(file_name))
+        try:
+            blob_client.delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+    def size(self, file_name: str) -> int:
+        """
+        Get the size of a blob in Azure Blob Storage.
+
+        :param file_name: Name of the blob.
+        :return: Size of the blob in bytes, 0 if it does not exist.
+        """
+        blob_client = self.container_client.get_blob_client(self._blob_name(file_name))
+        try:
+            return blob_client.get_blob_properties().size
+        except ResourceNotFoundError:
+            return 0
+
+    def archive(self, file_name: str):
+        """
+        Move a blob to the archive access tier of Azure Blob Storage, it stays at the same
+        URL but must be rehydrated before it can be read again.
+
+        :param file_name: Name of the blob to archive.
+        """
+        blob_client = self.container_client.get_blob_client(self._blob_name(file_name))
+        try:
+            blob_client.set_standard_blob_tier("Archive")
+        except ResourceNotFoundError:
+            pass
+
+    def scan_source(
+        self, file_name: str
+    ) -> Optional[Tuple[str, Optional[Dict[str, str]]]]:
+        """
+        Get the location of a blob for readers accessing it in place, such as Polars'
+        scan_parquet, which then only download the byte ranges they need.
+
+        The account key or the SAS token of the client is passed on to the reader. Other
+        credentials (Azure AD tokens for instance) and endpoints other than the public
+        Azure one cannot be, the blob must then be read with read.
+
+        :param file_name: Name of the blob.
+        :return: The az:// URI of the blob and the storage options to read it with, or
+        None if it cannot be read in place.
+        """
+        client = self.blob_service_client
+        credential = client.credential
+        account_url = urlparse(client.url)
+
+        if account_url.hostname != f"{client.account_name}.blob.core.windows.net":
+            return None
+
+        if getattr(credential, "account_key", None):
+            options = {"account_key": credential.account_key}
+        elif getattr(credential, "signature", None):
+            options = {"sas_token": credential.signature}
+        elif credential is None and account_url.query:
+            # A SAS token of the connection string is in the query of the account URL
+            options = {"sas_token": account_url.query}
+        else:
+            return None
+
+        container_name = self.container_client.container_name
+
+        return f"az://{container_name}/{self._blob_name(file_name)}", {
+            "account_name": client.account_name,
+            **options,
+        }
+
+    def _blob_name(self, url: str) -> str:
+        # Blob URLs are percent-encoded, "=" in the paths of parquetize files for instance
+        return unquote(url.split(self.container_client.container_name + "/")[1])
+
 
 class FileStorageManager(StorageManager):
     def __init__(self, directory):
@@ -99,11 +214,55 @@ class FileStorageManager(StorageManager):
 
     def delete(self, file_name: str):
         """
-        Delete a file in the local file system.
+        Delete a file in the local file system, deleting a missing file is not an error.
 
         :param file_name: Name of the file to delete.
         """
-        os.remove(file_name)
+        try:
+            os.remove(file_name)
+        except FileNotFoundError:
+            pass
+
+    def size(self, file_name: str) -> int:
+        """
+        Get the size of a file in the local file system.
+
+        :param file_name: Name of the file.
+        :return: Size of the file in bytes, 0 if it does not exist.
+        """
+        try:
+            return os.path.getsize(file_name)
+        except FileNotFoundError:
+            return 0
+
+    def archive(self, file_name: str):
+        """
+        Move a file to the archive directory of the local file system, under the same
+        relative path.
+
+        :param file_name: Name of the file to archive.
+        """
+        archive_path = os.path.join(
+            self.directory, "archive", os.path.relpath(file_name, self.directory)
+        )
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+
+        try:
+            shutil.move(file_name, archive_path)
+        except FileNotFoundError:
+            pass
+
+    def scan_source(
+        self, file_name: str
+    ) -> Optional[Tuple[str, Optional[Dict[str, str]]]]:
+        """
+        Get the location of a file for readers accessing it in place, such as Polars'
+        scan_parquet.
+
+        :param file_name: Name of the file.
+        :return: The path of the file, and no storage options.
+        """
+        return file_name, None
 
 
 
@@ -1,14 +1,19 @@
+import logging
 from itertools import chain
-from typing import Dict
+from typing import Dict, Set
 
-from sqlalchemy import MetaData, Table
+from sqlalchemy import MetaData, Table, inspect, text
 
 from src.configuration.model import ComponentsConfiguration
 from src.data.engine import engine
 from src.data.table import (
     load_simple_table_from_configuration,
     load_parquetize_table_from_configuration,
+    obsolete_simple_table_indexes,
 )
+from src.data.partition import partitioning_supported, maintain_partitions
+
+logger = logging.getLogger("Database")
 
 
 def sync_db_from_configuration(
@@ -29,7 +34,10 @@ def sync_db_from_configuration(
         configuration.collectors.items(),
     ):
         tables[name] = load_simple_table_from_configuration(
-            component.name, metadata_obj
+            component.name,
+            metadata_obj,
+            partition_by_date=component.partition is not None
+            and partitioning_supported(),
         )
 
         if component.parquetize:
@@ -39,4 +47,110 @@ def sync_db_from_configuration(
 
     metadata_obj.create_all(engine)
 
+    _sync_indexes(metadata_obj)
+
+    for name, component in chain(
+        configuration.harvesters.items(),
+        configuration.collectors.items(),
+    ):
+        if component.partition is not None and _is_partitioned(tables[name]):
+            maintain_partitions(tables[name], component.partition)
+
     return tables
+
+
+def _is_partitioned(table: Table) -> bool:
+    """
+    Tables are partitioned when they are created, an existing table has to be migrated by
+    hand (for instance by renaming it and attaching it as the default partition of a new
+    partitioned table).
+    """
+    if not partitioning_supported():
+        return False
+
+    with engine.connect() as connection:
+        partitioned = connection.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "JOIN pg_class ON pg_partitioned_table.partrelid = pg_class.oid "
+                "WHERE pg_class.relname = :name)"
+            ),
+            {"name": table.name},
+        ).scalar()
+
+    if not partitioned:
+        logger.warning(
+            f"Table {table.name} is configured to be partitioned but already exists "
+            "without partitions, it has to be migrated by hand"
+        )
+
+    return partitioned
+
+
+def _sync_indexes(metadata_obj: MetaData):
+    """
+    Create the indexes missing on tables created by previous versions, and drop the
+    indexes they replace. On PostgreSQL indexes are built concurrently, so that the
+    components can keep writing to the tables in the meantime. A concurrent build that
+    failed (for instance when the process was stopped) leaves an invalid index behind,
+    which is dropped and built again.
+    """
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        inspector = inspect(connection)
+
+        for table in metadata_obj.tables.values():
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            # Indexes of partitioned tables cannot be built concurrently
+            concurrently = (
+                table.dialect_options["postgresql"].get("partition_by") is None
+            )
+
+            for name in _invalid_indexes(connection, table) & {
+                index.name for index in table.indexes
+            }:
+                logger.warning(f"Dropping invalid index {name}")
+                connection.execute(
+                    text(
+                        f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}"
+                        f'IF EXISTS "{name}"'
+                    )
+                )
+                existing.discard(name)
+
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+
+                logger.info(f"Creating index {index.name}")
+                index.dialect_options["postgresql"]["concurrently"] = concurrently
+                try:
+                    index.create(connection)
+                finally:
+                    index.dialect_options["postgresql"]["concurrently"] = False
+
+            for name in obsolete_simple_table_indexes(table.name):
+                if name in existing:
+                    logger.info(f"Dropping index {name}")
+                    connection.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+
+def _invalid_indexes(connection, table: Table) -> Set[str]:
+    """
+    Names of the indexes of a table left invalid by a failed concurrent build.
+    """
+    if connection.dialect.name != "postgresql":
+        return set()
+
+    return set(
+        connection.execute(
+            text(
+                "SELECT index_class.relname FROM pg_index "
+                "JOIN pg_class AS index_class ON pg_index.indexrelid = index_class.oid "
+                "JOIN pg_class AS table_class ON pg_index.indrelid = table_class.oid "
+                "WHERE table_class.relname = :name AND NOT pg_index.indisvalid"
+            ),
+            {"name": table.name},
+        ).scalars()
+    )
@@ -1,3 +1,5 @@
+from typing import List
+
 from sqlalchemy import (
     Column,
     TIMESTAMP,
@@ -10,7 +12,9 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import JSONB
 
 
-def load_simple_table_from_configuration(table_name: str, metadata_obj: MetaData):
+def load_simple_table_from_configuration(
+    table_name: str, metadata_obj: MetaData, partition_by_date: bool = False
+):
     """
     Load/Create a simple table from a component configuration.
 
@@ -18,21 +22,55 @@ def load_simple_table_from_configuration(table_name: str, metadata_obj: MetaData
     The copy_id column is used to prevent storing the same data multiple times, instead, it stores the id of the row that contains the same data,
     leveraging the unique constraint on the hash column.
 
+    Rows are read by date, most often the latest ones first, and most queries skip the rows
+    without data (see base_query). Both access paths have a (date DESC, id) index, covering
+    the columns base_query reads on PostgreSQL, the second one only on rows with data.
+
+    A table partitioned by date is range-partitioned on PostgreSQL (see
+    src.data.partition), its primary key then includes the date.
+
     @param table_name: The table name
     @param metadata_obj: The metadata object
+    @param partition_by_date: Whether the table is range-partitioned by date
     @return: The table
     """
-    return Table(
+    table = Table(
         table_name,
         metadata_obj,
         Column("id", INTEGER, primary_key=True, autoincrement=True),
-        Column("date", TIMESTAMP, nullable=False),
+        Column("date", TIMESTAMP, nullable=False, primary_key=partition_by_date),
         Column("data", VARCHAR(512), nullable=True),
         Column("type", VARCHAR(24), nullable=True),
         Column("hash", VARCHAR(32), nullable=True),
         Column("copy_id", INTEGER, nullable=True),
-        Index(f"{table_name}_date_index", "date"),
+        **({"postgresql_partition_by": "RANGE (date)"} if partition_by_date else {}),
+    )
+
+    with_data = table.c.copy_id.isnot(None) | table.c.hash.isnot(None)
+
+    Index(
+        f"{table_name}_date_id_index",
+        table.c.date.desc(),
+        table.c.id,
+        postgresql_include=["data", "type", "hash", "copy_id"],
     )
+    Index(
+        f"{table_name}_with_data_date_id_index",
+        table.c.date.desc(),
+        table.c.id,
+        postgresql_include=["data", "type", "hash", "copy_id"],
+        postgresql_where=with_data,
+        sqlite_where=with_data,
+    )
+
+    return table
+
+
+def obsolete_simple_table_indexes(table_name: str) -> List[str]:
+    """
+    Names of the indexes previous versions created on simple tables, replaced since.
+    """
+    return [f"{table_name}_date_index"]
 
 
 def load_parquetize_table_from_configuration(table_name: str, metadata_obj: MetaData):
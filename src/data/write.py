@@ -1,6 +1,12 @@
 import hashlib
 import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Iterable, Tuple
 
 from sqlalchemy import Table
 
@@ -8,6 +14,31 @@ from src.configuration.model import ComponentConfiguration
 from src.data.engine import engine
 from src.data.storage import storage_manager
 
+logger = logging.getLogger("Write")
+
+# Number of payloads write_results uploads to the storage at the same time
+WRITE_UPLOAD_WORKERS = 8
+# Maximum number of results waiting in a write-behind queue
+WRITE_BEHIND_MAX_PENDING = 256
+# Maximum number of results written by a single write_results call of a write-behind writer
+WRITE_BEHIND_BATCH_SIZE = 32
+# Base and maximum delay between two attempts to write a failed batch, in seconds
+WRITE_BEHIND_BACKOFF = 1
+WRITE_BEHIND_MAX_BACKOFF = 60
+# Attempts to write a failed batch while closing, before giving up on it
+WRITE_BEHIND_CLOSE_ATTEMPTS = 3
+
+_CLOSE = object()
+
+
+def _encode(data) -> bytes:
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    elif isinstance(data, dict) or isinstance(data, list):
+        return json.dumps(data).encode("utf-8")
+
+    return data
+
 
 def write_result(
     configuration: ComponentConfiguration, table: Table, data, date: datetime
@@ -20,31 +51,159 @@ def write_result(
     :param data:  The data to write
     :param date:  The date of the data
     """
+    write_results(configuration, table, [(data, date)])
 
-    if data is str:
-        data_bytes = data.encode("utf-8")
-    elif isinstance(data, dict) or isinstance(data, list):
-        data_bytes = json.dumps(data).encode("utf-8")
-    else:
-        data_bytes = data
 
-    if data_bytes is None:
-        md5_digest = None
-    else:
-        md5_digest = hashlib.md5(data_bytes).hexdigest()
+def write_results(
+    configuration: ComponentConfiguration,
+    table: Table,
+    results: Iterable[Tuple[object, datetime]],
+):
+    """
+    Write many results of a component at once.
+    The payloads are uploaded to the storage concurrently, then all the rows are inserted
+    with a single statement, in a single transaction. None results are recorded as rows
+    without data nor hash, nothing is uploaded for them.
+    :param configuration: The configuration of the component
+    :param table: The table to write to
+    :param results: The data to write and their date
+    """
+    results = [(_encode(data), date) for data, date in results]
+
+    if not results:
+        return
 
-    with engine.connect() as connection:
+    def upload(result):
+        data_bytes, date = result
 
-        # Upload data to storage
-        url = storage_manager.write(
+        # Empty results are only recorded by their row, without data
+        if data_bytes is None:
+            return None
+
+        return storage_manager.write(
             f"{configuration.name}/{date.strftime('%Y-%m-%d_%H-%M-%S')}",
             data_bytes,
         )
-        # Insert data to database
-        connection.execute(
-            table.insert().values(
-                date=date, data=url, hash=md5_digest, type=configuration.data_type
-            )
+
+    if len(results) == 1:
+        urls = [upload(results[0])]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(WRITE_UPLOAD_WORKERS, len(results)),
+            thread_name_prefix="Write",
+        ) as executor:
+            urls = list(executor.map(upload, results))
+
+    rows = [
+        {
+            "date": date,
+            "data": url,
+            "hash": (
+                None if data_bytes is None else hashlib.md5(data_bytes).hexdigest()
+            ),
+            "type": configuration.data_type,
+        }
+        for (data_bytes, date), url in zip(results, urls)
+    ]
+
+    with engine.begin() as connection:
+        connection.execute(table.insert().values(rows))
+
+
+class BufferedResultWriter:
+    """
+    Write-behind writer of the results of a component.
+
+    Results are queued and written in batches (see write_results) by a background thread,
+    so that the component does not wait for the storage and the database. When the queue
+    is full, write blocks until the background thread catches up. A batch that fails to be
+    written is retried, keeping the results in order. close writes the queued results
+    before returning.
+    """
+
+    def __init__(
+        self,
+        configuration: ComponentConfiguration,
+        table: Table,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+    ):
+        self.configuration = configuration
+        self.table = table
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(
+            target=self._run, name=f"Write-{configuration.name}", daemon=True
         )
+        self._thread.start()
+
+    def write(self, data, date: datetime):
+        """
+        Queue a result to be written.
+        :param data: The data to write
+        :param date: The date of the data
+        """
+        try:
+            self._queue.put_nowait((data, date))
+        except queue.Full:
+            logger.warning(
+                f"Write queue of {self.configuration.name} is full, waiting for it to drain"
+            )
+            self._queue.put((data, date))
+
+    def close(self):
+        """
+        Write the queued results and stop the background thread.
+        """
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        closing = False
+
+        while not closing:
+            item = self._queue.get()
+            batch = []
+
+            while True:
+                if item is _CLOSE:
+                    closing = True
+                    break
+
+                batch.append(item)
+
+                if len(batch) >= self.batch_size:
+                    break
+
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch, closing)
+
+    def _write_batch(self, batch: list, closing: bool):
+        attempt = 0
+
+        while True:
+            try:
+                write_results(self.configuration, self.table, batch)
+                return
+            except Exception as e:
+                attempt += 1
+
+                if closing and attempt >= WRITE_BEHIND_CLOSE_ATTEMPTS:
+                    logger.error(
+                        f"Could not write {len(batch)} results of {self.configuration.name}, "
+                        f"giving up: {e}"
+                    )
+                    return
 
-        connection.commit()
+                logger.exception(
+                    f"Could not write {len(batch)} results of {self.configuration.name}, "
+                    f"retrying: {e}"
+                )
+                time.sleep(
+                    min(WRITE_BEHIND_BACKOFF * 2**attempt, WRITE_BEHIND_MAX_BACKOFF)
+                )
@@ -1,3 +1,4 @@
+from .run_async_collector import run_async_collectors_on_schedule, run_async_collectors
 from .run_collector import run_collector_on_schedule, run_collector
 from .run_handler import run_handlers
 from .run_harvester import run_harvester_on_schedule, run_harvester
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from src.configuration.model import ComponentConfiguration
+from src.runners._response import HandlerResponse
+from src.runners._utils import schedule_string_to_time_delta
+
+# Maximum total size of the cached response bodies, in bytes
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+def normalize_query_parameters(
+    handler_config: ComponentConfiguration, query_parameters: dict
+) -> Tuple[dict, Hashable]:
+    """
+    Normalize the query parameters of a request to a handler and compute its cache key.
+
+    When the handler has a cache bucket, timestamp parameters are aligned on the bucket so
+    that requests made a few seconds apart share the same key and result: end timestamps
+    are rounded up and the others floored, so the window only grows and always covers the
+    requested one. If a timestamp is missing (the handler then defaults to "now"), the
+    current bucket is part of the key.
+    :param handler_config: The handler configuration
+    :param query_parameters: The parsed query parameters
+    :return: The parameters to run the handler with, and the cache key
+    """
+    bucket = _bucket_seconds(handler_config)
+
+    if bucket:
+        query_parameters = {
+            key: (
+                _align_timestamp(key, value, bucket)
+                if key.endswith("_timestamp") and isinstance(value, int)
+                else value
+            )
+            for key, value in query_parameters.items()
+        }
+
+    key = (handler_config.name, tuple(sorted(query_parameters.items())))
+
+    timestamps = [
+        name
+        for name in (handler_config.query_parameters or {})
+        if name.endswith("_timestamp")
+    ]
+
+    if bucket and any(name not in query_parameters for name in timestamps):
+        key += (int(time.time() // bucket),)
+
+    return query_parameters, key
+
+
+def _align_timestamp(name: str, value: int, bucket: int) -> int:
+    if name.startswith("end"):
+        return value + (-value) % bucket
+
+    return value - value % bucket
+
+
+def cache_ttl(handler_config: ComponentConfiguration) -> float:
+    if handler_config.cache is None:
+        return 0
+
+    return schedule_string_to_time_delta(handler_config.cache.ttl).total_seconds()
+
+
+def _bucket_seconds(handler_config: ComponentConfiguration) -> Optional[int]:
+    if handler_config.cache is None:
+        return None
+
+    return int(
+        schedule_string_to_time_delta(
+            handler_config.cache.bucket or handler_config.cache.ttl
+        ).total_seconds()
+    )
+
+
+class ResponseCache:
+    """
+    In-memory cache of the handlers' encoded responses.
+
+    Entries expire after the TTL of their handler and the least recently used ones are
+    evicted once the cached bodies exceed max_bytes (compressed variants added after an
+    entry is stored are not counted). Concurrent requests for the same key
+    wait for the first one instead of running the handler again, whether or not the
+    handler is cached. Must be used from a single event loop.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.metrics: Dict[str, CacheMetrics] = defaultdict(CacheMetrics)
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._size = 0
+
+    async def get_or_compute(
+        self,
+        handler_name: str,
+        key: Hashable,
+        ttl: float,
+        compute: Callable[[], Awaitable[HandlerResponse]],
+    ) -> HandlerResponse:
+        """
+        Get the response for a key, computing it if it is not cached.
+        :param handler_name: The handler name, used for the metrics
+        :param key: The cache key
+        :param ttl: Seconds the response stays cached, 0 to not cache it
+        :param compute: Coroutine function computing the response
+        :return: The response
+        """
+        metrics = self.metrics[handler_name]
+        value = self.peek(key)
+
+        if value is not None:
+            metrics.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+        in_flight = self._in_flight.get(key)
+
+        if in_flight is not None:
+            metrics.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        metrics.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other request is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if ttl > 0:
+                self._store(key, value, ttl)
+        finally:
+            del self._in_flight[key]
+
+        return value
+
+    def peek(self, key: Hashable) -> Optional[HandlerResponse]:
+        """
+        Get the cached response for a key, if any, without computing it.
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        return value
+
+    def report(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "handlers": {name: asdict(metrics) for name, metrics in self.metrics.items()},
+        }
+
+    def _store(self, key: Hashable, value: HandlerResponse, ttl: float):
+        size = value.size
+
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self._size += size
+
+        while self._size > self.max_bytes:
+            evicted_key = next(iter(self._entries))
+            self._remove(evicted_key)
+            # Keys start with the handler name
+            self.metrics[evicted_key[0]].evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, value, size = self._entries.pop(key)
+        self._size -= size
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import brotli
+
+# Bodies smaller than this are not worth compressing, in bytes
+MIN_COMPRESSED_SIZE = 1024
+
+# Supported content encodings, by order of preference
+ENCODINGS = ("br", "gzip")
+
+# Media types of the responses of "table" handlers, by order of preference; JSON first
+# so that clients not asking for a binary format get one they can read
+TABLE_MEDIA_TYPES = (
+    "application/json",
+    "application/vnd.apache.arrow.stream",
+    "application/vnd.apache.parquet",
+)
+# Media types whose bodies are already compressed
+COMPRESSED_MEDIA_TYPES = ("application/vnd.apache.parquet",)
+
+
+@dataclass
+class HandlerResponse:
+    """
+    A handler response: the encoded body (None when the handler found no data), its strong
+    ETag and the compressed variants of the body computed so far.
+    """
+
+    body: Optional[bytes]
+    etag: Optional[str] = None
+    compressed: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body or b"") + sum(map(len, self.compressed.values()))
+
+    def representation_etag(self, encoding: str) -> Optional[str]:
+        """
+        Strong ETags identify a representation, so each content encoding gets its own.
+        """
+        if self.etag is None or encoding == "identity":
+            return self.etag
+
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+def strong_etag(
+    handler_name: str,
+    query_parameters: dict,
+    fingerprint: str,
+    media_type: Optional[str] = None,
+) -> str:
+    """
+    Compute the strong ETag of a handler response from the fingerprint of the data it is
+    built from.
+    :param handler_name: The handler name
+    :param query_parameters: The query parameters the handler is run with
+    :param fingerprint: The fingerprint of the data (see Handler.fingerprint)
+    :param media_type: The negotiated media type, for handlers with several of them
+    :return: The quoted ETag
+    """
+    digest = hashlib.md5(
+        f"{handler_name}?{sorted(query_parameters.items())}|{fingerprint}"
+        f"{'|' + media_type if media_type else ''}".encode("utf8")
+    ).hexdigest()
+
+    return f'"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], response: HandlerResponse) -> bool:
+    """
+    Check an If-None-Match header against a response, using the weak comparison.
+    """
+    if not if_none_match or response.etag is None:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = {
+        response.etag,
+        *(response.representation_etag(encoding) for encoding in ENCODINGS),
+    }
+
+    return any(
+        tag.strip().removeprefix("W/") in candidates for tag in if_none_match.split(",")
+    )
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Choose the content encoding of a response from the Accept-Encoding request header.
+    :param accept_encoding: The Accept-Encoding header, if any
+    :return: One of ENCODINGS, or "identity"
+    """
+    if not accept_encoding:
+        return "identity"
+
+    accepted = _parse_qualities(accept_encoding)
+
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+
+    return "identity"
+
+
+def negotiate_media_type(accept: Optional[str], offered: tuple) -> Optional[str]:
+    """
+    Choose the media type of a response from the Accept request header.
+    :param accept: The Accept header, if any
+    :param offered: The media types the response can be encoded in, by order of preference
+    :return: The accepted media type with the highest quality, or None if none is
+    accepted. On ties, a media type named by the header is preferred to one matching a
+    wildcard, then the first offered one, which is also the one without Accept header
+    """
+    if not accept:
+        return offered[0]
+
+    accepted = _parse_qualities(accept)
+
+    def quality(media_type: str) -> Tuple[float, int]:
+        main_type = media_type.split("/")[0]
+
+        for specificity, name in enumerate((media_type, f"{main_type}/*", "*/*")):
+            if name in accepted:
+                return accepted[name], -specificity
+
+        return 0, 0
+
+    best = max(offered, key=quality)
+
+    return best if quality(best)[0] > 0 else None
+
+
+def _parse_qualities(header: str) -> Dict[str, float]:
+    """
+    Parse the items of an Accept-like header with their quality values.
+    """
+    accepted = {}
+
+    for item in header.split(","):
+        name, *parameters = item.strip().split(";")
+        quality = 1.0
+        for parameter in parameters:
+            parameter = parameter.strip()
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    return accepted
+
+
+def compressed_body(response: HandlerResponse, encoding: str) -> bytes:
+    """
+    Get the body of a response in a content encoding, compressing it on first use.
+    """
+    if encoding == "identity":
+        return response.body
+
+    if encoding not in response.compressed:
+        if encoding == "br":
+            response.compressed[encoding] = brotli.compress(response.body, quality=5)
+        else:
+            response.compressed[encoding] = gzip.compress(response.body, compresslevel=6)
+
+    return response.compressed[encoding]
+
+
+def is_compressible(
+    response: HandlerResponse, data_type: str, media_type: Optional[str] = None
+) -> bool:
+    return (
+        data_type != "binary"
+        and media_type not in COMPRESSED_MEDIA_TYPES
+        and response.body is not None
+        and len(response.body) >= MIN_COMPRESSED_SIZE
+    )
@@ -1,8 +1,18 @@
+import signal
+import sys
 from datetime import timedelta
 
 import schedule
 
 
+def exit_on_sigterm():
+    """
+    Make SIGTERM exit the process like sys.exit, so that it runs its cleanup (finally
+    blocks) when it is terminated.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
 def schedule_string_to_function(schedule_string):
     """
     Convert a schedule string to a schedule.
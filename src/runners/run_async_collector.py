@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import signal
+from datetime import datetime
+from typing import Dict, List, Set
+
+import schedule
+from sqlalchemy import Table
+
+from src.configuration.model import ComponentConfiguration
+from src.data.partition import maintain_partitions
+from src.data.write import write_result, BufferedResultWriter
+from src.runners._utils import schedule_string_to_function
+from src.utilities.http import AsyncHttpClient
+
+logger = logging.getLogger("Collector")
+
+# Seconds the running collectors are given to finish when stopping, before being cancelled
+SHUTDOWN_TIMEOUT = 30
+
+
+def run_async_collectors_on_schedule(
+    collector_configs: List[ComponentConfiguration],
+    tables: Dict[str, Table],
+    fail_on_error: bool = False,
+):
+    """
+    Run async collectors on their schedule, all in the same event loop and sharing the
+    same HTTP client.
+    :param collector_configs: The async collectors configurations
+    :param tables: The tables (collector name to table object (SQLAlchemy))
+    :param fail_on_error: Whether to fail on error
+    """
+    asyncio.run(_run_on_schedule(collector_configs, tables, fail_on_error))
+
+
+def run_async_collectors(
+    collector_configs: List[ComponentConfiguration],
+    tables: Dict[str, Table],
+    fail_on_error: bool = True,
+):
+    """
+    Run async collectors once, concurrently.
+    :param collector_configs: The async collectors configurations
+    :param tables: The tables (collector name to table object (SQLAlchemy))
+    :param fail_on_error: Whether to fail on error
+    :return: The results of the collectors
+    """
+    return asyncio.run(_run_once(collector_configs, tables, fail_on_error))
+
+
+async def run_async_collector(
+    collector_config: ComponentConfiguration,
+    table: Table,
+    client: AsyncHttpClient,
+    fail_on_error: bool = True,
+    writer: BufferedResultWriter = None,
+):
+    """
+    Run an async collector.
+    :param collector_config: The collector configuration
+    :param table: The table to insert the data into
+    :param client: The HTTP client shared by the collectors
+    :param fail_on_error: Whether to fail on error
+    :param writer: The write-behind writer of the collector, if any
+    """
+    logger.debug(f"Running collector {collector_config.name}")
+
+    try:
+        collector = collector_config.component(client)
+        result = await collector.run()
+
+        # Storage and database writes are blocking, keep them off the event loop.
+        # Queuing can also block, when the write-behind queue is full
+        if result is not None and writer is not None:
+            await asyncio.to_thread(writer.write, result, datetime.now())
+        elif result is not None:
+            await asyncio.to_thread(
+                write_result, collector_config, table, result, datetime.now()
+            )
+
+        return result
+    except Exception as e:
+        logger.exception(
+            f"Error running collector {collector_config.name}, stopped with error: {e}"
+        )
+        if fail_on_error:
+            raise e
+
+
+async def _run_once(
+    collector_configs: List[ComponentConfiguration],
+    tables: Dict[str, Table],
+    fail_on_error: bool,
+):
+    async with AsyncHttpClient() as client:
+        return await asyncio.gather(
+            *(
+                run_async_collector(config, tables[config.name], client, fail_on_error)
+                for config in collector_configs
+            )
+        )
+
+
+async def _run_on_schedule(
+    collector_configs: List[ComponentConfiguration],
+    tables: Dict[str, Table],
+    fail_on_error: bool,
+):
+    running: Dict[str, asyncio.Task] = {}
+    # Keep references to the tasks until they are done
+    tasks: Set[asyncio.Task] = set()
+    writers = {
+        collector_config.name: BufferedResultWriter(
+            collector_config, tables[collector_config.name]
+        )
+        for collector_config in collector_configs
+        if collector_config.write_behind
+    }
+
+    def spawn(collector_config: ComponentConfiguration, client: AsyncHttpClient):
+        previous = running.get(collector_config.name)
+
+        if previous is not None and not previous.done():
+            logger.warning(
+                f"Collector {collector_config.name} is still running, skipping this run"
+            )
+            return
+
+        task = asyncio.get_running_loop().create_task(
+            run_async_collector(
+                collector_config,
+                tables[collector_config.name],
+                client,
+                fail_on_error,
+                writers.get(collector_config.name),
+            )
+        )
+        running[collector_config.name] = task
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def maintain(collector_config: ComponentConfiguration):
+        task = asyncio.get_running_loop().create_task(
+            asyncio.to_thread(
+                maintain_partitions,
+                tables[collector_config.name],
+                collector_config.partition,
+            )
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # Stop the loop on SIGTERM, then write what the write-behind queues still hold
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel
+    )
+
+    try:
+        async with AsyncHttpClient() as client:
+            for collector_config in collector_configs:
+                logger.info(
+                    f"Running collector {collector_config.name} on schedule: {collector_config.schedule}"
+                )
+                job = schedule_string_to_function(collector_config.schedule)
+                job.do(spawn, collector_config, client)
+
+                if collector_config.partition is not None:
+                    schedule.every().day.do(maintain, collector_config)
+
+            try:
+                while True:
+                    schedule.run_pending()
+                    await asyncio.sleep(1)
+            finally:
+                # Their results go to the writers, which are closed next
+                await _stop_tasks(tasks)
+    finally:
+        for writer in writers.values():
+            await asyncio.to_thread(writer.close)
+
+
+async def _stop_tasks(tasks: Set[asyncio.Task], timeout: float = SHUTDOWN_TIMEOUT):
+    """
+    Wait for running tasks to finish, cancelling those still running after timeout.
+    """
+    tasks = set(tasks)
+
+    if not tasks:
+        return
+
+    logger.info(f"Waiting for {len(tasks)} running tasks")
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+
+    for task in pending:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -6,8 +6,9 @@ import schedule
 from sqlalchemy import Table
 
 from src.configuration.model import ComponentConfiguration
-from src.data.write import write_result
-from src.runners._utils import schedule_string_to_function
+from src.data.partition import maintain_partitions
+from src.data.write import write_result, BufferedResultWriter
+from src.runners._utils import schedule_string_to_function, exit_on_sigterm
 
 logger = logging.getLogger("Collector")
 
@@ -28,21 +29,38 @@ def run_collector_on_schedule(
 
     job = schedule_string_to_function(collector_config.schedule)
 
-    job.do(run_collector, collector_config, table, fail_on_error)
+    writer = None
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    if collector_config.write_behind:
+        writer = BufferedResultWriter(collector_config, table)
+        exit_on_sigterm()
+
+    job.do(run_collector, collector_config, table, fail_on_error, writer)
+
+    if collector_config.partition is not None:
+        schedule.every().day.do(maintain_partitions, table, collector_config.partition)
+
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+    finally:
+        if writer is not None:
+            writer.close()
 
 
 def run_collector(
-    collector_config: ComponentConfiguration, table: Table, fail_on_error: bool = True
+    collector_config: ComponentConfiguration,
+    table: Table,
+    fail_on_error: bool = True,
+    writer: BufferedResultWriter = None,
 ):
     """
     Run a collector.
     :param collector_config: The collector configuration
     :param table: The table to insert the data into
     :param fail_on_error: Whether to fail on error
+    :param writer: The write-behind writer of the collector, if any
     """
     logger.debug(f"Running collector {collector_config.name}")
 
@@ -50,7 +68,9 @@ def run_collector(
         collector = collector_config.component()
         result = collector.run()
 
-        if result is not None:
+        if result is not None and writer is not None:
+            writer.write(result, datetime.now())
+        elif result is not None:
             write_result(collector_config, table, result, datetime.now())
 
         return result
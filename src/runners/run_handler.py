@@ -1,15 +1,42 @@
-import http.server
+import asyncio
 import json
 import logging
-from socketserver import ThreadingMixIn
-from typing import Dict, List
-
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import polars
+import pyarrow as pa
+import pyarrow.parquet as pq
+import uvicorn
 from sqlalchemy import Table
 
+from src.components import HandlerRequestError
 from src.configuration.model import ComponentConfiguration
+from src.runners._cache import ResponseCache, normalize_query_parameters, cache_ttl
+from src.runners._response import (
+    HandlerResponse,
+    strong_etag,
+    body_etag,
+    etag_matches,
+    negotiate_encoding,
+    negotiate_media_type,
+    compressed_body,
+    is_compressible,
+    TABLE_MEDIA_TYPES,
+)
 
 logger = logging.getLogger("Handler")
 
+# Size of the chunks in which response bodies are sent
+RESPONSE_CHUNK_SIZE = 64 * 1024
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 15
+# Maximum number of connections before the server answers 503
+MAX_CONNECTIONS = 1024
+# Path of the endpoint reporting the response cache metrics
+METRICS_PATH = "/_metrics"
+
 
 def _treat_query_parameters(
     query_parameters: Dict[str, str], component: ComponentConfiguration
@@ -30,91 +57,333 @@ def _treat_query_parameters(
     return True, result
 
 
-class ThreadedHTTPServer(ThreadingMixIn, http.server.HTTPServer):
-    pass
+def _encode_result(result, data_type: str, media_type: str = None) -> bytes:
+    if data_type == "table":
+        return _encode_table(result, media_type)
+    elif data_type == "json" and isinstance(result, bytes):
+        # Already encoded by the handler
+        return result
+    elif data_type == "json":
+        return json.dumps(result).encode("utf8")
+    elif data_type == "binary":
+        return result
+
+    return result.encode("utf8")
+
+
+def _encode_table(table: pa.Table, media_type: str) -> bytes:
+    if media_type == "application/vnd.apache.arrow.stream":
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    elif media_type == "application/vnd.apache.parquet":
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink, compression="zstd")
+        return sink.getvalue().to_pybytes()
+
+    # An array of objects, one per row
+    return polars.from_arrow(table).write_json().encode("utf8")
+
+
+def _content_type(data_type: str, media_type: str = None) -> str:
+    if media_type is not None:
+        return media_type
+    elif data_type == "json":
+        return "application/json"
+    elif data_type == "binary":
+        return "application/octet-stream"
+
+    return "text/plain"
+
 
+class HandlerApplication:
+    """
+    ASGI application serving the handlers.
+
+    Handlers are run, and their results encoded, in a pool of worker threads so that the
+    event loop stays free to serve other requests. At most `workers` handlers run at the
+    same time, other requests wait for a free worker. Responses go through a cache, see
+    ResponseCache. Response bodies are sent in chunks, following the pace at which the
+    client reads them.
+
+    Responses are compressed according to the Accept-Encoding header and carry a strong
+    ETag. The ETag comes from Handler.fingerprint when the handler supports it, so that
+    conditional requests are answered with a 304 without running the handler, and from
+    the body otherwise.
+
+    Handlers of the "table" data type return an Arrow table, which is encoded as JSON, an
+    Arrow IPC stream or Parquet according to the Accept header (see TABLE_MEDIA_TYPES),
+    or answered with a 406 if none of them is accepted. JSON is the default.
+
+    A handler refusing a request raises a HandlerRequestError, which is answered with its
+    status and message.
+    """
 
-class HttpRequestHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(
         self,
-        *args,
-        allowed_hosts: List[str],
         handlers: Dict[str, ComponentConfiguration],
         tables: Dict[str, Table],
-        **kwargs,
+        allowed_hosts: List[str],
+        workers: int = 8,
     ):
-        self.allowed_hosts = allowed_hosts
-        self.tables = tables
         self.handlers = handlers
+        self.tables = tables
+        self.allowed_hosts = allowed_hosts
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="Handler"
+        )
+        self.cache = ResponseCache()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._workers = workers
 
-        super().__init__(*args, **kwargs)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
 
-    def check_client_address(self):
-        host = self.client_address[0]
-        if host not in self.allowed_hosts:
-            self.log_error(f"FORBIDDEN: {host} not in {self.allowed_hosts}")
-            self.send_error(403, "Forbidden")
-            return False
-        return True
+        host = scope["client"][0] if scope.get("client") else None
 
-    def do_GET(self):
-        if not self.check_client_address():
+        if host not in self.allowed_hosts:
+            logger.error(f"FORBIDDEN: {host} not in {self.allowed_hosts}")
+            await self._send_error(send, 403, "Forbidden")
             return
 
-        # Extract handler name from path (split at query parameters)
-        handler_name = self.path[1:]
-        query_parameters_string = None
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_error(send, 405, "Method Not Allowed")
+            return
 
-        if "?" in handler_name:
-            handler_name, query_parameters_string = handler_name.split("?")
+        if scope["path"] == METRICS_PATH:
+            await self._send_body(
+                send,
+                200,
+                [(b"content-type", b"application/json")],
+                json.dumps(self.cache.report()).encode("utf8"),
+            )
+            return
 
+        # Extract handler name from path
+        handler_name = scope["path"][1:]
         handler_config = self.handlers.get(handler_name, None)
 
         if handler_config is None:
-            self.send_error(404, "Not Found")
+            await self._send_error(send, 404, "Not Found")
             return
 
-        # Extract query parameters from path
+        # Extract query parameters from the query string
         success, query_parameters = _treat_query_parameters(
-            dict(
-                parameter.split("=") for parameter in query_parameters_string.split("&")
-            )
-            if query_parameters_string
-            else {},
+            dict(parse_qsl(scope["query_string"].decode("latin-1"))),
             handler_config,
         )
 
         if not success:
-            self.send_error(400, "Bad Request")
+            await self._send_error(send, 400, "Bad Request")
             return
 
-        self.send_response(200)
+        query_parameters, cache_key = normalize_query_parameters(
+            handler_config, query_parameters
+        )
+
+        request_headers = dict(scope["headers"])
+
+        media_type = None
+        vary = [b"Accept-Encoding"]
+
+        if handler_config.data_type == "table":
+            media_type = negotiate_media_type(
+                request_headers.get(b"accept", b"").decode("latin-1"),
+                TABLE_MEDIA_TYPES,
+            )
+
+            if media_type is None:
+                await self._send_error(send, 406, "Not Acceptable")
+                return
+
+            cache_key += (media_type,)
+            vary.insert(0, b"Accept")
+
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        encoding = negotiate_encoding(
+            request_headers.get(b"accept-encoding", b"").decode("latin-1")
+        )
 
+        try:
+            if if_none_match and self.cache.peek(cache_key) is None:
+                etag = await self._run_in_worker(
+                    self._etag, handler_config, query_parameters, media_type
+                )
+                if etag_matches(if_none_match, HandlerResponse(None, etag)):
+                    await self._send_not_modified(send, etag, vary)
+                    return
+
+            response = await self.cache.get_or_compute(
+                handler_name,
+                cache_key,
+                cache_ttl(handler_config),
+                lambda: self._run_in_worker(
+                    self._execute, handler_config, query_parameters, media_type
+                ),
+            )
+
+            if response.body is None:
+                await self._send_error(
+                    send, 404, "No data found for this specific query"
+                )
+                return
+
+            if etag_matches(if_none_match, response):
+                await self._send_not_modified(send, response.etag, vary)
+                return
+
+            headers = [
+                (
+                    b"content-type",
+                    _content_type(handler_config.data_type, media_type).encode(),
+                )
+            ]
+
+            if not is_compressible(response, handler_config.data_type, media_type):
+                encoding = "identity"
+                vary.remove(b"Accept-Encoding")
+
+            if vary:
+                headers.append((b"vary", b", ".join(vary)))
+
+            if encoding not in response.compressed and encoding != "identity":
+                await self._run_in_worker(compressed_body, response, encoding)
+
+            if encoding != "identity":
+                headers.append((b"content-encoding", encoding.encode()))
+
+            headers.append(
+                (b"etag", response.representation_etag(encoding).encode("latin-1"))
+            )
+        except HandlerRequestError as e:
+            await self._send_error(send, e.status, str(e))
+            return
+        except Exception as e:
+            logger.exception(f"Handler {handler_name} failed: {e}")
+            await self._send_error(send, 500, "Internal Server Error")
+            return
+
+        await self._send_body(
+            send,
+            200,
+            headers,
+            compressed_body(response, encoding),
+            head=scope["method"] == "HEAD",
+        )
+
+    def _execute(
+        self,
+        handler_config: ComponentConfiguration,
+        query_parameters: dict,
+        media_type: str = None,
+    ) -> HandlerResponse:
         logger.debug(
-            f"Executing handler {handler_name} with parameters {query_parameters}"
+            f"Executing handler {handler_config.name} with parameters {query_parameters}"
         )
 
-        # Execute handler
-        result = handler_config.component(self.tables).run(**query_parameters)
+        handler = handler_config.component(self.tables)
+
+        # The fingerprint is taken before running the handler, so that data arriving in
+        # between can only make the ETag stale, never wrongly match a newer body
+        fingerprint = handler.fingerprint(**query_parameters)
+
+        result = handler.run(**query_parameters)
 
         if result is None:
-            self.send_error(404, "No data found for this specific query")
+            return HandlerResponse(None)
+
+        body = _encode_result(result, handler_config.data_type, media_type)
+
+        return HandlerResponse(
+            body,
+            (
+                strong_etag(
+                    handler_config.name, query_parameters, fingerprint, media_type
+                )
+                if fingerprint is not None
+                else body_etag(body)
+            ),
+        )
+
+    def _etag(
+        self,
+        handler_config: ComponentConfiguration,
+        query_parameters: dict,
+        media_type: str = None,
+    ) -> Optional[str]:
+        fingerprint = handler_config.component(self.tables).fingerprint(
+            **query_parameters
+        )
+
+        if fingerprint is None:
+            return None
+
+        return strong_etag(
+            handler_config.name, query_parameters, fingerprint, media_type
+        )
+
+    async def _run_in_worker(self, function, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._workers)
+
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, function, *args
+            )
+
+    @staticmethod
+    async def _send_body(send, status: int, headers: list, body: bytes, head=False):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [*headers, (b"content-length", str(len(body)).encode())],
+            }
+        )
+
+        if head:
+            await send({"type": "http.response.body", "body": b""})
             return
 
-        if handler_config.data_type == "json":
-            self.send_header("Content-type", "text/json")
-            self.end_headers()
-            self.wfile.write(bytes(json.dumps(result), "utf8"))
-        elif handler_config.data_type == "binary":
-            self.send_header("Content-type", "application/octet-stream")
-            self.end_headers()
-            self.wfile.write(result)
-        else:
-            self.send_header("Content-type", "text/plain")
-            self.end_headers()
-            self.wfile.write(bytes(result, "utf8"))
+        view = memoryview(body)
 
-        return True
+        # Each send waits for the transport to drain, so slow clients are not buffered
+        for start in range(0, len(view), RESPONSE_CHUNK_SIZE):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": bytes(view[start : start + RESPONSE_CHUNK_SIZE]),
+                    "more_body": start + RESPONSE_CHUNK_SIZE < len(view),
+                }
+            )
+
+        if not view:
+            await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _send_not_modified(send, etag: str, vary: List[bytes]):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [
+                    (b"etag", etag.encode("latin-1")),
+                    (b"vary", b", ".join(vary)),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+    @classmethod
+    async def _send_error(cls, send, status: int, message: str):
+        await cls._send_body(
+            send,
+            status,
+            [(b"content-type", b"text/plain; charset=utf-8")],
+            message.encode("utf8"),
+        )
 
 
 def run_handlers(
@@ -123,23 +392,27 @@ def run_handlers(
     ip: str = "localhost",
     port: int = 8888,
     allowed_hosts: List[str] = None,
+    workers: int = 8,
 ):
     if allowed_hosts is None:
         allowed_hosts = ["localhost", "127.0.0.1"]
 
-    server_address = (ip, port)
-
-    httpd = ThreadedHTTPServer(
-        server_address,
-        lambda *args, **kwargs: HttpRequestHandler(
-            *args,
-            allowed_hosts=allowed_hosts,
-            handlers=handler_configurations,
-            tables=tables,
-            **kwargs,
-        ),
+    application = HandlerApplication(
+        handler_configurations, tables, allowed_hosts, workers=workers
     )
 
     logger.info(f"Running handlers on {ip}:{port}")
 
-    httpd.serve_forever()
+    try:
+        uvicorn.run(
+            application,
+            host=ip,
+            port=port,
+            lifespan="off",
+            log_config=None,
+            access_log=False,
+            timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+            limit_concurrency=MAX_CONNECTIONS,
+        )
+    finally:
+        application.executor.shutdown(cancel_futures=True)
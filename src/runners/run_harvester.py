@@ -1,3 +1,4 @@
+import itertools
 import logging
 import time
 from datetime import datetime, timedelta
@@ -12,8 +13,9 @@ from src.data.retrieve import (
     retrieve_between_datetime,
     retrieve_latest_rows_before_datetime,
     retrieve_first_row,
+    iter_between_datetime,
 )
-from src.data.write import write_result
+from src.data.write import write_result, write_results
 
 ZERO_DATE = datetime(1970, 1, 1)
 
@@ -62,24 +64,28 @@ def source_range_to_period_and_limit(
     if "d" in source_range:
         days = int(source_range.replace("d", ""))
         # Round latest date to the previous period
+        latest_date = latest_date.replace(hour=0, minute=0, second=0, microsecond=0)
         latest_date = latest_date - timedelta(days=latest_date.day % days)
         return latest_date, latest_date + timedelta(days=days), None
 
     elif "h" in source_range:
         hours = int(source_range.replace("h", ""))
         # Round latest date to the previous period
+        latest_date = latest_date.replace(minute=0, second=0, microsecond=0)
         latest_date = latest_date - timedelta(hours=latest_date.hour % hours)
         return latest_date, latest_date + timedelta(hours=hours), None
 
     elif "m" in source_range:
         minutes = int(source_range.replace("m", ""))
         # Round latest date to the previous period
+        latest_date = latest_date.replace(second=0, microsecond=0)
         latest_date = latest_date - timedelta(minutes=latest_date.minute % minutes)
         return latest_date, latest_date + timedelta(minutes=minutes), None
 
     elif "s" in source_range:
         seconds = int(source_range.replace("s", ""))
         # Round latest date to the previous period
+        latest_date = latest_date.replace(microsecond=0)
         latest_date = latest_date - timedelta(seconds=latest_date.second % seconds)
         return latest_date, latest_date + timedelta(seconds=seconds), None
 
@@ -112,17 +118,34 @@ def run_harvester(
         latest_date, harvester_config.source_range
     )
 
-    source_data = retrieve_between_datetime(source_table, start_date, end_date, limit)
+    if end_date and not retrieve_after_datetime(source_table, end_date, 1):
+        return False  # No new data to harvest, still building the same period
+
+    if end_date:
+        # A period can hold any number of rows, they are streamed to the harvester
+        source_data = iter_between_datetime(source_table, start_date, end_date)
+        first = next(source_data, None)
+
+        if first is None:
+            # Nothing was collected during the period, record it as empty to move on
+            write_result(harvester_config, table, None, end_date)
+            return True
+
+        source_data = itertools.chain([first], source_data)
+
+        if harvester_config.multiple_results:
+            source_data = list(source_data)
+    else:
+        source_data = retrieve_between_datetime(
+            source_table, start_date, end_date, limit
+        )
 
-    if not source_data:
-        return False  # No new data to harvest
+        if not source_data:
+            return False  # No new data to harvest
 
     if limit and harvester_config.source_range_strict and len(source_data) < limit:
         return False  # No new data to harvest, still building the amount of data specified by the limit
 
-    if end_date and not retrieve_after_datetime(table, latest_date, 1):
-        return False  # No new data to harvest, still building the same period
-
     storage_date = end_date or source_data[-1].date
 
     if limit == 1 and not end_date:
@@ -153,8 +176,11 @@ def run_harvester(
     result = harvester.run(source_data, **dependencies_data)
 
     if harvester_config.multiple_results:
-        for item, source in zip(result, source_data):
-            write_result(harvester_config, table, item, source.date)
+        write_results(
+            harvester_config,
+            table,
+            [(item, source.date) for item, source in zip(result, source_data)],
+        )
     elif result is not None:
         write_result(harvester_config, table, result, storage_date)
     else:
@@ -1,24 +1,36 @@
-import concurrent.futures
+import json
 import logging
+import multiprocessing
 import time
-from datetime import timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, nullcontext
+from datetime import datetime, timedelta
 from io import BytesIO
-from typing import Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
 
 import polars
 import pyarrow as pa
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
-import requests
 from jsonschema.exceptions import ValidationError
-from jsonschema.validators import validate
-from sqlalchemy import Table, select, column
+from sqlalchemy import Table, select, column, extract
 
 from src.configuration.model import (
     ComponentConfiguration,
+    ComponentParquetizeConfig,
     ComponentParquetizeGroupConfig,
 )
+from src.data.bulk import bulk_insert
 from src.data.engine import engine
+from src.data.partition import (
+    detach_parquetized_partitions,
+    drop_detached_partitions,
+)
+from src.data.retention import retention_cutoff, apply_retention
 from src.data.storage import storage_manager
+from src.utilities.json_schema import CompiledSchema
 from src.runners._utils import (
     schedule_string_to_time_delta,
     round_datetime_to_previous_delta,
@@ -26,17 +38,60 @@ from src.runners._utils import (
 
 logger = logging.getLogger("Parquetize")
 
+# Snapshots downloaded ahead of the one being converted
+PARQUETIZE_PREFETCH = 8
+# Rows and uncompressed bytes per row group of the batch files, converted snapshots are
+# buffered until either is reached
+PARQUETIZE_ROW_GROUP_SIZE = 64 * 1024
+PARQUETIZE_ROW_GROUP_BYTES = 32 * 1024 * 1024
+
+# Format of the dates in the names of the parquetize files
+PARQUETIZE_DATE_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# Name of the manifests of the dataset of a component, at its root and in its partitions
+DATASET_MANIFEST = "_manifest.json"
+
+# Schemas of the components, compiled on their first batch
+_COMPILED_SCHEMAS: Dict[str, CompiledSchema] = {}
+# Components whose manifests have all been written by this process, only the manifests
+# of the partitions changed by a run are written afterwards
+_WRITTEN_MANIFESTS: Set[str] = set()
+
 
 def run_parquetize_on_schedule(
     component_config: ComponentConfiguration,
     tables: Dict[str, Table],
+    workers: int = 1,
 ):
     logger.info("Running parquetize on schedule")
 
     while True:
         logger.debug(f"Running parquetize {component_config.name}")
         try:
-            run_parquetize(component_config, tables)
+            run_parquetize(component_config, tables, workers)
+
+            cutoff = None
+            if component_config.retention is not None:
+                cutoff = retention_cutoff(
+                    tables[component_config.parquetize_name],
+                    schedule_string_to_time_delta(component_config.retention.keep),
+                )
+                if cutoff is not None:
+                    apply_retention(
+                        component_config, tables[component_config.name], cutoff
+                    )
+
+            partition_config = component_config.partition
+            if partition_config is not None and partition_config.detach_parquetized:
+                # With a retention policy, partitions are only detached once emptied by it
+                detach_parquetized_partitions(
+                    tables[component_config.name],
+                    tables[component_config.parquetize_name],
+                    partition_config,
+                    until=cutoff,
+                )
+                drop_detached_partitions(
+                    component_config, tables[component_config.name]
+                )
         except Exception as e:
             logger.exception(f"Parquetize {component_config.name} failed: {e}")
             time.sleep(60)
@@ -47,13 +102,20 @@ def run_parquetize_on_schedule(
 def run_parquetize(
     component_config: ComponentConfiguration,
     tables: Dict[str, Table],
+    workers: int = 1,
 ):
     """
     Run the "Parquetize" process. The idea is to convert the data from the source table to a parquet file, to
     group the data by a specific column and to save the schema of the data.
 
+    With more than one worker, the periods to batch are converted, compressed and uploaded
+    by a pool of processes, while this process records them in the parquet table in order.
+    Groups are streamed from the files of their previous level by this process. The parquet table then always covers a continuous
+    range of periods, so an interrupted run resumes where it stopped.
+
     :param component_config: The component configuration
     :param tables: The tables
+    :param workers: The number of processes
     """
 
     parquetize_config = component_config.parquetize
@@ -67,7 +129,7 @@ def run_parquetize(
 
     logger.info(f"Running parquetize {component_config.name}")
 
-    with engine.connect() as connection:
+    with _parquetize_executor(workers) as executor, engine.connect() as connection:
         delta = schedule_string_to_time_delta(parquetize_config.batch)
 
         latest_parquet = connection.execute(
@@ -91,10 +153,8 @@ def run_parquetize(
         ).fetchone()[1]
 
         period_start = round_datetime_to_previous_delta(latest_date, delta)
+        periods = []
         while True:
-            logger.info(
-                f"Processing period {period_start} - {period_start + delta} for batching"
-            )
             period_end = period_start + delta
 
             if period_end > end_date:
@@ -103,18 +163,35 @@ def run_parquetize(
                 )
                 break
 
-            _generate_batch(
-                component_config,
-                connection,
-                parquet_table,
-                period_end,
-                period_start,
-                source,
-            )
-
+            periods.append((period_start, period_end))
             period_start = period_end
 
-    with engine.connect() as connection:
+        batches = _map_ordered(
+            executor,
+            2 * workers,
+            _generate_batch,
+            (
+                (
+                    component_config.name,
+                    component_config.parquetize_name,
+                    parquetize_config,
+                    _period_snapshots(connection, source, period_start, period_end),
+                    period_start,
+                    period_end,
+                )
+                for period_start, period_end in periods
+            ),
+            cleanup=lambda batch: storage_manager.delete(batch["data"]),
+        )
+
+        # The (aggregation, year) partitions of the dataset whose files change
+        changed = set()
+
+        with closing(batches):
+            for batch in batches:
+                _insert_batch(connection, parquet_table, batch)
+                changed.add((batch["aggregation"], batch["start_date"].year))
+
         for previous_group, group in zip(
             [ComponentParquetizeGroupConfig(group=parquetize_config.batch)]
             + parquetize_config.groups[:-1],
@@ -173,29 +250,56 @@ def run_parquetize(
                     break
 
                 _generate_group(
-                    component_config.name,
+                    component_config.parquetize_name,
                     previous_group,
                     group,
-                    parquetize_config.schema,
+                    parquetize_config,
                     connection,
                     parquet_table,
                     group_start,
                     group_end,
                 )
+                # Unkeyed groups delete the files of the previous level they compact
+                changed.add((group.group, group_start.year))
+                changed.update(
+                    (previous_group.group, year)
+                    for year in range(
+                        group_start.year,
+                        (group_end - timedelta(microseconds=1)).year + 1,
+                    )
+                )
 
                 group_start = group_end
 
+        _write_manifests(
+            component_config.parquetize_name,
+            connection,
+            parquet_table,
+            (
+                changed
+                if component_config.parquetize_name in _WRITTEN_MANIFESTS
+                else None
+            ),
+        )
+        _WRITTEN_MANIFESTS.add(component_config.parquetize_name)
+
 
 def _generate_group(
     parquetize_table: str,
     previous_group: ComponentParquetizeGroupConfig,
     group: ComponentParquetizeGroupConfig,
-    schema: dict,
+    parquetize_config: ComponentParquetizeConfig,
     connection,
     parquet_table,
     group_start,
     group_end,
 ):
+    if _is_recorded(connection, parquet_table, group_start, group.group):
+        logger.warning(
+            f"Group {group.group} {group_start} - {group_end} is already recorded"
+        )
+        return
+
     # Fetch data from the database within the specified date range
     data_query = (
         select(
@@ -206,7 +310,8 @@ def _generate_group(
             parquet_table.c.original_size,
         )
         .where(
-            parquet_table.c.start_date.between(group_start, group_end)
+            (parquet_table.c.start_date >= group_start)
+            & (parquet_table.c.start_date < group_end)
             & (column("aggregation") == previous_group.group)
         )
         .order_by(parquet_table.c.start_date.asc())
@@ -214,90 +319,66 @@ def _generate_group(
 
     data_rows = connection.execute(data_query).fetchall()
 
-    urls = [row[0] for row in data_rows]
-    # Retrieve content from each data source
-    datas = [BytesIO(requests.get(url).content) for url in urls]
-
-    table = None
+    if not data_rows:
+        logger.info(f"No {previous_group.group} data in {group_start} - {group_end}")
+        return
 
-    for data in datas:
-        if table is None:
-            table = pq.read_table(data)
-        else:
-            table = pa.concat_tables(
-                [table, pq.read_table(data)], promote=True, safe=False
-            )
+    urls = [row[0] for row in data_rows]
+    dataset = _group_dataset(storage_manager.read_many(urls, PARQUETIZE_PREFETCH))
 
-    total_row_count = table.num_rows
+    total_row_count = dataset.count_rows()
 
     if group.keys:
         # if table is empty, skip
         if total_row_count == 0:
             return
-        polars_df = polars.from_arrow(table)
-        for partitioned in polars_df.partition_by(*group.keys):
-            keys = partitioned.select(group.keys).unique()
-
-            filtered_table = partitioned.to_arrow()
 
-            filtered_row_count = filtered_table.num_rows
-            output = BytesIO()
-
-            pq.write_table(
-                filtered_table,
-                output,
-                compression="gzip",
-                use_dictionary=True,
-                compression_level=9,
-            )
-
-            keys_suffix = "_".join(
-                [f"{key}_{value[0]}" for key, value in zip(group.keys, keys)]
-            )
-            url = storage_manager.write(
-                f"{parquetize_table}/{group_start.strftime('%Y-%m-%d_%H-%M-%S')}_to_{group_end.strftime('%Y-%m-%d_%H-%M-%S')}_{keys_suffix}.parquet",
-                output.getvalue(),
-            )
+        files = _write_keyed_group_files(
+            dataset,
+            group.keys,
+            lambda keys: _dataset_path(
+                parquetize_table, group.group, group_start, group_end, keys
+            ),
+            parquetize_config,
+        )
 
-            original_size = (
+        rows = []
+        for keys, url, filtered_row_count, compressed_size in files:
+            # Rounded, as COPY does not cast it to the integer column like an INSERT
+            original_size = round(
                 sum([row[4] for row in data_rows])
                 / total_row_count
                 * filtered_row_count
             )
 
-            compressed_size = output.getbuffer().nbytes
-
-            connection.execute(
-                parquet_table.insert().values(
+            rows.append(
+                dict(
                     start_date=group_start,
                     end_date=group_end,
                     data=url,
                     count=filtered_row_count,
                     skipped=0,
-                    schema=schema,
+                    schema=parquetize_config.schema,
                     aggregation=group.group,
                     original_size=original_size,
                     compressed_size=compressed_size,
-                    keys={key: value[0] for key, value in zip(group.keys, keys)},
+                    keys=keys,
                 )
             )
+
+        # One row per key value, there can be thousands of them
+        bulk_insert(connection, parquet_table, rows)
     else:
-        output = BytesIO()
-        pq.write_table(
-            table,
-            output,
-            compression="gzip",
-            use_dictionary=True,
-            compression_level=9,
-        )
+        group_file = _GroupFile(dataset.schema, parquetize_config)
 
-        url = storage_manager.write(
-            f"{parquetize_table}/{group_start.strftime('%Y-%m-%d_%H-%M-%S')}_to_{group_end.strftime('%Y-%m-%d_%H-%M-%S')}.parquet",
-            output.getvalue(),
+        for batch in dataset.to_batches():
+            group_file.write(batch)
+
+        url, compressed_size = group_file.upload(
+            _dataset_path(parquetize_table, group.group, group_start, group_end)
         )
 
         original_size = sum([row[4] for row in data_rows])
-        compressed_size = output.getbuffer().nbytes
 
         connection.execute(
             parquet_table.insert().values(
@@ -306,7 +387,7 @@ def _generate_group(
                 data=url,
                 count=sum([row[2] for row in data_rows]),
                 skipped=sum([row[3] for row in data_rows]),
-                schema=schema,
+                schema=parquetize_config.schema,
                 aggregation=group.group,
                 original_size=original_size,
                 compressed_size=compressed_size,
@@ -317,7 +398,8 @@ def _generate_group(
         # Delete the processed data (period and batch)
         connection.execute(
             parquet_table.delete().where(
-                parquet_table.c.start_date.between(group_start, group_end)
+                (parquet_table.c.start_date >= group_start)
+                & (parquet_table.c.start_date < group_end)
                 & (column("aggregation") == previous_group.group)
             )
         )
@@ -330,78 +412,622 @@ def _generate_group(
             storage_manager.delete(url)
 
 
-def fetch_data(row):
-    response = requests.get(row[0])
-    return response, row[1]
+def _parquetize_executor(workers: int):
+    """
+    The process pool of run_parquetize. Its processes are started by a fork server rather
+    than forked from this process, so that they do not inherit the connections and the
+    sockets of the storage and database clients opened by then.
+    """
+    if workers > 1:
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        )
 
+    return nullcontext()
 
-def _generate_batch(
-    component_config, connection, parquet_table, period_end, period_start, source
+
+def _map_ordered(
+    executor: Optional[ProcessPoolExecutor],
+    window: int,
+    function,
+    arguments: Iterable[tuple],
+    cleanup: Optional[Callable] = None,
+) -> Iterator:
+    """
+    Apply a function to each tuple of arguments in a process pool, yielding the results
+    in order. At most `window` calls are submitted ahead of the result being consumed, so
+    that the arguments are only built when needed. Without executor, the function is run
+    in this process.
+
+    When a result raises, or the consumer stops (the iterator is closed), the calls
+    submitted ahead are cancelled, and the results of those already run are passed to
+    cleanup, for instance to delete the files they wrote.
+    """
+    if executor is None:
+        for args in arguments:
+            yield function(*args)
+        return
+
+    pending = deque()
+
+    try:
+        for args in arguments:
+            pending.append(executor.submit(function, *args))
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        _discard(pending, cleanup)
+
+
+def _discard(futures: Iterable, cleanup: Optional[Callable]):
+    """
+    Cancel futures whose results will not be consumed, cleaning up after those that could
+    not be cancelled.
+    """
+    futures = [future for future in futures if not future.cancel()]
+
+    for future in futures:
+        try:
+            result = future.result()
+        except Exception:
+            continue
+
+        if cleanup is None:
+            continue
+
+        try:
+            cleanup(result)
+        except Exception as e:
+            logger.warning(f"Could not clean up after a discarded result: {e}")
+
+
+def _is_recorded(connection, parquet_table: Table, start_date, aggregation: str) -> bool:
+    return (
+        connection.execute(
+            select(parquet_table.c.id)
+            .where(
+                (parquet_table.c.start_date == start_date)
+                & (column("aggregation") == aggregation)
+            )
+            .limit(1)
+        ).first()
+        is not None
+    )
+
+
+def _insert_batch(connection, parquet_table: Table, batch: dict):
+    """
+    Record a batch in the parquet table, unless another run already did.
+    """
+    if _is_recorded(
+        connection, parquet_table, batch["start_date"], batch["aggregation"]
+    ):
+        logger.warning(
+            f"Period {batch['start_date']} - {batch['end_date']} is already recorded"
+        )
+        return
+
+    connection.execute(parquet_table.insert().values(**batch))
+    connection.commit()
+
+
+def _dataset_path(
+    parquetize_name: str, aggregation: str, start_date, end_date, keys: dict = None
+) -> str:
+    """
+    Get the path of a parquetize file. Files are laid out as a Hive-partitioned dataset
+    per component, by aggregation, year of the start of their period, and keys:
+    `{parquetize_name}/aggregation=1w/year=2024/lineId=71/{start}_to_{end}.parquet`.
+    The key columns are stored in the files as well, which Hive readers accept as long as
+    the partition schema gives them the same type (see _write_manifests).
+    """
+    parts = [parquetize_name, f"aggregation={aggregation}", f"year={start_date.year}"]
+    parts.extend(
+        f"{key}={quote(str(value), safe='')}" for key, value in (keys or {}).items()
+    )
+    parts.append(
+        f"{start_date.strftime(PARQUETIZE_DATE_FORMAT)}_to_"
+        f"{end_date.strftime(PARQUETIZE_DATE_FORMAT)}.parquet"
+    )
+
+    return "/".join(parts)
+
+
+def _write_manifests(
+    parquetize_name: str,
+    connection,
+    parquet_table: Table,
+    partitions: Optional[Set[Tuple[str, int]]] = None,
 ):
-    # Fetch data from the database within the specified date range
-    data_query = select(source.c.data, source.c.date).where(
-        source.c.date.between(period_start, period_end)
+    """
+    Write the manifests of the dataset of a component.
+
+    Each (aggregation, year) partition has a manifest listing its files with their period
+    and keys, `{parquetize_name}/aggregation=1w/year=2024/_manifest.json`, rewritten only
+    when its files change. The manifest at the root of the dataset,
+    `{parquetize_name}/_manifest.json`, lists the partitions and gives the types of the
+    partition columns, for instance to open the dataset with
+    pyarrow.dataset.partitioning(schema, flavor="hive") or Polars' hive_schema.
+    :param parquetize_name: The name of the parquetize table of the component
+    :param connection: The connection to the database
+    :param parquet_table: The parquetize table of the component
+    :param partitions: The (aggregation, year) partitions whose files changed, all of
+    them by default
+    """
+    year = extract("year", parquet_table.c.start_date)
+    all_partitions = {
+        (aggregation, int(partition_year))
+        for aggregation, partition_year in connection.execute(
+            select(parquet_table.c.aggregation, year).distinct()
+        )
+    }
+
+    for aggregation, partition_year in sorted(
+        all_partitions if partitions is None else partitions
+    ):
+        _write_partition_manifest(
+            parquetize_name, connection, parquet_table, aggregation, partition_year
+        )
+
+    partition_schema = {"aggregation": "string", "year": "int32"}
+
+    for (keys,) in connection.execute(select(parquet_table.c["keys"]).distinct()):
+        for key, value in (keys or {}).items():
+            partition_schema.setdefault(
+                key, "int64" if isinstance(value, int) else "string"
+            )
+
+    manifest = {
+        "partitioning": "hive",
+        "partition_schema": partition_schema,
+        "updated": datetime.now().isoformat(),
+        "partitions": [
+            {
+                "aggregation": aggregation,
+                "year": partition_year,
+                "manifest": f"aggregation={aggregation}/year={partition_year}/"
+                f"{DATASET_MANIFEST}",
+            }
+            for aggregation, partition_year in sorted(all_partitions)
+        ],
+    }
+
+    storage_manager.write(
+        f"{parquetize_name}/{DATASET_MANIFEST}", json.dumps(manifest).encode("utf8")
     )
-    data_rows = connection.execute(data_query).fetchall()
 
-    # Using ThreadPoolExecutor to parallelize fetching
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        # Submit fetch tasks to the executor
-        future_to_row = {executor.submit(fetch_data, row): row for row in data_rows}
 
-        # Collect the results as they complete
-        responses = [
-            future.result() for future in concurrent.futures.as_completed(future_to_row)
-        ]
+def _write_partition_manifest(
+    parquetize_name: str,
+    connection,
+    parquet_table: Table,
+    aggregation: str,
+    year: int,
+):
+    """
+    Write the manifest of the files of an (aggregation, year) partition of the dataset of
+    a component, see _write_manifests. A partition without files gets an empty manifest.
+    """
+    files = []
+
+    for url, start_date, end_date, keys, count, compressed_size in connection.execute(
+        select(
+            parquet_table.c.data,
+            parquet_table.c.start_date,
+            parquet_table.c.end_date,
+            parquet_table.c["keys"],
+            parquet_table.c.count,
+            parquet_table.c.compressed_size,
+        )
+        .where(
+            (parquet_table.c.aggregation == aggregation)
+            & (parquet_table.c.start_date >= datetime(year, 1, 1))
+            & (parquet_table.c.start_date < datetime(year + 1, 1, 1))
+        )
+        .order_by(parquet_table.c.start_date, parquet_table.c.id)
+    ):
+        keys = keys or {}
+
+        # Files written before the Hive layout are outside of the dataset directory,
+        # blob URLs are percent-encoded
+        path = None
+        if f"{parquetize_name}/aggregation=" in unquote(url):
+            path = _dataset_path(
+                parquetize_name, aggregation, start_date, end_date, keys
+            ).removeprefix(f"{parquetize_name}/")
+
+        files.append(
+            {
+                "path": path,
+                "url": url,
+                "aggregation": aggregation,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "keys": keys,
+                "count": count,
+                "compressed_size": compressed_size,
+            }
+        )
+
+    manifest = {
+        "aggregation": aggregation,
+        "year": year,
+        "updated": datetime.now().isoformat(),
+        "files": files,
+    }
 
-        datas = [(r.json(), date) for r, date in responses]
+    storage_manager.write(
+        f"{parquetize_name}/aggregation={aggregation}/year={year}/{DATASET_MANIFEST}",
+        json.dumps(manifest).encode("utf8"),
+    )
 
-    not_skipped = 0
-    validated_datas = []
-    validate_schema = component_config.parquetize.schema
 
-    for data, date in datas:
+def _group_dataset(contents: Iterable[bytes]) -> ds.Dataset:
+    """
+    Get a dataset over the files of the previous level of a group, to stream their rows.
+
+    Only the compressed files are held in memory. The dataset has the schema unifying
+    theirs: columns missing from some files are null and types are widened when they
+    differ.
+    :param contents: The files
+    """
+    parquet_format = ds.ParquetFileFormat()
+    fragments = [
+        parquet_format.make_fragment(pa.py_buffer(content)) for content in contents
+    ]
+    schema = pa.unify_schemas(
+        [fragment.physical_schema for fragment in fragments],
+        promote_options="permissive",
+    )
+
+    return ds.FileSystemDataset(fragments, schema, parquet_format)
+
+
+def _write_keyed_group_files(
+    dataset: ds.Dataset,
+    keys: List[str],
+    path: Callable[[dict], str],
+    parquetize_config: ComponentParquetizeConfig,
+) -> List[Tuple[dict, str, int, int]]:
+    """
+    Split the rows of a group by the values of its keys, streaming each partition to its
+    own file.
+
+    The rows of a partition are buffered until they fill a row group of the component, and
+    when the rows buffered for all the partitions reach PARQUETIZE_ROW_GROUP_BYTES, those of
+    the largest partition are written, so that memory is bounded by the compressed files.
+    The key columns stay in the files, as well as in their path (see _dataset_path).
+    :param dataset: The dataset of the group, see _group_dataset
+    :param keys: The keys of the group
+    :param path: The path of the file of a partition, from its keys
+    :param parquetize_config: The parquetize configuration of the component
+    :return: The keys, URL, number of rows and size of each file
+    """
+    group_files: Dict[tuple, Tuple[dict, _GroupFile]] = {}
+
+    for batch in dataset.to_batches():
+        partitions = (
+            polars.from_arrow(batch.select(keys))
+            .with_row_index("index")
+            .group_by(keys, maintain_order=True)
+            .agg(polars.col("index"))
+        )
+
+        for partition in partitions.iter_rows(named=True):
+            indices = partition.pop("index")
+            key_values = tuple(partition.values())
+
+            if key_values not in group_files:
+                group_files[key_values] = (
+                    partition,
+                    _GroupFile(dataset.schema, parquetize_config),
+                )
+
+            group_files[key_values][1].write(batch.take(indices))
+
+        pending = [group_file for _, group_file in group_files.values()]
+
+        if sum(group_file.pending_bytes for group_file in pending) >= (
+            PARQUETIZE_ROW_GROUP_BYTES
+        ):
+            max(pending, key=lambda group_file: group_file.pending_bytes).flush()
+
+    files = []
+
+    for partition, group_file in group_files.values():
+        url, compressed_size = group_file.upload(path(partition))
+        files.append((partition, url, group_file.rows, compressed_size))
+
+    return files
+
+
+class _GroupFile:
+    """
+    A group file being written, with the compression and row group size of the component.
+    Batches are buffered until they fill a row group.
+    """
+
+    def __init__(self, schema: pa.Schema, parquetize_config: ComponentParquetizeConfig):
+        self.output = BytesIO()
+        self.writer = pq.ParquetWriter(
+            self.output,
+            schema,
+            compression=parquetize_config.compression,
+            compression_level=parquetize_config.compression_level,
+            use_dictionary=True,
+        )
+        self.row_group_size = parquetize_config.row_group_size
+        self.pending = []
+        self.pending_rows = 0
+        self.pending_bytes = 0
+        self.rows = 0
+
+    def write(self, batch: pa.RecordBatch):
+        if batch.num_rows == 0:
+            return
+
+        self.pending.append(batch)
+        self.pending_rows += batch.num_rows
+        self.pending_bytes += batch.nbytes
+        self.rows += batch.num_rows
+
+        if self.pending_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(
+                pa.Table.from_batches(self.pending, schema=self.writer.schema),
+                row_group_size=self.row_group_size,
+            )
+            self.pending, self.pending_rows, self.pending_bytes = [], 0, 0
+
+    def upload(self, path: str) -> Tuple[str, int]:
+        """
+        Write the buffered batches, close the file and upload it.
+        :return: The URL of the file and its size
+        """
+        self.flush()
+        self.writer.close()
+
+        return (
+            storage_manager.write(path, self.output.getvalue()),
+            self.output.getbuffer().nbytes,
+        )
+
+
+def _period_snapshots(connection, source: Table, period_start, period_end) -> List:
+    """
+    Get the URLs and dates of the snapshots of a period, by ascending date.
+    """
+    return [
+        tuple(row)
+        for row in connection.execute(
+            select(source.c.data, source.c.date)
+            .where(source.c.date.between(period_start, period_end))
+            .where(source.c.data.isnot(None))
+            .order_by(source.c.date.asc())
+        )
+    ]
+
+
+def _iter_snapshots(rows: List):
+    """
+    Iterate over the snapshots of a period, as (content, date).
+
+    Snapshots are downloaded PARQUETIZE_PREFETCH at a time ahead of the one consumed, so
+    that only a few of them are held in memory whatever the length of the period.
+    """
+    contents = storage_manager.read_many((row[0] for row in rows), PARQUETIZE_PREFETCH)
+
+    return zip(contents, (row[1] for row in rows))
+
+
+def _compiled_schema(name: str, schema: dict) -> CompiledSchema:
+    compiled_schema = _COMPILED_SCHEMAS.get(name)
+
+    if compiled_schema is None:
+        compiled_schema = CompiledSchema(schema)
+        _COMPILED_SCHEMAS[name] = compiled_schema
+
+    return compiled_schema
+
+
+def _snapshot_batch(
+    compiled_schema: CompiledSchema, data: list, date
+) -> pa.RecordBatch:
+    """
+    Validate a snapshot and convert it to a RecordBatch, with lineId as a string and the
+    date of the snapshot as a column.
+    """
+    batch = compiled_schema.validate(data)
+
+    if batch is not None and "lineId" in batch.schema.names:
+        line_id = batch.column("lineId")
+
+        if pa.types.is_integer(line_id.type):
+            batch = batch.set_column(
+                batch.schema.get_field_index("lineId"),
+                "lineId",
+                line_id.cast(pa.string()),
+            )
+        elif not pa.types.is_string(line_id.type):
+            batch = None  # Converted like str() below
+
+    if batch is None:
+        batch = pa.RecordBatch.from_pylist(
+            [
+                {**item, "lineId": str(item["lineId"])} if "lineId" in item else item
+                for item in data
+            ]
+        )
+
+    return batch.append_column(
+        "date", pa.repeat(pa.scalar(date, pa.timestamp("us")), batch.num_rows)
+    )
+
+
+def _conform_batch(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Give a snapshot the schema of the file of its period: missing columns are null, extra
+    columns are dropped (like Table.from_pylist, which takes the keys of the first row)
+    and values are cast to the type of the column. The values of a column that cannot be
+    cast (an undeclared property whose type changed) are nulls, the rest of the snapshot
+    is kept.
+    """
+    columns = []
+
+    for field in schema:
+        if field.name not in batch.schema.names:
+            columns.append(pa.nulls(batch.num_rows, field.type))
+            continue
+
         try:
-            # Validate data once, without creating new structures for now
-            validate(data, validate_schema)
-            not_skipped += 1
-            # Use a list comprehension to handle transformation in one step
-            new_data = [{**item, "lineId": str(item["lineId"])} for item in data]
-            flattened = [{**item, "date": date} for item in new_data]
-            # Append the transformed data directly
-            validated_datas.extend(flattened)
-        except ValidationError as val:
-            logger.warning(f"Error validating data: {val}")
-
-    # Save the data to the parquet table
-    table = pa.Table.from_pylist(validated_datas)
+            columns.append(batch.column(field.name).cast(field.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.warning(f"Dropping the values of {field.name}: {e}")
+            columns.append(pa.nulls(batch.num_rows, field.type))
+
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _batch_schema(batch: pa.RecordBatch, compiled_schema: CompiledSchema) -> pa.Schema:
+    """
+    Get the schema of the file of a period from its first snapshot. Properties with a
+    declared type get the Arrow type of the declaration, and are all part of the schema,
+    so that the next snapshots fit it whatever the values of the first one; lineId stays a
+    string, see _snapshot_batch. The other columns keep the type of the first snapshot,
+    columns without any value in it are typed as strings as a null column could not hold
+    the values of the next snapshots.
+    """
+    types = {**compiled_schema.types}
+    if "lineId" in types:
+        types["lineId"] = pa.string()
+
+    fields = [
+        (
+            field.with_type(types.get(field.name, pa.string()))
+            if field.name in types or pa.types.is_null(field.type)
+            else field
+        )
+        for field in batch.schema
+        if field.name != "date"
+    ]
+    fields += [
+        pa.field(name, data_type)
+        for name, data_type in types.items()
+        if name not in batch.schema.names
+    ]
+
+    # The date of the snapshot stays the last column
+    return pa.schema(fields + [batch.schema.field("date")])
+
+
+def _generate_batch(
+    name: str,
+    parquetize_name: str,
+    parquetize_config: ComponentParquetizeConfig,
+    snapshots: List,
+    period_start,
+    period_end,
+) -> dict:
+    """
+    Write the snapshots of a period to a Parquet file. Runs in the process pool of
+    run_parquetize, the caller records the file in the parquet table.
+
+    Snapshots are downloaded, validated and converted to Arrow one at a time, and written
+    by row groups of at most PARQUETIZE_ROW_GROUP_SIZE rows or PARQUETIZE_ROW_GROUP_BYTES
+    bytes, which bounds the Arrow data buffered. The compressed file itself is built in
+    memory before being uploaded, so it still grows with the period.
+    :param name: The name of the component
+    :param parquetize_name: The name of the parquetize table of the component
+    :param parquetize_config: The parquetize configuration of the component
+    :param snapshots: The URLs and dates of the snapshots, see _period_snapshots
+    :param period_start: The start of the period
+    :param period_end: The end of the period
+    :return: The row of the parquet table
+    """
+    logger.info(f"Processing period {period_start} - {period_end} for batching")
+
+    compiled_schema = _compiled_schema(name, parquetize_config.schema)
+
     output = BytesIO()
-    pq.write_table(
-        table,
-        output,
-        compression="snappy",
-        use_dictionary=True,
-    )
+    writer = None
+    pending = []
+    pending_rows = 0
+    pending_bytes = 0
+
+    count = 0
+    not_skipped = 0
+    original_size = 0
+
+    try:
+        for content, date in _iter_snapshots(snapshots):
+            count += 1
+            original_size += len(content)
+
+            try:
+                data = json.loads(content)
+                batch = _snapshot_batch(compiled_schema, data, date)
+
+                if batch.num_rows == 0:
+                    not_skipped += 1
+                    continue
+
+                if writer is None:
+                    schema = _batch_schema(batch, compiled_schema)
+                    writer = pq.ParquetWriter(
+                        output, schema, compression="snappy", use_dictionary=True
+                    )
+
+                batch = _conform_batch(batch, writer.schema)
+            except ValidationError as val:
+                logger.warning(f"Error validating data: {val}")
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError) as e:
+                logger.warning(f"Error converting data of {date}: {e}")
+                continue
+
+            not_skipped += 1
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            pending_bytes += batch.nbytes
+
+            if (
+                pending_rows >= PARQUETIZE_ROW_GROUP_SIZE
+                or pending_bytes >= PARQUETIZE_ROW_GROUP_BYTES
+            ):
+                writer.write_table(pa.Table.from_batches(pending))
+                pending, pending_rows, pending_bytes = [], 0, 0
+
+        if writer is None:
+            # No valid snapshot in the period
+            pq.write_table(pa.table({}), output)
+        elif pending:
+            writer.write_table(pa.Table.from_batches(pending))
+    finally:
+        if writer is not None:
+            writer.close()
 
     url = storage_manager.write(
-        f"{component_config.parquetize_name}/{period_start.strftime('%Y-%m-%d_%H-%M-%S')}_to_{period_end.strftime('%Y-%m-%d_%H-%M-%S')}.parquet",
+        _dataset_path(
+            parquetize_name, parquetize_config.batch, period_start, period_end
+        ),
         output.getvalue(),
     )
 
-    original_size = sum([len(response.content) for response, _ in responses])
-    compressed_size = output.getbuffer().nbytes
-
-    connection.execute(
-        parquet_table.insert().values(
-            start_date=period_start,
-            end_date=period_end,
-            data=url,
-            count=not_skipped,
-            skipped=len(data_rows) - not_skipped,
-            schema=component_config.parquetize.schema,
-            aggregation=component_config.parquetize.batch,
-            original_size=original_size,
-            compressed_size=compressed_size,
-        )
+    return dict(
+        start_date=period_start,
+        end_date=period_end,
+        data=url,
+        count=not_skipped,
+        skipped=count - not_skipped,
+        schema=parquetize_config.schema,
+        aggregation=parquetize_config.batch,
+        original_size=original_size,
+        compressed_size=output.getbuffer().nbytes,
     )
-    connection.commit()
@@ -1,19 +1,127 @@
+import os
 from datetime import datetime, timedelta
+from typing import List, Optional
 from zoneinfo import ZoneInfo
 
+import geopandas as gpd
+import numpy as np
 import pandas as pd
 from geopandas import GeoDataFrame
+from shapely.geometry import shape
 from sqlalchemy import Table
 
-from src.data.retrieve import retrieve_between_datetime
+from src.components import HandlerRequestError
+from src.data.retrieve import (
+    iter_between_datetime,
+    retrieve_fingerprint_between_datetime,
+)
 
+# Longest time window, in seconds, the GeoJSON, MF-JSON and trajectories handlers answer
+# for, as they build their whole response in memory
+MAX_TIME_WINDOW = timedelta(
+    seconds=int(os.environ.get("HANDLER_MAX_TIME_WINDOW", 24 * 60 * 60))
+)
+# Most features (or trajectory points) these handlers read for a single response
+MAX_WINDOW_FEATURES = int(os.environ.get("HANDLER_MAX_WINDOW_FEATURES", 2_000_000))
 
-def fetch_geojson_simple(
-    table: Table,
-    start_timestamp: int = None,
-    end_timestamp: int = None,
-    columns_to_drop: list = None,
-):
+
+def check_time_window(start: datetime, end: datetime):
+    """
+    Refuse a time window longer than MAX_TIME_WINDOW with a 400.
+    :param start: The start of the window
+    :param end: The end of the window
+    """
+    if end - start > MAX_TIME_WINDOW:
+        raise HandlerRequestError(
+            f"The time window must not be longer than {MAX_TIME_WINDOW}", 400
+        )
+
+
+def check_feature_count(count: int, max_features: Optional[int]):
+    """
+    Refuse a response with more than max_features features with a 413.
+    :param count: The number of features read so far
+    :param max_features: The budget, None for no limit
+    """
+    if max_features is not None and count > max_features:
+        raise HandlerRequestError(
+            f"The time window holds more than {max_features} features, "
+            "request a shorter one",
+            413,
+        )
+
+
+class GeoJSONFramesBuilder:
+    """
+    Builds a single GeoDataFrame from many GeoJSON frames (feature collections taken at
+    different dates).
+
+    The features of every frame are appended to column lists, and the GeoDataFrame is
+    built once at the end, so the cost is linear in the total number of features. A
+    "datetimes" column holds the date of the frame each feature comes from.
+
+    Every feature is held until the frame is built, so handlers give a max_features
+    budget, past which adding a frame raises a HandlerRequestError (see
+    check_feature_count).
+    """
+
+    def __init__(self, max_features: int = None):
+        self._geometries = []
+        self._properties = []
+        self._dates = []
+        self._counts = []
+        self._max_features = max_features
+
+    def add(self, features: List[dict], date: datetime):
+        """
+        Add the features of a frame.
+        :param features: The GeoJSON features
+        :param date: The date of the frame
+        """
+        check_feature_count(len(self) + len(features), self._max_features)
+
+        for feature in features:
+            self._geometries.append(feature.get("geometry"))
+            self._properties.append(feature.get("properties") or {})
+
+        self._dates.append(date.strftime("%Y-%m-%dT%H:%M:%S.%fZ"))
+        self._counts.append(len(features))
+
+    def __len__(self):
+        return len(self._geometries)
+
+    def build(self) -> GeoDataFrame:
+        if not self._geometries:
+            return GeoDataFrame()
+
+        if all(
+            geometry is not None and geometry["type"] == "Point"
+            for geometry in self._geometries
+        ):
+            coordinates = np.array(
+                [geometry["coordinates"][:2] for geometry in self._geometries],
+                dtype=float,
+            )
+            geometries = gpd.points_from_xy(coordinates[:, 0], coordinates[:, 1])
+        else:
+            geometries = [
+                shape(geometry) if geometry else None for geometry in self._geometries
+            ]
+
+        properties = pd.DataFrame.from_records(self._properties)
+
+        # "geometry" first then the properties, like GeoDataFrame.from_features
+        gdf = GeoDataFrame(
+            properties.drop(columns=["geometry"], errors="ignore"),
+            geometry=geometries,
+        )
+        gdf = gdf[["geometry", *gdf.columns.drop("geometry")]]
+        gdf["datetimes"] = np.repeat(self._dates, self._counts)
+
+        return gdf
+
+
+def _time_window(start_timestamp: int = None, end_timestamp: int = None):
     local_tz = ZoneInfo("Europe/Brussels")
     now = datetime.now(local_tz)
 
@@ -28,16 +136,38 @@ def fetch_geojson_simple(
         else now
     )
 
-    datas = retrieve_between_datetime(table, start, end, limit=2000)
-    if not datas:
-        return {"features": [], "type": "FeatureCollection"}
+    return start, end
+
+
+def fingerprint_geojson_simple(
+    table: Table, start_timestamp: int = None, end_timestamp: int = None
+) -> str:
+    """
+    Fingerprint of the rows fetch_geojson_simple reads, see Handler.fingerprint.
+    """
+    return retrieve_fingerprint_between_datetime(
+        table, *_time_window(start_timestamp, end_timestamp)
+    )
+
 
-    df = GeoDataFrame()
+def fetch_geojson_simple(
+    table: Table,
+    start_timestamp: int = None,
+    end_timestamp: int = None,
+    columns_to_drop: list = None,
+):
+    start, end = _time_window(start_timestamp, end_timestamp)
+    check_time_window(start, end)
+
+    builder = GeoJSONFramesBuilder(MAX_WINDOW_FEATURES)
+
+    for item in iter_between_datetime(table, start, end):
+        builder.add(item.data["features"], item.date)
+
+    if len(builder) == 0:
+        return {"features": [], "type": "FeatureCollection"}
 
-    for item in datas:
-        gdf = GeoDataFrame.from_features(item.data["features"])
-        gdf["datetimes"] = item.date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        df = pd.concat([df, gdf])
+    df = builder.build()
 
     if columns_to_drop:
         df.drop(columns=columns_to_drop, inplace=True)
@@ -1,8 +1,13 @@
+import io
 import json
-import os
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from functools import lru_cache
-from tempfile import NamedTemporaryFile
+from pathlib import Path
+from typing import Callable, Dict, Hashable
 
 import geopandas as gpd
 import gtfs_kit as gk
@@ -10,29 +15,142 @@ import pandas as pd
 from google.transit import gtfs_realtime_pb2
 from pytz import timezone
 
+from src.data.retrieve import Data
+
+logger = logging.getLogger("GTFS")
+
+# Maximum estimated memory of the feeds kept by gtfs_feed_cache, in bytes
+GTFS_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Options gtfs_kit reads the files of a feed with
+_GTFS_CSV_OPTIONS = {
+    "na_values": ["", " ", "nan", "NaN", "null"],
+    "keep_default_na": True,
+    "dtype_backend": "numpy_nullable",
+    # Strips the byte order mark
+    "encoding": "utf-8-sig",
+}
+
 
-@lru_cache(maxsize=32)
 def load_gtfs_kit_from_zip_string(zip_bytes: bytes):
     """
-    Load GTFS feed from zip string
+    Load GTFS feed from zip string, without caching it (see load_gtfs_feed)
     @param zip_bytes: A zip file in bytes
     @return: GTFS feed
     """
-    print("Loading GTFS feed from zip string", hash(zip_bytes))
+    tables = {}
+
+    # Same as gtfs_kit.read_feed, reading the zip file from memory
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+        for file_info in zip_file.infolist():
+            table = Path(file_info.filename).stem
+
+            if (
+                file_info.is_dir()
+                or not file_info.file_size
+                or not file_info.filename.endswith(".txt")
+                or table not in gk.constants.DTYPES
+            ):
+                continue
+
+            with zip_file.open(file_info) as file:
+                frame = pd.read_csv(
+                    file, dtype=gk.constants.DTYPES[table], **_GTFS_CSV_OPTIONS
+                )
+
+            if not frame.empty:
+                tables[table] = gk.cleaners.clean_column_names(frame)
+
+    return gk.Feed(dist_units="km", **tables)
+
+
+def _feed_size(feed) -> int:
+    """
+    Estimate the memory taken by a GTFS feed, from the size of its tables.
+    """
+    return sum(
+        int(value.memory_usage(index=True, deep=True).sum())
+        for value in vars(feed).values()
+        if isinstance(value, pd.DataFrame)
+    )
+
+
+class GTFSFeedCache:
+    """
+    Cache of the GTFS feeds loaded from the storage, shared by the threads of a process.
+
+    Feeds are keyed by the hash of their zip file, so that rows storing the same feed share
+    it, and the least recently used ones are evicted once their estimated memory exceeds
+    max_bytes. Concurrent requests for the same feed wait for the first one to load it
+    instead of loading it again. Feeds are shared, they must not be modified.
+    """
+
+    def __init__(self, max_bytes: int = GTFS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._loading: Dict[Hashable, Future] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Callable[[], bytes]):
+        """
+        Get the feed for a key, loading it if it is not cached.
+        :param key: The cache key
+        :param load: Function returning the zip file of the feed
+        :return: The GTFS feed
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+            loading = self._loading.get(key)
 
-    tmp = NamedTemporaryFile(delete=False)
-    tmp.write(zip_bytes)
+            if loading is None:
+                future = self._loading[key] = Future()
 
-    # Close temporary file to allow GTFS kit to read it
-    tmp.close()
+        if loading is not None:
+            return loading.result()
 
-    # Load GTFS feed from temporary file
-    feed = gk.read_feed(tmp.name, dist_units="km")
+        try:
+            feed = load_gtfs_kit_from_zip_string(load())
+            size = _feed_size(feed)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(feed)
+        finally:
+            with self._lock:
+                del self._loading[key]
 
-    # Remove temporary file to avoid clutter
-    os.unlink(tmp.name)
+        logger.info(f"Loaded GTFS feed {key} ({size} bytes)")
 
-    return feed
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (feed, size)
+                self._size += size
+
+                while self._size > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._size -= evicted_size
+
+        return feed
+
+
+gtfs_feed_cache = GTFSFeedCache()
+
+
+def load_gtfs_feed(gtfs: Data):
+    """
+    Load the GTFS feed of a row through gtfs_feed_cache.
+    @param gtfs: The row of the feed
+    @return: GTFS feed, shared, must not be modified
+    """
+    # Rows written before their payload was hashed are keyed by their storage path
+    return gtfs_feed_cache.get(gtfs.hash or gtfs._url, lambda: gtfs.data)
 
 
 def load_gtfs_realtime_from_bytes_to_df(gtfs_realtime_bytes: bytes):
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping, Optional, Any
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("Http")
+
+# Seconds before a request (connect + read) is abandoned
+DEFAULT_TIMEOUT = 30
+# Number of retries on connection errors and retryable status codes
+DEFAULT_RETRIES = 3
+# Base delay of the exponential backoff between retries, in seconds
+DEFAULT_BACKOFF = 0.5
+# Maximum delay between two retries, in seconds
+MAX_BACKOFF = 30
+# Maximum number of simultaneous connections, in total and per host
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 8
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DEFAULT_TIMEOUT
+        return super().send(request, **kwargs)
+
+
+@lru_cache(maxsize=1)
+def http_session() -> requests.Session:
+    """
+    Get the keep-alive session shared by the synchronous code of the process.
+    Requests made through it have a default timeout and are retried with an
+    exponential backoff on connection errors and retryable status codes.
+    :return: The shared session
+    """
+    adapter = _TimeoutHTTPAdapter(
+        pool_connections=DEFAULT_LIMIT,
+        pool_maxsize=DEFAULT_LIMIT_PER_HOST,
+        max_retries=Retry(
+            total=DEFAULT_RETRIES,
+            backoff_factor=DEFAULT_BACKOFF,
+            backoff_max=MAX_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["HEAD", "GET"],
+            raise_on_status=False,
+        ),
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    # Case-insensitive, as the header names of the server
+    headers: Mapping[str, str]
+    content: bytes
+    url: str
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise ValueError(f"Request to {self.url} failed with status {self.status}")
+
+
+class AsyncHttpClient:
+    """
+    Keep-alive HTTP client shared by the async collectors of a process.
+
+    Connections are pooled with a limit per host, every request has a timeout, and
+    connection errors and retryable status codes are retried with an exponential backoff.
+    The client must be used as an async context manager.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+    ):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self._limit, limit_per_host=self._limit_per_host
+            ),
+            timeout=aiohttp.ClientTimeout(total=self._timeout),
+        )
+        return self
+
+    async def __aexit__(self, *args):
+        await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, url: str, **kwargs) -> HttpResponse:
+        """
+        Send a request, retrying it on connection errors and retryable status codes.
+        :param method: The HTTP method
+        :param url: The URL
+        :param kwargs: Extra arguments passed to aiohttp (headers, params, ...)
+        :return: The response, with its body fully read
+        """
+        attempt = 0
+
+        while True:
+            try:
+                async with self._session.request(method, url, **kwargs) as response:
+                    content = await response.read()
+
+                    if response.status in RETRY_STATUSES and attempt < self._retries:
+                        logger.warning(
+                            f"{method} {url} returned {response.status}, retrying"
+                        )
+                        await self._sleep(attempt, response.headers.get("Retry-After"))
+                        attempt += 1
+                        continue
+
+                    return HttpResponse(
+                        status=response.status,
+                        headers=response.headers,
+                        content=content,
+                        url=url,
+                    )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self._retries:
+                    raise
+                logger.warning(f"{method} {url} failed with {e!r}, retrying")
+                await self._sleep(attempt)
+                attempt += 1
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        response = await self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def _sleep(self, attempt: int, retry_after: str = None):
+        delay = self._backoff * 2**attempt
+
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+
+        await asyncio.sleep(min(delay, MAX_BACKOFF))
@@ -0,0 +1,149 @@
+from typing import Callable, Dict, Optional
+
+import pyarrow as pa
+from jsonschema.validators import validator_for
+
+# Arrow types inferred from the JSON values a "type" keyword accepts
+_ARROW_TYPE_CHECKS: Dict[str, Callable[[pa.DataType], bool]] = {
+    "string": pa.types.is_string,
+    "integer": pa.types.is_integer,
+    "number": lambda data_type: (
+        pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+    ),
+    "boolean": pa.types.is_boolean,
+}
+# Arrow types of the columns of the properties of a "type"
+_ARROW_TYPES: Dict[str, pa.DataType] = {
+    "string": pa.string(),
+    "integer": pa.int64(),
+    "number": pa.float64(),
+    "boolean": pa.bool_(),
+}
+# Keywords without effect on validation
+_ANNOTATIONS = {"$schema", "$id", "title", "description", "$comment", "examples"}
+
+
+class CompiledSchema:
+    """
+    A JSON schema of snapshots (an array of flat objects) compiled once, to validate and
+    convert snapshots to Arrow.
+
+    Snapshots are converted to a RecordBatch and validated by checking the types of its
+    columns, which replaces walking every item in Python. The check only accepts
+    snapshots that jsonschema would accept; when it cannot tell (a null value, a type the
+    conversion does not keep apart, or a schema using other keywords than "type", "items",
+    "properties" and "required"), the snapshot goes through a jsonschema validator created
+    once for the schema.
+
+    types gives the Arrow type of the properties declaring a single scalar "type", so that
+    the snapshots of a file can share a schema whatever the values of the first one.
+    """
+
+    def __init__(self, schema: dict):
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+
+        self.validator = validator_class(schema)
+        self.columns, self.required = _compile_columns(schema) or (None, None)
+        self.types = _declared_types(schema)
+
+    def validate(self, data) -> Optional[pa.RecordBatch]:
+        """
+        Validate a snapshot, raising a jsonschema ValidationError if it is invalid.
+        :param data: The snapshot
+        :return: The snapshot as a RecordBatch, or None if it was validated by jsonschema,
+        the caller then converts it
+        """
+        batch = self._validated_batch(data)
+
+        if batch is None:
+            self.validator.validate(data)
+
+        return batch
+
+    def _validated_batch(self, data) -> Optional[pa.RecordBatch]:
+        if self.columns is None or type(data) is not list:
+            return None
+
+        if not data:
+            return pa.RecordBatch.from_pylist([])
+
+        try:
+            items = pa.array(data)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            return None
+
+        # Every item must be an object
+        if not pa.types.is_struct(items.type) or items.null_count:
+            return None
+
+        batch = pa.RecordBatch.from_struct_array(items)
+
+        for name in self.required:
+            if name not in batch.schema.names or batch.column(name).null_count:
+                return None
+
+        for name, check in self.columns.items():
+            if name not in batch.schema.names:
+                continue
+
+            column = batch.column(name)
+
+            # A null is either a missing property or a null value, only the first is valid
+            if column.null_count or not check(column.type):
+                return None
+
+        return batch
+
+
+def _compile_columns(schema: dict):
+    """
+    Get the type check of each property of a schema of an array of objects.
+    :return: The checks by property and the required properties, or None if the schema
+    uses other keywords
+    """
+    if set(schema) - _ANNOTATIONS - {"type", "items"} or schema.get("type") != "array":
+        return None
+
+    items = schema.get("items", {})
+
+    if (
+        set(items) - _ANNOTATIONS - {"type", "properties", "required"}
+        or items.get("type") != "object"
+    ):
+        return None
+
+    columns = {}
+
+    for name, property_schema in items.get("properties", {}).items():
+        if set(property_schema) - _ANNOTATIONS - {"type"}:
+            return None
+
+        type_name = property_schema.get("type")
+        # A list of types is left to jsonschema
+        check = _ARROW_TYPE_CHECKS.get(type_name) if isinstance(type_name, str) else None
+
+        if check is None:
+            return None
+
+        columns[name] = check
+
+    return columns, list(items.get("required", []))
+
+
+def _declared_types(schema: dict) -> Dict[str, pa.DataType]:
+    """
+    Get the Arrow type of the properties of a schema of an array of objects.
+    """
+    items = schema.get("items") if schema.get("type") == "array" else None
+
+    if not isinstance(items, dict) or not isinstance(items.get("properties"), dict):
+        return {}
+
+    return {
+        name: _ARROW_TYPES[property_schema["type"]]
+        for name, property_schema in items["properties"].items()
+        if isinstance(property_schema, dict)
+        and isinstance(property_schema.get("type"), str)
+        and property_schema["type"] in _ARROW_TYPES
+    }
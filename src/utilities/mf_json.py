@@ -1,10 +1,20 @@
+import json
 from datetime import datetime
-from typing import Dict
-import pandas as pd
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
 from geopandas import GeoDataFrame
 from sqlalchemy import Table
 
-from src.data.retrieve import retrieve_between_datetime
+from src.data.retrieve import (
+    iter_between_datetime,
+    retrieve_fingerprint_between_datetime,
+)
+from src.utilities.geo_json import (
+    GeoJSONFramesBuilder,
+    MAX_WINDOW_FEATURES,
+    check_time_window,
+)
 
 
 def gdf_to_mf_json(
@@ -34,6 +44,55 @@ def gdf_to_mf_json(
     Returns:
         dict: The MF-JSON representation of the GeoDataFrame.
     """
+    return {
+        "type": "FeatureCollection",
+        "features": list(
+            iter_mf_json_features(
+                gdf,
+                traj_id_property,
+                datetime_column,
+                temporal_properties,
+                temporal_properties_static_fields,
+                interpolation,
+                crs,
+                trs,
+            )
+        ),
+    }
+
+
+def encode_mf_json(features: Iterable[dict]) -> bytes:
+    """
+    Encode a MF-JSON feature collection, encoding the features one at a time instead of
+    building the whole collection as Python objects first. The document itself is still
+    built in memory, as handler responses are compressed and cached whole.
+    :param features: The features, see iter_mf_json_features
+    :return: The JSON document
+    """
+    return (
+        '{"type": "FeatureCollection", "features": ['
+        + ", ".join(map(json.dumps, features))
+        + "]}"
+    ).encode("utf8")
+
+
+def iter_mf_json_features(
+    gdf: GeoDataFrame,
+    traj_id_property: str,
+    datetime_column: str,
+    temporal_properties: list = None,
+    temporal_properties_static_fields: Dict[str, Dict] = None,
+    interpolation: str = None,
+    crs=None,
+    trs=None,
+) -> Iterator[dict]:
+    """
+    Yield the MF-JSON features of a GeoDataFrame, one per trajectory, in the order of the
+    trajectory identifiers. See gdf_to_mf_json for the arguments.
+
+    The rows are sorted once by trajectory, and the coordinates, datetimes and temporal
+    properties of each trajectory are slices of whole columns, so no object is built per row.
+    """
 
     if not isinstance(gdf, GeoDataFrame):
         raise ValueError(
@@ -45,27 +104,53 @@ def gdf_to_mf_json(
     if not temporal_properties:
         temporal_properties = []
 
-    rows = []
+    # Rows without a trajectory identifier belong to no trajectory, as with groupby
+    gdf = gdf[gdf[traj_id_property].notna()]
+
+    if len(gdf) == 0:
+        return
+
+    # Stable, so that rows keep their order within a trajectory
+    gdf = gdf.sort_values(traj_id_property, kind="stable")
+
+    identifiers = gdf[traj_id_property].to_numpy()
+    boundaries = np.flatnonzero(identifiers[1:] != identifiers[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)).tolist()
+    ends = np.concatenate((boundaries, [len(identifiers)])).tolist()
 
-    for identifier, row in gdf.groupby(traj_id_property):
-        datetimes = row[datetime_column].tolist()
+    xs = gdf.geometry.x.tolist()
+    ys = gdf.geometry.y.tolist()
+    datetimes = gdf[datetime_column].tolist()
+    temporal_values = {prop: gdf[prop].tolist() for prop in temporal_properties}
+
+    # Static properties are taken from the first row of each trajectory
+    static_frame = gdf.iloc[starts].drop(
+        columns=[
+            "geometry",
+            datetime_column,
+            traj_id_property,
+            *temporal_properties,
+        ]
+    )
+    # to_dict gives no record at all for a frame without columns
+    static_properties = (
+        static_frame.to_dict(orient="records")
+        if len(static_frame.columns)
+        else [{}] * len(starts)
+    )
+    trajectory_identifiers = gdf[traj_id_property].iloc[starts].tolist()
+
+    for identifier, properties, start, end in zip(
+        trajectory_identifiers, static_properties, starts, ends
+    ):
+        trajectory_datetimes = datetimes[start:end]
         trajectory_data = {
             "type": "Feature",
-            "properties": {
-                traj_id_property: identifier,
-                **row.drop(
-                    columns=[
-                        "geometry",
-                        datetime_column,
-                        traj_id_property,
-                        *temporal_properties,
-                    ]
-                ).to_dict(orient="records")[0],
-            },
+            "properties": {traj_id_property: identifier, **properties},
             "temporalGeometry": {
                 "type": "MovingPoint",
-                "coordinates": list(zip(row.geometry.x, row.geometry.y)),
-                "datetimes": datetimes,
+                "coordinates": list(zip(xs[start:end], ys[start:end])),
+                "datetimes": trajectory_datetimes,
             },
         }
 
@@ -79,27 +164,29 @@ def gdf_to_mf_json(
             trajectory_data["trs"] = trs
 
         if temporal_properties:
-            temporal_properties_data = _encode_temporal_properties(
-                datetimes, row, temporal_properties, temporal_properties_static_fields
-            )
-
-            trajectory_data["temporalProperties"] = [temporal_properties_data]
+            trajectory_data["temporalProperties"] = [
+                _encode_temporal_properties(
+                    trajectory_datetimes,
+                    {
+                        prop: values[start:end]
+                        for prop, values in temporal_values.items()
+                    },
+                    temporal_properties_static_fields,
+                )
+            ]
 
-        # Appending each trajectory data to the list of rows
-        rows.append(trajectory_data)
-
-    return {"type": "FeatureCollection", "features": rows}
+        yield trajectory_data
 
 
 def _encode_temporal_properties(
-    datetimes, row, temporal_properties, temporal_properties_static_fields
+    datetimes, temporal_values, temporal_properties_static_fields
 ):
     temporal_properties_data = {
         "datetimes": datetimes,
     }
-    for prop in temporal_properties:
+    for prop, values in temporal_values.items():
         temporal_properties_data[prop] = {
-            "values": row[prop].tolist(),
+            "values": values,
         }
         if prop in (temporal_properties_static_fields or {}):
             temporal_properties_data[prop].update(
@@ -108,13 +195,7 @@ def _encode_temporal_properties(
     return temporal_properties_data
 
 
-def fetch_geojsons_and_return_mf_json(
-    table: Table,
-    id_column: str,
-    start_timestamp: int = None,
-    end_timestamp: int = None,
-    columns_to_drop: list = None,
-):
+def utc_time_window(start_timestamp: int = None, end_timestamp: int = None):
     if end_timestamp is None and start_timestamp is not None:
         end_timestamp = start_timestamp + 60 * 60
     elif start_timestamp is None and end_timestamp is not None:
@@ -123,28 +204,48 @@ def fetch_geojsons_and_return_mf_json(
         start_timestamp = datetime.utcnow().timestamp() - 60 * 60
         end_timestamp = datetime.utcnow().timestamp()
 
-    datas = retrieve_between_datetime(
-        table,
+    return (
         datetime.utcfromtimestamp(int(start_timestamp)),
         datetime.utcfromtimestamp(int(end_timestamp)),
-        limit=2000,
     )
 
-    if not datas:
-        return
 
-    df = GeoDataFrame()
+def fingerprint_geojsons(
+    table: Table, start_timestamp: int = None, end_timestamp: int = None
+) -> str:
+    """
+    Fingerprint of the rows fetch_geojsons_and_return_mf_json reads, see Handler.fingerprint.
+    """
+    return retrieve_fingerprint_between_datetime(
+        table, *utc_time_window(start_timestamp, end_timestamp)
+    )
+
+
+def fetch_geojsons_and_return_mf_json(
+    table: Table,
+    id_column: str,
+    start_timestamp: int = None,
+    end_timestamp: int = None,
+    columns_to_drop: list = None,
+):
+    start, end = utc_time_window(start_timestamp, end_timestamp)
+    check_time_window(start, end)
+
+    builder = GeoJSONFramesBuilder(MAX_WINDOW_FEATURES)
 
-    for item in datas:
-        gdf_for_one_time = GeoDataFrame.from_features(item.data["features"])
-        gdf_for_one_time["datetimes"] = item.date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        df = pd.concat([df, gdf_for_one_time])
+    for item in iter_between_datetime(table, start, end):
+        builder.add(item.data["features"], item.date)
+
+    if len(builder) == 0:
+        return
+
+    df = builder.build()
 
     if columns_to_drop:
         df.drop(columns=columns_to_drop, inplace=True)
 
     # Drop where only one row for id_column
-    df = df.groupby(id_column).filter(lambda x: len(x) > 1)
+    df = df[df.groupby(id_column)[id_column].transform("size") > 1]
     df = df.reset_index(drop=True)
 
     if len(df) == 0:
@@ -153,8 +254,7 @@ def fetch_geojsons_and_return_mf_json(
             "type": "FeatureCollection",
         }
 
-
-    return gdf_to_mf_json(df, id_column, "datetimes")
+    return encode_mf_json(iter_mf_json_features(df, id_column, "datetimes"))
 
 
 
@@ -0,0 +1,240 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Table
+
+from src.data.retrieve import (
+    Data,
+    iter_between_datetime,
+    retrieve_fingerprint_between_datetime,
+    retrieve_latest_row,
+)
+from src.utilities.geo_json import (
+    GeoJSONFramesBuilder,
+    MAX_WINDOW_FEATURES,
+    check_feature_count,
+    check_time_window,
+)
+from src.utilities.mf_json import (
+    utc_time_window,
+    iter_mf_json_features,
+    encode_mf_json,
+)
+
+# Period covered by a partition, must match the SOURCE_RANGE of the trajectories harvesters
+TRAJECTORY_PARTITION = timedelta(hours=1)
+# Rows per row group of a partition; rows are sorted by time so that row groups
+# outside of a queried window are skipped using their statistics
+TRAJECTORY_ROW_GROUP_SIZE = 16 * 1024
+
+TIMESTAMP_COLUMN = "timestamp"
+DATETIMES_COLUMN = "datetimes"
+DATETIMES_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def build_trajectory_partition(
+    frames: Iterable[Data], id_column: str, columns_to_drop: list = None
+) -> Optional[bytes]:
+    """
+    Build a trajectory partition from GeoJSON frames of vehicle positions.
+
+    The partition is a Parquet file with a row per position: the vehicle identifier, the
+    date of the frame (as a timestamp and as the MF-JSON datetime string), the x and y
+    coordinates and the other properties of the feature.
+    :param frames: The frames of the period, as retrieved from the source table
+    :param id_column: The property identifying a vehicle
+    :param columns_to_drop: Properties not to keep
+    :return: The Parquet file, or None if the frames have no position
+    """
+    table = _trajectory_table(frames, id_column, columns_to_drop)
+
+    if table is None:
+        return None
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(
+        table,
+        sink,
+        compression="zstd",
+        row_group_size=TRAJECTORY_ROW_GROUP_SIZE,
+        use_dictionary=[DATETIMES_COLUMN, id_column],
+    )
+
+    return sink.getvalue().to_pybytes()
+
+
+def _trajectory_table(
+    frames: Iterable[Data],
+    id_column: str,
+    columns_to_drop: list = None,
+    max_features: int = None,
+) -> Optional[pa.Table]:
+    builder = GeoJSONFramesBuilder(max_features)
+
+    for frame in frames:
+        builder.add(frame.data["features"], frame.date)
+
+    gdf = builder.build()
+
+    if len(gdf) == 0 or id_column not in gdf.columns:
+        return None
+
+    if columns_to_drop:
+        gdf = gdf.drop(columns=columns_to_drop, errors="ignore")
+
+    gdf = gdf[gdf[id_column].notna() & (gdf.geometry.geom_type == "Point")]
+
+    if len(gdf) == 0:
+        return None
+
+    properties = pd.DataFrame(gdf.drop(columns=["geometry", DATETIMES_COLUMN]))
+    properties[TIMESTAMP_COLUMN] = pd.to_datetime(
+        gdf[DATETIMES_COLUMN], format=DATETIMES_FORMAT
+    )
+    properties[DATETIMES_COLUMN] = gdf[DATETIMES_COLUMN]
+    properties["x"] = gdf.geometry.x
+    properties["y"] = gdf.geometry.y
+    properties = properties.sort_values(
+        [TIMESTAMP_COLUMN, id_column], kind="stable"
+    ).reset_index(drop=True)
+
+    return pa.Table.from_arrays(
+        [_arrow_column(properties[column]) for column in properties.columns],
+        names=list(properties.columns),
+    )
+
+
+def _arrow_column(series: pd.Series) -> pa.Array:
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Properties with mixed types are stored as strings
+        return pa.array(series.map(lambda value: None if value is None else str(value)))
+
+
+def _trajectory_windows(
+    partitions_table: Table, start: datetime, end: datetime
+) -> (datetime, datetime):
+    """
+    Split a time window between the partitions and the frames not harvested yet.
+    :return: The end of the window covered by partitions, and the start of the tail
+    """
+    latest = retrieve_latest_row(partitions_table, with_null=True)
+
+    if latest is None:
+        return start, start
+
+    return min(end, latest.date), max(start, latest.date)
+
+
+def fingerprint_trajectories(
+    partitions_table: Table,
+    frames_table: Table,
+    start_timestamp: int = None,
+    end_timestamp: int = None,
+) -> str:
+    """
+    Fingerprint of the partitions and frames fetch_trajectories_and_return_mf_json reads,
+    see Handler.fingerprint.
+    """
+    start, end = utc_time_window(start_timestamp, end_timestamp)
+    partitions_end, tail_start = _trajectory_windows(partitions_table, start, end)
+
+    return "|".join(
+        [
+            retrieve_fingerprint_between_datetime(
+                partitions_table, start, partitions_end + TRAJECTORY_PARTITION
+            ),
+            retrieve_fingerprint_between_datetime(frames_table, tail_start, end),
+        ]
+    )
+
+
+def fetch_trajectories_and_return_mf_json(
+    partitions_table: Table,
+    frames_table: Table,
+    id_column: str,
+    start_timestamp: int = None,
+    end_timestamp: int = None,
+    columns_to_drop: list = None,
+):
+    """
+    Return the trajectories of the vehicles in a time window as MF-JSON.
+
+    Trajectories are read from the partitions overlapping the window, only keeping the
+    row groups within it, and completed with the frames collected since the latest
+    partition.
+    :param partitions_table: The table of the trajectories harvester
+    :param frames_table: The table of the frames the harvester reads
+    :param id_column: The property identifying a vehicle
+    :param start_timestamp: Start of the window, defaults to an hour before its end
+    :param end_timestamp: End of the window, defaults to now
+    :param columns_to_drop: Properties of the frames not to return
+    :raise HandlerRequestError: If the window is longer than MAX_TIME_WINDOW, or holds
+        more than MAX_WINDOW_FEATURES positions
+    """
+    start, end = utc_time_window(start_timestamp, end_timestamp)
+    check_time_window(start, end)
+    partitions_end, tail_start = _trajectory_windows(partitions_table, start, end)
+
+    tables = []
+    rows = 0
+
+    if partitions_end > start:
+        # A partition is dated at the end of the period it covers
+        partitions = iter_between_datetime(
+            partitions_table, start, partitions_end + TRAJECTORY_PARTITION
+        )
+
+        for partition in partitions:
+            tables.append(
+                pq.read_table(
+                    pa.BufferReader(partition.data),
+                    filters=[
+                        (TIMESTAMP_COLUMN, ">", start),
+                        (TIMESTAMP_COLUMN, "<", end),
+                    ],
+                )
+            )
+            rows += tables[-1].num_rows
+            check_feature_count(rows, MAX_WINDOW_FEATURES)
+
+    if end > tail_start:
+        table = _trajectory_table(
+            iter_between_datetime(frames_table, tail_start, end),
+            id_column,
+            columns_to_drop,
+            MAX_WINDOW_FEATURES - rows,
+        )
+
+        if table is not None:
+            tables.append(table)
+
+    if not tables:
+        return
+
+    df = (
+        pa.concat_tables(tables, promote_options="permissive")
+        .to_pandas()
+        .drop(columns=[TIMESTAMP_COLUMN])
+    )
+
+    # Drop where only one row for id_column
+    df = df[df.groupby(id_column)[id_column].transform("size") > 1]
+
+    if len(df) == 0:
+        return {
+            "features": [],
+            "type": "FeatureCollection",
+        }
+
+    gdf = gpd.GeoDataFrame(
+        df.drop(columns=["x", "y"]),
+        geometry=gpd.points_from_xy(df["x"], df["y"]),
+    )
+
+    return encode_mf_json(iter_mf_json_features(gdf, id_column, DATETIMES_COLUMN))
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+
+# The engine and the storage manager are created from the environment on import, tests
+# run on a temporary SQLite database and file storage unless TEST_DATABASE_URL is set
+_directory = tempfile.mkdtemp(prefix="digital-twin-tests-")
+
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{_directory}/test.db"
+)
+os.environ["FILE_STORAGE_DIRECTORY"] = os.path.join(_directory, "storage")
+os.environ.pop("AZURE_STORAGE_CONNECTION_STRING", None)
+
+import pytest  # noqa: E402
+from sqlalchemy import MetaData  # noqa: E402
+
+from src.configuration.model import ComponentConfiguration  # noqa: E402
+from src.data.engine import engine  # noqa: E402
+from src.data.table import load_simple_table_from_configuration  # noqa: E402
+
+
+@pytest.fixture
+def create_simple_table(request):
+    """
+    Factory of fresh simple tables, dropped after the test.
+    """
+    metadata = MetaData()
+    # Short enough for the index names to stay within the 63 characters of PostgreSQL
+    prefix = f"test_{hashlib.md5(request.node.nodeid.encode()).hexdigest()[:8]}"
+
+    def create(name: str = "table"):
+        table = load_simple_table_from_configuration(f"{prefix}_{name}", metadata)
+        table.drop(engine, checkfirst=True)
+        table.create(engine)
+        return table
+
+    yield create
+
+    metadata.drop_all(engine)
+
+
+@pytest.fixture
+def simple_table(create_simple_table):
+    return create_simple_table()
+
+
+def make_configuration(
+    name: str = "test_component", **kwargs
+) -> ComponentConfiguration:
+    """
+    A component configuration with the defaults of load_all_components.
+    """
+    return ComponentConfiguration(
+        **{
+            "name": name,
+            "data_type": "json",
+            "data_format": "json",
+            "dependencies": [],
+            "dependencies_limit": [],
+            "component": None,
+            "schedule": None,
+            "source": None,
+            "source_range": None,
+            **kwargs,
+        }
+    )
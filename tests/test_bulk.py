@@ -0,0 +1,119 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import (
+    BOOLEAN,
+    INTEGER,
+    JSON,
+    TEXT,
+    TIMESTAMP,
+    Column,
+    MetaData,
+    Table,
+    select,
+)
+
+from conftest import make_configuration
+from src.data.bulk import _copy_value, bulk_insert, import_snapshots
+from src.data.engine import engine
+from src.data.storage import storage_manager
+
+postgresql = pytest.mark.skipif(
+    engine.dialect.name != "postgresql",
+    reason="COPY needs PostgreSQL, set TEST_DATABASE_URL",
+)
+
+
+@pytest.mark.parametrize(
+    "value, encoded",
+    [
+        ("plain", "plain"),
+        ("a\tb", "a\\tb"),
+        ("a\nb\r\n", "a\\nb\\r\\n"),
+        ("C:\\data", "C:\\\\data"),
+        # The text \N, not a NULL
+        ("\\N", "\\\\N"),
+        (None, "\\N"),
+        (True, "t"),
+        (False, "f"),
+        (42, "42"),
+        (datetime(2024, 1, 2, 3, 4, 5), "2024-01-02 03:04:05"),
+    ],
+)
+def test_copy_values(value, encoded):
+    assert _copy_value(value) == encoded
+
+
+def test_copy_json_payloads():
+    payload = {"name": "a\tb", "lines": ["x\ny"], "path": "C:\\data", "none": None}
+
+    encoded = _copy_value(payload)
+
+    assert "\t" not in encoded and "\n" not in encoded
+    # COPY unescapes the backslashes back to the JSON text
+    assert json.loads(encoded.replace("\\\\", "\\")) == payload
+
+
+def test_snapshots_are_imported_once(simple_table, tmp_path):
+    (tmp_path / "2024-01-01_00-00-00").write_bytes(b'{"value": 1}')
+    (tmp_path / "2024-01-01_00-01-00").write_bytes(b'{"value": 2}')
+    (tmp_path / "notes.txt").write_bytes(b"not a snapshot")
+
+    configuration = make_configuration(simple_table.name)
+
+    assert import_snapshots(configuration, simple_table, str(tmp_path), 1) == 2
+    assert import_snapshots(configuration, simple_table, str(tmp_path)) == 0
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(simple_table.c.date, simple_table.c.data).order_by(
+                simple_table.c.date
+            )
+        ).all()
+
+    assert [date for date, _ in rows] == [
+        datetime(2024, 1, 1, 0, 0),
+        datetime(2024, 1, 1, 0, 1),
+    ]
+    assert storage_manager.read(rows[1].data) == b'{"value": 2}'
+
+
+@postgresql
+def test_copy_round_trip():
+    metadata = MetaData()
+    table = Table(
+        "test_copy_round_trip",
+        metadata,
+        Column("id", INTEGER, primary_key=True),
+        Column("text", TEXT, nullable=True),
+        Column("payload", JSON, nullable=True),
+        Column("flag", BOOLEAN, nullable=True),
+        Column("date", TIMESTAMP, nullable=True),
+    )
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+
+    rows = [
+        {
+            "id": 1,
+            "text": "tab\there, newline\nthere, backslash \\ and \\N",
+            "payload": {"text": "a\tb\nc", "path": "C:\\data", "none": None},
+            "flag": True,
+            "date": datetime(2024, 1, 2, 3, 4, 5, 6),
+        },
+        {"id": 2, "text": None, "payload": None, "flag": None, "date": None},
+        {"id": 3, "text": "\\N", "payload": [1, "\\N"], "flag": False, "date": None},
+    ]
+
+    try:
+        with engine.connect() as connection:
+            bulk_insert(connection, table, rows)
+            connection.commit()
+
+        with engine.connect() as connection:
+            result = connection.execute(select(table).order_by(table.c.id)).mappings()
+
+            assert [dict(row) for row in result] == rows
+    finally:
+        table.drop(engine)
@@ -0,0 +1,60 @@
+from conftest import make_configuration
+from src.configuration.model import ComponentCacheConfig, ComponentConfiguration
+from src.runners._cache import normalize_query_parameters
+
+
+def _handler(bucket: str = None) -> ComponentConfiguration:
+    return make_configuration(
+        "test_handler",
+        query_parameters={"start_timestamp": "int", "end_timestamp": "int"},
+        cache=ComponentCacheConfig(ttl="1m", bucket=bucket) if bucket else None,
+    )
+
+
+def test_window_is_widened_to_the_bucket():
+    parameters, _ = normalize_query_parameters(
+        _handler("1m"), {"start_timestamp": 100, "end_timestamp": 110}
+    )
+
+    assert parameters == {"start_timestamp": 60, "end_timestamp": 120}
+
+
+def test_aligned_window_is_kept():
+    parameters, _ = normalize_query_parameters(
+        _handler("1m"), {"start_timestamp": 60, "end_timestamp": 180}
+    )
+
+    assert parameters == {"start_timestamp": 60, "end_timestamp": 180}
+
+
+def test_requests_in_the_same_bucket_share_a_key():
+    _, first = normalize_query_parameters(
+        _handler("1m"), {"start_timestamp": 61, "end_timestamp": 170}
+    )
+    _, second = normalize_query_parameters(
+        _handler("1m"), {"start_timestamp": 119, "end_timestamp": 121}
+    )
+    _, third = normalize_query_parameters(
+        _handler("1m"), {"start_timestamp": 121, "end_timestamp": 170}
+    )
+
+    assert first == second
+    assert first != third
+
+
+def test_missing_timestamp_keys_on_the_current_bucket():
+    _, key = normalize_query_parameters(_handler("1m"), {"start_timestamp": 60})
+
+    assert len(key) == 3
+
+
+def test_parameters_are_kept_without_cache():
+    parameters, key = normalize_query_parameters(
+        _handler(), {"start_timestamp": 101, "end_timestamp": 109}
+    )
+
+    assert parameters == {"start_timestamp": 101, "end_timestamp": 109}
+    assert key == (
+        "test_handler",
+        (("end_timestamp", 109), ("start_timestamp", 101)),
+    )
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from conftest import make_configuration
+from src.components import Handler, HandlerRequestError
+from src.runners.run_handler import HandlerApplication
+from src.utilities.geo_json import (
+    GeoJSONFramesBuilder,
+    MAX_TIME_WINDOW,
+    fetch_geojson_simple,
+)
+
+
+def _features(count: int) -> list:
+    return [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [index, index]},
+            "properties": {"id": index},
+        }
+        for index in range(count)
+    ]
+
+
+def test_frames_are_added_within_the_budget():
+    builder = GeoJSONFramesBuilder(max_features=4)
+
+    builder.add(_features(2), datetime(2024, 1, 1))
+    builder.add(_features(2), datetime(2024, 1, 1, 0, 1))
+
+    assert len(builder.build()) == 4
+
+
+def test_frames_past_the_budget_are_refused():
+    builder = GeoJSONFramesBuilder(max_features=4)
+    builder.add(_features(3), datetime(2024, 1, 1))
+
+    with pytest.raises(HandlerRequestError) as error:
+        builder.add(_features(2), datetime(2024, 1, 1, 0, 1))
+
+    assert error.value.status == 413
+
+
+def test_long_windows_are_refused(simple_table):
+    end = int(datetime(2024, 1, 2).timestamp())
+    start = end - int(MAX_TIME_WINDOW.total_seconds()) - 1
+
+    with pytest.raises(HandlerRequestError) as error:
+        fetch_geojson_simple(simple_table, start, end)
+
+    assert error.value.status == 400
+
+
+def test_request_errors_are_answered_with_their_status():
+    class RefusingHandler(Handler):
+        def run(self, **kwargs):
+            raise HandlerRequestError("Too much", 413)
+
+    application = HandlerApplication(
+        {
+            "refusing": make_configuration(
+                component=RefusingHandler, query_parameters={}
+            )
+        },
+        {},
+        ["127.0.0.1"],
+        workers=1,
+    )
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(
+        application(
+            {
+                "type": "http",
+                "client": ("127.0.0.1", 1234),
+                "method": "GET",
+                "path": "/refusing",
+                "query_string": b"",
+                "headers": [],
+            },
+            None,
+            send,
+        )
+    )
+
+    assert messages[0]["status"] == 413
+    assert b"".join(message.get("body", b"") for message in messages) == b"Too much"
@@ -0,0 +1,197 @@
+import io
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.components import HandlerRequestError
+from src.data.engine import engine
+from src.data.history import query_history, select_history_segments
+from src.data.storage import storage_manager
+from src.data.table import load_parquetize_table_from_configuration
+
+_START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def parquet_table(create_simple_table):
+    source = create_simple_table("source")
+    table = load_parquetize_table_from_configuration(
+        f"{source.name}_parquetize", source.metadata
+    )
+    table.create(engine)
+    return table
+
+
+def _record(parquet_table, aggregation, start, end, keys=None, data=None):
+    with engine.begin() as connection:
+        return connection.execute(
+            parquet_table.insert().values(
+                start_date=start,
+                end_date=end,
+                count=0,
+                skipped=0,
+                original_size=0,
+                compressed_size=0,
+                schema={},
+                aggregation=aggregation,
+                keys=keys,
+                data=data or f"{aggregation}/{start.isoformat()}/{keys}",
+            )
+        ).inserted_primary_key[0]
+
+
+def _hours(hours: float) -> datetime:
+    return _START + timedelta(hours=hours)
+
+
+def _summary(segments):
+    return [
+        (
+            segment.aggregation,
+            segment.start,
+            segment.end,
+            sorted(str(keys) for _, _, keys in segment.files),
+        )
+        for segment in segments
+    ]
+
+
+def test_the_coarsest_level_covering_the_window_is_read(parquet_table):
+    _record(parquet_table, "1d", _START, _hours(24))
+    for hour in range(24, 30):
+        _record(parquet_table, "1h", _hours(hour), _hours(hour + 1))
+    for line in ("1", "2"):
+        _record(parquet_table, "1w", _START, _hours(24 * 7), {"lineId": line})
+
+    segments = select_history_segments(parquet_table, _hours(20), _hours(26))
+
+    # The keyed level is only read where nothing else covers the window
+    assert _summary(segments) == [
+        ("1d", _hours(20), _hours(24), ["{}"]),
+        ("1h", _hours(24), _hours(25), ["{}"]),
+        ("1h", _hours(25), _hours(26), ["{}"]),
+    ]
+
+    segments = select_history_segments(parquet_table, _hours(29), _hours(31))
+
+    assert _summary(segments) == [
+        ("1h", _hours(29), _hours(30), ["{}"]),
+        ("1w", _hours(30), _hours(31), ["{'lineId': '1'}", "{'lineId': '2'}"]),
+    ]
+
+
+def test_keyed_levels_are_preferred_when_filtered_on(parquet_table):
+    _record(parquet_table, "1d", _START, _hours(24))
+    for line in ("1", "2", "3"):
+        _record(parquet_table, "1w", _START, _hours(24 * 7), {"lineId": line})
+
+    segments = select_history_segments(
+        parquet_table, _hours(2), _hours(4), {"lineId": ["1", "3"]}
+    )
+
+    assert _summary(segments) == [
+        ("1w", _hours(2), _hours(4), ["{'lineId': '1'}", "{'lineId': '3'}"]),
+    ]
+
+
+def test_gaps_are_skipped(parquet_table):
+    _record(parquet_table, "1h", _hours(0), _hours(1))
+    _record(parquet_table, "1h", _hours(3), _hours(4))
+
+    segments = select_history_segments(parquet_table, _START, _hours(5))
+
+    assert _summary(segments) == [
+        ("1h", _hours(0), _hours(1), ["{}"]),
+        ("1h", _hours(3), _hours(4), ["{}"]),
+    ]
+    assert select_history_segments(parquet_table, _hours(1), _hours(3)) == []
+
+
+def _write_file(name: str, hours: range, line_id: str) -> str:
+    output = io.BytesIO()
+    pq.write_table(
+        pa.table(
+            {
+                "lineId": [line_id] * len(hours),
+                "value": list(hours),
+                "date": [_hours(hour) for hour in hours],
+            }
+        ),
+        output,
+    )
+    return storage_manager.write(name, output.getvalue())
+
+
+@pytest.mark.parametrize("in_place", [True, False])
+def test_history_is_read_from_the_segments(parquet_table, monkeypatch, in_place):
+    for line in ("1", "2"):
+        _record(
+            parquet_table,
+            "1d",
+            _START,
+            _hours(24),
+            {"lineId": line},
+            _write_file(f"{parquet_table.name}/{line}.parquet", range(24), line),
+        )
+
+    if not in_place:
+        monkeypatch.setattr(storage_manager, "scan_source", lambda url: None)
+
+    table = query_history(
+        parquet_table,
+        _hours(2),
+        _hours(5),
+        {"lineId": ["2"]},
+        columns=["lineId", "value"],
+    )
+
+    assert table.to_pydict() == {"lineId": ["2"] * 3, "value": [2, 3, 4]}
+
+
+@pytest.mark.parametrize(
+    "filters, columns",
+    [({"unknown": ["1"]}, None), ({}, ["value", "unknown"])],
+)
+def test_unknown_columns_are_refused(parquet_table, filters, columns):
+    _record(
+        parquet_table,
+        "1d",
+        _START,
+        _hours(24),
+        data=_write_file(f"{parquet_table.name}/1.parquet", range(24), "1"),
+    )
+
+    with pytest.raises(HandlerRequestError) as error:
+        query_history(parquet_table, _hours(2), _hours(5), filters, columns)
+
+    assert error.value.status == 400
+    assert str(error.value) == "Unknown columns: unknown"
+
+
+def test_columns_of_newer_files_are_known(parquet_table):
+    _record(
+        parquet_table,
+        "1h",
+        _hours(0),
+        _hours(1),
+        data=_write_file(f"{parquet_table.name}/0.parquet", range(1), "1"),
+    )
+    output = io.BytesIO()
+    pq.write_table(
+        pa.table({"value": [1], "speed": [3.5], "date": [_hours(1)]}), output
+    )
+    _record(
+        parquet_table,
+        "1h",
+        _hours(1),
+        _hours(2),
+        data=storage_manager.write(
+            f"{parquet_table.name}/1.parquet", output.getvalue()
+        ),
+    )
+
+    table = query_history(parquet_table, _hours(0), _hours(2), columns=["speed"])
+
+    assert table.to_pydict() == {"speed": [None, 3.5]}
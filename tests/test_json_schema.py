@@ -0,0 +1,102 @@
+import pyarrow as pa
+import pytest
+from jsonschema import ValidationError
+from jsonschema.validators import validator_for
+
+from src.utilities.json_schema import CompiledSchema
+
+
+def _schema(properties: dict, required=(), **keywords) -> dict:
+    return {
+        **keywords,
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                name: {"type": type_name} for name, type_name in properties.items()
+            },
+            **({"required": list(required)} if required else {}),
+        },
+    }
+
+
+_INTEGER = _schema({"value": "integer", "name": "string"}, required=["name"])
+_NUMBER = _schema({"value": "number", "flag": "boolean"})
+_DRAFT_4 = _schema(
+    {"value": "integer"}, **{"$schema": "http://json-schema.org/draft-04/schema#"}
+)
+_OTHER_KEYWORDS = {
+    "type": "array",
+    "items": {"type": "object", "properties": {"value": {"minimum": 0}}},
+}
+
+_CASES = [
+    (_INTEGER, [{"value": 1, "name": "a"}, {"value": -2, "name": "b"}]),
+    (_INTEGER, [{"value": 1.5, "name": "a"}]),
+    (_INTEGER, [{"value": 1.0, "name": "a"}]),
+    (_INTEGER, [{"value": True, "name": "a"}]),
+    (_INTEGER, [{"value": 1, "name": "a"}, {"value": True, "name": "b"}]),
+    (_INTEGER, [{"value": "1", "name": "a"}]),
+    (_INTEGER, [{"value": 2**70, "name": "a"}]),
+    (_INTEGER, [{"name": "a"}, {"value": 1, "name": "b"}]),
+    (_INTEGER, [{"value": None, "name": "a"}, {"value": 1, "name": "b"}]),
+    (_INTEGER, [{"value": 1}]),
+    (_INTEGER, [{"value": 1, "name": None}]),
+    (_INTEGER, [{"value": 1, "name": "a", "extra": [1, 2]}]),
+    (_INTEGER, [{"value": 1, "name": {"nested": "a"}}]),
+    (_INTEGER, [{"value": 1, "name": "a"}, "item"]),
+    (_INTEGER, [{"value": 1, "name": "a"}, None]),
+    (_INTEGER, {"value": 1, "name": "a"}),
+    (_INTEGER, []),
+    (_NUMBER, [{"value": 1}, {"value": 2.5}, {"flag": False}]),
+    (_NUMBER, [{"value": "2.5"}]),
+    (_NUMBER, [{"flag": 0}]),
+    (_DRAFT_4, [{"value": 1.0}]),
+    (_DRAFT_4, [{"value": 3}]),
+    (_OTHER_KEYWORDS, [{"value": 1}]),
+    (_OTHER_KEYWORDS, [{"value": -1}]),
+]
+
+
+@pytest.mark.parametrize("schema, data", _CASES)
+def test_snapshots_are_validated_as_jsonschema_does(schema, data):
+    expected_valid = validator_for(schema)(schema).is_valid(data)
+    compiled_schema = CompiledSchema(schema)
+
+    if expected_valid:
+        batch = compiled_schema.validate(data)
+
+        if batch is not None:
+            assert batch.to_pylist() == pa.RecordBatch.from_pylist(data).to_pylist()
+    else:
+        with pytest.raises(ValidationError):
+            compiled_schema.validate(data)
+
+
+def test_checked_snapshots_are_converted_once():
+    batch = CompiledSchema(_INTEGER).validate([{"value": 1, "name": "a"}])
+
+    assert batch.schema.names == ["value", "name"]
+    assert pa.types.is_integer(batch.column("value").type)
+
+
+def test_declared_types():
+    schema = _schema(
+        {
+            "count": "integer",
+            "value": "number",
+            "name": "string",
+            "any": ["string", "null"],
+        }
+    )
+
+    assert CompiledSchema(schema).types == {
+        "count": pa.int64(),
+        "value": pa.float64(),
+        "name": pa.string(),
+    }
+
+
+def test_invalid_schemas_are_rejected():
+    with pytest.raises(Exception):
+        CompiledSchema({"type": "array", "items": {"type": "unknown"}})
@@ -0,0 +1,60 @@
+import json
+
+import geopandas as gpd
+
+from src.utilities.mf_json import encode_mf_json, gdf_to_mf_json, iter_mf_json_features
+
+
+def _trajectories(**columns) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {
+            "uuid": ["a", "b", "a", "b", "a"],
+            # As built by GeoJSONFramesBuilder
+            "datetimes": [f"2024-01-01T00:00:0{second}.000000Z" for second in range(5)],
+            "speed": [1.0, 2.0, 3.0, 4.0, 5.0],
+            **columns,
+        },
+        geometry=gpd.points_from_xy([0, 1, 2, 3, 4], [5, 6, 7, 8, 9]),
+    )
+
+
+def test_encoded_collection_matches_the_built_one():
+    gdf = _trajectories(line=["1", "2", "1", "2", "1"])
+
+    encoded = json.loads(
+        encode_mf_json(iter_mf_json_features(gdf, "uuid", "datetimes", ["speed"]))
+    )
+
+    assert encoded == json.loads(
+        json.dumps(gdf_to_mf_json(gdf, "uuid", "datetimes", ["speed"]))
+    )
+    assert len(encoded["features"]) == 2
+
+    feature = encoded["features"][0]
+
+    assert feature["properties"] == {"uuid": "a", "line": "1"}
+    assert feature["temporalGeometry"]["coordinates"] == [[0, 5], [2, 7], [4, 9]]
+    assert feature["temporalGeometry"]["datetimes"] == [
+        "2024-01-01T00:00:00.000000Z",
+        "2024-01-01T00:00:02.000000Z",
+        "2024-01-01T00:00:04.000000Z",
+    ]
+    assert feature["temporalProperties"][0]["speed"] == {"values": [1.0, 3.0, 5.0]}
+
+
+def test_trajectories_without_static_properties():
+    features = list(
+        iter_mf_json_features(_trajectories(), "uuid", "datetimes", ["speed"])
+    )
+
+    assert [feature["properties"] for feature in features] == [
+        {"uuid": "a"},
+        {"uuid": "b"},
+    ]
+
+
+def test_empty_collection():
+    assert json.loads(encode_mf_json([])) == {
+        "type": "FeatureCollection",
+        "features": [],
+    }
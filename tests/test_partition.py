@@ -0,0 +1,260 @@
+import hashlib
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import MetaData, func, select
+
+from src.configuration.model import ComponentPartitionConfig
+from conftest import make_configuration
+from src.data.engine import engine
+from src.data.partition import (
+    _attached_partitions,
+    _detached_partitions,
+    detach_parquetized_partitions,
+    drop_detached_partitions,
+    ensure_partitions,
+    partition_end,
+    partition_start,
+    partitioning_supported,
+)
+from src.data.storage import storage_manager
+from src.data.table import (
+    load_parquetize_table_from_configuration,
+    load_simple_table_from_configuration,
+)
+
+postgresql = pytest.mark.skipif(
+    not partitioning_supported(),
+    reason="Partitioning needs PostgreSQL, set TEST_DATABASE_URL",
+)
+
+
+def test_partition_bounds():
+    date = datetime(2024, 2, 14, 13, 30)
+
+    assert partition_start("day", date) == datetime(2024, 2, 14)
+    assert partition_start("week", date) == datetime(2024, 2, 12)
+    assert partition_start("month", date) == datetime(2024, 2, 1)
+    assert partition_end("day", datetime(2024, 2, 29)) == datetime(2024, 3, 1)
+    assert partition_end("week", datetime(2024, 2, 26)) == datetime(2024, 3, 4)
+    assert partition_end("month", datetime(2024, 12, 1)) == datetime(2025, 1, 1)
+
+    with pytest.raises(ValueError):
+        partition_start("year", date)
+
+
+@pytest.fixture
+def partitioned_tables(request):
+    metadata = MetaData()
+    prefix = f"test_{hashlib.md5(request.node.nodeid.encode()).hexdigest()[:8]}"
+    table = load_simple_table_from_configuration(
+        prefix, metadata, partition_by_date=True
+    )
+    parquet_table = load_parquetize_table_from_configuration(
+        f"{prefix}_parquetize", metadata
+    )
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    yield table, parquet_table
+
+    # Detached partitions first, they use the sequence of the table
+    with engine.begin() as connection:
+        for day in (1, 2, 3):
+            connection.exec_driver_sql(
+                f'DROP TABLE IF EXISTS "{table.name}_p2024010{day}"'
+            )
+
+    metadata.drop_all(engine)
+
+
+@postgresql
+def test_rows_go_to_their_partition(partitioned_tables):
+    table, _ = partitioned_tables
+    config = ComponentPartitionConfig(interval="day", premake=2)
+
+    ensure_partitions(table, config, now=datetime(2024, 1, 1, 12))
+    # Existing partitions are left untouched
+    ensure_partitions(table, config, now=datetime(2024, 1, 1, 12))
+
+    with engine.begin() as connection:
+        assert [start for _, start in _attached_partitions(connection, table)] == [
+            datetime(2024, 1, 1),
+            datetime(2024, 1, 2),
+            datetime(2024, 1, 3),
+        ]
+
+        connection.execute(
+            table.insert(),
+            [
+                {"date": datetime(2024, 1, 1, 10), "data": "a", "hash": "a"},
+                {"date": datetime(2024, 1, 3, 10), "data": "b", "hash": "b"},
+                {"date": datetime(2023, 6, 1), "data": "c", "hash": "c"},
+            ],
+        )
+
+        counts = {
+            name: connection.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+            for name in (
+                f"{table.name}_p20240101",
+                f"{table.name}_p20240103",
+                f"{table.name}_default",
+            )
+        }
+
+    assert list(counts.values()) == [1, 1, 1]
+
+
+@postgresql
+def test_parquetized_partitions_are_detached(partitioned_tables):
+    table, parquet_table = partitioned_tables
+    config = ComponentPartitionConfig(interval="day", premake=2)
+    ensure_partitions(table, config, now=datetime(2024, 1, 1))
+
+    with engine.begin() as connection:
+        connection.execute(
+            table.insert(),
+            [
+                {"date": datetime(2024, 1, day, 12), "data": str(day), "hash": "h"}
+                for day in (1, 2, 3)
+            ],
+        )
+        connection.execute(
+            parquet_table.insert().values(
+                start_date=datetime(2024, 1, 1),
+                end_date=datetime(2024, 1, 2, 12),
+                count=2,
+                skipped=0,
+                original_size=0,
+                compressed_size=0,
+                schema={},
+                aggregation="daily",
+            )
+        )
+
+    # Only the first day is parquetized as a whole
+    assert detach_parquetized_partitions(table, parquet_table, config) == [
+        f"{table.name}_p20240101"
+    ]
+
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(table)).scalar() == 2
+        assert [start for _, start in _attached_partitions(connection, table)] == [
+            datetime(2024, 1, 2),
+            datetime(2024, 1, 3),
+        ]
+
+
+def _count(connection, name: str) -> int:
+    return connection.exec_driver_sql(f'SELECT count(*) FROM "{name}"').scalar()
+
+
+def _parquetized_until(connection, parquet_table, end_date: datetime):
+    connection.execute(
+        parquet_table.insert().values(
+            start_date=datetime(2024, 1, 1),
+            end_date=end_date,
+            count=0,
+            skipped=0,
+            original_size=0,
+            compressed_size=0,
+            schema={},
+            aggregation="daily",
+        )
+    )
+
+
+@postgresql
+def test_default_rows_are_moved_to_new_partitions(partitioned_tables):
+    table, _ = partitioned_tables
+    config = ComponentPartitionConfig(interval="day", premake=0)
+
+    ensure_partitions(table, config, now=datetime(2024, 1, 1))
+
+    with engine.begin() as connection:
+        # Backfilled before the partitions of these days exist
+        connection.execute(
+            table.insert(),
+            [
+                {"date": datetime(2024, 1, 2, 10), "data": "a", "hash": "a"},
+                {"date": datetime(2024, 1, 3, 10), "data": "b", "hash": "b"},
+                {"date": datetime(2023, 6, 1), "data": "c", "hash": "c"},
+            ],
+        )
+
+    ensure_partitions(table, config, now=datetime(2024, 1, 2))
+    ensure_partitions(table, config, now=datetime(2024, 1, 3))
+
+    with engine.connect() as connection:
+        assert [
+            _count(connection, name)
+            for name, _ in _attached_partitions(connection, table)
+        ] == [0, 1, 1]
+        assert _count(connection, f"{table.name}_default") == 1
+        assert connection.execute(select(func.count()).select_from(table)).scalar() == 3
+
+
+@postgresql
+def test_detached_partitions_are_dropped_after_their_copies_took_over(
+    partitioned_tables,
+):
+    table, parquet_table = partitioned_tables
+    config = ComponentPartitionConfig(interval="day", premake=2)
+    ensure_partitions(table, config, now=datetime(2024, 1, 1))
+
+    copied, removed = (
+        storage_manager.write(f"{table.name}/{name}", name.encode())
+        for name in ("copied", "removed")
+    )
+
+    with engine.begin() as connection:
+        original_id, _ = connection.execute(
+            table.insert().returning(table.c.id),
+            [
+                {"date": datetime(2024, 1, 1, 10), "data": copied, "hash": "c"},
+                {"date": datetime(2024, 1, 1, 11), "data": removed, "hash": "r"},
+            ],
+        ).scalars()
+        connection.execute(
+            table.insert(),
+            [
+                {"date": datetime(2024, 1, 2, 10), "copy_id": original_id},
+                {"date": datetime(2024, 1, 2, 11), "copy_id": original_id},
+            ],
+        )
+        _parquetized_until(connection, parquet_table, datetime(2024, 1, 2, 12))
+
+    detach_parquetized_partitions(table, parquet_table, config)
+
+    with engine.connect() as connection:
+        assert _detached_partitions(connection, table) == [f"{table.name}_p20240101"]
+
+    assert drop_detached_partitions(make_configuration(table.name), table) == [
+        f"{table.name}_p20240101"
+    ]
+
+    with engine.connect() as connection:
+        assert _detached_partitions(connection, table) == []
+        heir, copy = connection.execute(
+            select(table.c.id, table.c.data, table.c.hash, table.c.copy_id).order_by(
+                table.c.date.desc()
+            )
+        ).all()
+
+    assert (heir.data, heir.hash, heir.copy_id) == (copied, "c", None)
+    assert (copy.data, copy.copy_id) == (None, heir.id)
+    assert storage_manager.read(copied) == b"copied"
+    # Archived without a retention policy
+    assert not os.path.exists(removed)
+
+
+def test_partitioning_is_a_no_op_without_postgresql(simple_table):
+    if partitioning_supported():
+        pytest.skip("Only without PostgreSQL")
+
+    config = ComponentPartitionConfig(interval="day", premake=2)
+    ensure_partitions(simple_table, config)
+
+    assert detach_parquetized_partitions(simple_table, simple_table, config) == []
+    assert drop_detached_partitions(make_configuration(), simple_table) == []
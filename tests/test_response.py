@@ -0,0 +1,28 @@
+import pytest
+
+from src.runners._response import TABLE_MEDIA_TYPES, negotiate_media_type
+
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+JSON = "application/json"
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (None, JSON),
+        ("", JSON),
+        ("*/*", JSON),
+        ("application/*", JSON),
+        ("text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8", JSON),
+        (ARROW, ARROW),
+        (f"{PARQUET}, */*;q=0.1", PARQUET),
+        # Named types are preferred to the wildcards of the same quality
+        (f"*/*, {ARROW}", ARROW),
+        (f"{ARROW};q=0.5, {JSON}", JSON),
+        (f"*/*, {JSON};q=0", ARROW),
+        ("text/csv", None),
+    ],
+)
+def test_table_media_types(accept, media_type):
+    assert negotiate_media_type(accept, TABLE_MEDIA_TYPES) == media_type
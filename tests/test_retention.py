@@ -0,0 +1,185 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from conftest import make_configuration
+from src.configuration.model import ComponentRetentionConfig
+from src.data.engine import engine
+from src.data.retention import (
+    ARCHIVE_MANIFEST_DIRECTORY,
+    apply_retention,
+    retention_cutoff,
+)
+from src.data.retrieve import (
+    retrieve_between_datetime,
+    retrieve_fingerprint_between_datetime,
+)
+from src.data.storage import storage_manager
+from src.data.table import load_parquetize_table_from_configuration
+from src.data.write import write_results
+
+_START = datetime(2024, 1, 1)
+
+
+def _configuration(table, mode="delete", batch=2):
+    return make_configuration(
+        table.name,
+        retention=ComponentRetentionConfig(keep="1d", mode=mode, batch=batch),
+    )
+
+
+def _write(configuration, table, hours):
+    write_results(
+        configuration,
+        table,
+        [({"hour": hour}, _START + timedelta(hours=hour)) for hour in hours],
+    )
+
+    with engine.connect() as connection:
+        return connection.execute(
+            select(table.c.id, table.c.data).order_by(table.c.date)
+        ).all()
+
+
+def _copy(table, original_id, hour):
+    with engine.begin() as connection:
+        connection.execute(
+            table.insert().values(
+                date=_START + timedelta(hours=hour), copy_id=original_id, type="json"
+            )
+        )
+
+
+def _retrieve(table):
+    return retrieve_between_datetime(
+        table, _START - timedelta(days=1), _START + timedelta(days=1), 100
+    )
+
+
+def test_old_rows_and_blobs_are_deleted(simple_table):
+    configuration = _configuration(simple_table)
+    rows = _write(configuration, simple_table, range(5))
+    size = sum(storage_manager.size(row.data) for row in rows[:3])
+
+    report = apply_retention(configuration, simple_table, _START + timedelta(hours=3))
+
+    assert (report.rows, report.bytes) == (3, size)
+    assert [data.date.hour for data in _retrieve(simple_table)] == [3, 4]
+    assert [os.path.exists(row.data) for row in rows] == [False] * 3 + [True] * 2
+
+
+def test_batches_are_limited_per_run(simple_table):
+    configuration = _configuration(simple_table)
+    _write(configuration, simple_table, range(5))
+
+    report = apply_retention(
+        configuration, simple_table, _START + timedelta(hours=5), max_batches=1
+    )
+
+    assert report.rows == 2
+    assert len(_retrieve(simple_table)) == 3
+
+
+def test_kept_copies_take_over_the_data_of_removed_rows(simple_table):
+    configuration = _configuration(simple_table)
+    original, _ = _write(configuration, simple_table, [0, 1])
+    for hour in (2, 3, 4):
+        _copy(simple_table, original.id, hour)
+
+    apply_retention(configuration, simple_table, _START + timedelta(minutes=30))
+
+    retrieved = _retrieve(simple_table)
+    assert [data.date.hour for data in retrieved] == [1, 2, 3, 4]
+    assert [data.data for data in retrieved[1:]] == [{"hour": 0}] * 3
+    assert os.path.exists(original.data)
+
+    with engine.connect() as connection:
+        heir, *copies = connection.execute(
+            select(simple_table.c.id, simple_table.c.data, simple_table.c.copy_id)
+            .where(simple_table.c.date >= _START + timedelta(hours=2))
+            .order_by(simple_table.c.date.desc())
+        ).all()
+
+    assert (heir.data, heir.copy_id) == (original.data, None)
+    assert [copy.copy_id for copy in copies] == [heir.id, heir.id]
+
+
+def test_archived_blobs_are_listed_in_a_manifest(simple_table):
+    configuration = _configuration(simple_table, mode="archive", batch=10)
+    rows = _write(configuration, simple_table, range(3))
+
+    apply_retention(configuration, simple_table, _START + timedelta(hours=2))
+
+    manifest_directory = os.path.join(
+        storage_manager.directory, simple_table.name, ARCHIVE_MANIFEST_DIRECTORY
+    )
+    (manifest_name,) = os.listdir(manifest_directory)
+    with open(os.path.join(manifest_directory, manifest_name)) as file:
+        manifest = json.load(file)
+
+    assert [entry["url"] for entry in manifest] == [row.data for row in rows[:2]]
+    assert [entry["date"] for entry in manifest] == [
+        _START.isoformat(),
+        (_START + timedelta(hours=1)).isoformat(),
+    ]
+    for row in rows[:2]:
+        assert not os.path.exists(row.data)
+        assert os.path.exists(
+            os.path.join(
+                storage_manager.directory,
+                "archive",
+                os.path.relpath(row.data, storage_manager.directory),
+            )
+        )
+
+
+def test_cutoff_follows_the_parquetized_rows(create_simple_table):
+    source = create_simple_table("source")
+    parquet_table = load_parquetize_table_from_configuration(
+        f"{source.name}_parquetize", source.metadata
+    )
+    parquet_table.create(engine)
+    keep = timedelta(days=1)
+
+    assert retention_cutoff(parquet_table, keep) is None
+
+    with engine.begin() as connection:
+        connection.execute(
+            parquet_table.insert().values(
+                start_date=_START,
+                end_date=_START + timedelta(days=3),
+                count=1,
+                skipped=0,
+                original_size=0,
+                compressed_size=0,
+                schema={},
+                aggregation="daily",
+            )
+        )
+
+    assert retention_cutoff(parquet_table, keep, now=_START + timedelta(days=5)) == (
+        _START + timedelta(days=2)
+    )
+    assert retention_cutoff(parquet_table, keep, now=_START + timedelta(days=2)) == (
+        _START + timedelta(days=1)
+    )
+
+
+def test_handing_over_changes_the_fingerprint_of_the_copies(simple_table):
+    configuration = _configuration(simple_table)
+    (original,) = _write(configuration, simple_table, [0])
+    for hour in (2, 3, 4):
+        _copy(simple_table, original.id, hour)
+
+    def fingerprint():
+        # Only the copies are in the window, they are the same rows before and after
+        return retrieve_fingerprint_between_datetime(
+            simple_table, _START + timedelta(hours=1), _START + timedelta(hours=5)
+        )
+
+    before = fingerprint()
+    apply_retention(configuration, simple_table, _START + timedelta(minutes=30))
+
+    assert fingerprint() != before
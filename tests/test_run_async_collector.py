@@ -0,0 +1,34 @@
+import asyncio
+
+from src.runners.run_async_collector import _stop_tasks
+
+
+def test_running_tasks_finish_before_stopping():
+    finished = []
+
+    async def collect(delay: float):
+        await asyncio.sleep(delay)
+        finished.append(delay)
+
+    async def main():
+        tasks = {asyncio.create_task(collect(delay)) for delay in (0.01, 0.05)}
+        await _stop_tasks(tasks, timeout=1)
+        return tasks
+
+    tasks = asyncio.run(main())
+
+    assert sorted(finished) == [0.01, 0.05]
+    assert all(task.done() for task in tasks)
+
+
+def test_tasks_are_cancelled_after_the_timeout():
+    async def main():
+        slow = asyncio.create_task(asyncio.sleep(60))
+        quick = asyncio.create_task(asyncio.sleep(0, result=1))
+        await _stop_tasks({slow, quick}, timeout=0.05)
+        return slow, quick
+
+    slow, quick = asyncio.run(main())
+
+    assert slow.cancelled()
+    assert quick.result() == 1
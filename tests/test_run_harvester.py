@@ -0,0 +1,121 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import make_configuration
+from src.components import Harvester
+from src.data.engine import engine
+from src.data.retrieve import retrieve_latest_row
+from src.data.write import write_result
+from src.runners.run_harvester import run_harvester, source_range_to_period_and_limit
+
+
+class _CountHarvester(Harvester):
+    def run(self, source):
+        return {"count": len(list(source)) if isinstance(source, list) else 1}
+
+
+class _PeriodHarvester(Harvester):
+    def run(self, source):
+        return {"dates": [item.date.isoformat() for item in source]}
+
+
+def test_periods_are_aligned():
+    latest = datetime(2024, 1, 1, 10, 17, 42, 5)
+
+    assert source_range_to_period_and_limit(latest, "1h") == (
+        datetime(2024, 1, 1, 10),
+        datetime(2024, 1, 1, 11),
+        None,
+    )
+    assert source_range_to_period_and_limit(latest, "15m") == (
+        datetime(2024, 1, 1, 10, 15),
+        datetime(2024, 1, 1, 10, 30),
+        None,
+    )
+    assert source_range_to_period_and_limit(latest, "30") == (latest, None, 30)
+
+
+def _harvester(source_table, harvester_table, component, source_range, **kwargs):
+    source = make_configuration(source_table.name)
+    harvester = make_configuration(
+        harvester_table.name,
+        component=component,
+        source=source,
+        source_range=source_range,
+        **kwargs,
+    )
+    tables = {source_table.name: source_table, harvester_table.name: harvester_table}
+    return harvester, source, tables
+
+
+def test_count_range_is_unchanged(create_simple_table):
+    source_table = create_simple_table("source")
+    harvester_table = create_simple_table("harvester")
+    harvester, source, tables = _harvester(
+        source_table, harvester_table, _CountHarvester, "2"
+    )
+
+    for minute in range(3):
+        write_result(
+            source, source_table, {"minute": minute}, datetime(2024, 1, 1, 0, minute)
+        )
+
+    assert run_harvester(harvester, tables)
+    latest = retrieve_latest_row(harvester_table)
+    assert latest.date == datetime(2024, 1, 1, 0, 1)
+    assert json.loads(latest.data) == {"count": 2}
+
+    # A single row left, strict ranges wait for a second one
+    assert not run_harvester(harvester, tables)
+
+
+def test_time_range_waits_for_the_end_of_the_period(create_simple_table):
+    source_table = create_simple_table("source")
+    harvester_table = create_simple_table("harvester")
+    harvester, source, tables = _harvester(
+        source_table, harvester_table, _PeriodHarvester, "1h"
+    )
+
+    write_result(source, source_table, {}, datetime(2024, 1, 1, 0, 10))
+    write_result(source, source_table, {}, datetime(2024, 1, 1, 0, 50))
+
+    # Nothing after the first hour yet
+    assert not run_harvester(harvester, tables)
+
+    write_result(source, source_table, {}, datetime(2024, 1, 1, 2, 5))
+
+    assert run_harvester(harvester, tables)
+    latest = retrieve_latest_row(harvester_table)
+    assert latest.date == datetime(2024, 1, 1, 1)
+    assert len(json.loads(latest.data)["dates"]) == 2
+
+
+def test_empty_period_is_recorded_without_data(create_simple_table):
+    source_table = create_simple_table("source")
+    harvester_table = create_simple_table("harvester")
+    harvester, source, tables = _harvester(
+        source_table, harvester_table, _PeriodHarvester, "1h"
+    )
+
+    write_result(source, source_table, {}, datetime(2024, 1, 1, 0, 10))
+    write_result(source, source_table, {}, datetime(2024, 1, 1, 2, 5))
+
+    assert run_harvester(harvester, tables)  # 00:00 - 01:00
+    assert run_harvester(harvester, tables)  # 01:00 - 02:00, empty
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(
+                harvester_table.c.date, harvester_table.c.data, harvester_table.c.hash
+            ).order_by(harvester_table.c.date)
+        ).all()
+
+    assert [row.date for row in rows] == [
+        datetime(2024, 1, 1, 1),
+        datetime(2024, 1, 1, 2),
+    ]
+    assert rows[1].data is None and rows[1].hash is None
+    # Rows without data are not returned as results
+    assert retrieve_latest_row(harvester_table).date == datetime(2024, 1, 1, 1)
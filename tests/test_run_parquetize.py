@@ -0,0 +1,399 @@
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from sqlalchemy import select
+
+from conftest import make_configuration
+from src.configuration.model import (
+    ComponentParquetizeConfig,
+    ComponentParquetizeGroupConfig,
+)
+from src.data.engine import engine
+from src.data.storage import storage_manager
+from src.data.table import load_parquetize_table_from_configuration
+from src.data.write import write_results
+from src.runners.run_parquetize import (
+    DATASET_MANIFEST,
+    _GroupFile,
+    _dataset_path,
+    _generate_batch,
+    _group_dataset,
+    _map_ordered,
+    _parquetize_executor,
+    _write_keyed_group_files,
+    run_parquetize,
+)
+
+# The package exports the run_parquetize function under the name of the module
+run_parquetize_module = sys.modules["src.runners.run_parquetize"]
+
+_START = datetime(2024, 1, 1)
+_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"lineId": {"type": "integer"}, "value": {"type": "number"}},
+        "required": ["lineId", "value"],
+    },
+}
+
+
+def _snapshots(name: str, count: int, items: int):
+    snapshots = []
+
+    for index in range(count):
+        date = _START + timedelta(seconds=20 * index)
+        data = [{"lineId": item, "value": index + item / 10} for item in range(items)]
+        url = storage_manager.write(
+            f"{name}/{date.isoformat()}", json.dumps(data).encode("utf-8")
+        )
+        snapshots.append((url, date))
+
+    return snapshots
+
+
+def test_batches_are_written_by_bounded_row_groups(monkeypatch):
+    monkeypatch.setattr(run_parquetize_module, "PARQUETIZE_ROW_GROUP_BYTES", 4096)
+    name = "test_parquetize_row_groups"
+    config = ComponentParquetizeConfig(batch="1h", groups=[], schema=_SCHEMA)
+    snapshots = _snapshots(name, 30, 100)
+    # An invalid snapshot is counted but skipped
+    snapshots.append(
+        (storage_manager.write(f"{name}/invalid", b'[{"lineId": "x"}]'), _START)
+    )
+
+    row = _generate_batch(
+        name,
+        f"{name}_parquetize",
+        config,
+        snapshots,
+        _START,
+        _START + timedelta(hours=1),
+    )
+    file = pq.ParquetFile(io.BytesIO(storage_manager.read(row["data"])))
+
+    assert file.metadata.num_rows == 3000
+    assert file.num_row_groups > 1
+    assert all(
+        file.metadata.row_group(index).total_byte_size < 3 * 4096
+        for index in range(file.num_row_groups)
+    )
+    assert file.schema_arrow.names == ["lineId", "value", "date"]
+    assert str(file.schema_arrow.field("lineId").type) == "string"
+
+
+def test_snapshots_of_a_period_share_the_declared_types():
+    name = "test_parquetize_declared_types"
+    config = ComponentParquetizeConfig(batch="1h", groups=[], schema=_SCHEMA)
+    snapshots = [
+        (
+            storage_manager.write(f"{name}/{index}", json.dumps(data).encode("utf-8")),
+            _START + timedelta(minutes=index),
+        )
+        for index, data in enumerate(
+            [
+                # Integer values first, and an undeclared property
+                [{"lineId": 1, "value": 1, "note": 1}],
+                [{"lineId": 2, "value": 2.5, "note": "late"}],
+                [{"lineId": 3, "value": 3.5}],
+            ]
+        )
+    ]
+
+    row = _generate_batch(
+        name,
+        f"{name}_parquetize",
+        config,
+        snapshots,
+        _START,
+        _START + timedelta(hours=1),
+    )
+    table = pq.read_table(io.BytesIO(storage_manager.read(row["data"])))
+
+    assert (row["count"], row["skipped"]) == (3, 0)
+    assert table.schema.field("value").type == pa.float64()
+    assert table.column("value").to_pylist() == [1.0, 2.5, 3.5]
+    assert table.column("lineId").to_pylist() == ["1", "2", "3"]
+    # The undeclared property keeps the type of the first snapshot
+    assert table.column("note").to_pylist() == [1, None, None]
+
+
+def test_results_are_yielded_in_order():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = _map_ordered(executor, 3, pow, ((2, n) for n in range(10)))
+
+        assert list(results) == [2**n for n in range(10)]
+
+
+def test_calls_ahead_of_a_failure_are_discarded():
+    started = []
+    cleaned = []
+    release = threading.Event()
+
+    def write(n):
+        started.append(n)
+
+        if n == 1:
+            release.wait(5)
+            raise OSError("upload failed")
+
+        return f"file-{n}"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = _map_ordered(
+            executor, 4, write, ((n,) for n in range(10)), cleanup=cleaned.append
+        )
+
+        assert next(results) == "file-0"
+        release.set()
+
+        with pytest.raises(OSError):
+            next(results)
+
+    # Only the calls submitted ahead ran, and their files are cleaned up
+    assert max(started) <= 4
+    assert sorted(cleaned) == [f"file-{n}" for n in started if n > 1]
+
+
+def test_closing_the_results_discards_the_calls_ahead():
+    cleaned = []
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results = _map_ordered(
+            executor, 3, str, ((n,) for n in range(10)), cleanup=cleaned.append
+        )
+        assert next(results) == "0"
+        results.close()
+
+    assert set(cleaned) <= {"1", "2", "3"}
+    assert all(int(result) <= 3 for result in cleaned)
+
+
+def test_the_process_pool_runs_the_calls():
+    start, end = _START, _START + timedelta(hours=1)
+
+    with _parquetize_executor(2) as executor:
+        results = list(
+            _map_ordered(executor, 4, _dataset_path, (("name", "1h", start, end),) * 3)
+        )
+
+    assert results == [_dataset_path("name", "1h", start, end)] * 3
+
+
+def _parquet_file(table: pa.Table) -> bytes:
+    output = io.BytesIO()
+    pq.write_table(table, output, row_group_size=2)
+    return output.getvalue()
+
+
+def test_group_files_are_streamed_under_a_unified_schema():
+    dataset = _group_dataset(
+        [
+            _parquet_file(pa.table({"value": pa.array([1, 2, 3], pa.int32())})),
+            _parquet_file(pa.table({"value": [1.5], "name": ["a"]})),
+            _parquet_file(pa.table({})),
+        ]
+    )
+    config = ComponentParquetizeConfig(
+        batch="1h", groups=[], schema=_SCHEMA, row_group_size=2
+    )
+    group_file = _GroupFile(dataset.schema, config)
+
+    for batch in dataset.to_batches():
+        group_file.write(batch)
+
+    url, size = group_file.upload("test_parquetize_group/group.parquet")
+    file = pq.ParquetFile(io.BytesIO(storage_manager.read(url)))
+
+    assert size == len(storage_manager.read(url))
+    assert file.read().to_pydict() == {
+        "value": [1.0, 2.0, 3.0, 1.5],
+        "name": [None, None, None, "a"],
+    }
+    assert [
+        file.metadata.row_group(index).num_rows for index in range(file.num_row_groups)
+    ] == [2, 2]
+
+
+def test_keyed_group_files_are_split_by_key(monkeypatch):
+    monkeypatch.setattr(run_parquetize_module, "PARQUETIZE_ROW_GROUP_BYTES", 1)
+    dataset = _group_dataset(
+        [
+            _parquet_file(
+                pa.table({"lineId": ["1", "2", "1", "3"], "value": [1, 2, 3, 4]})
+            ),
+            _parquet_file(pa.table({"lineId": ["2", "2"], "value": [5, 6]})),
+        ]
+    )
+    config = ComponentParquetizeConfig(batch="1h", groups=[], schema=_SCHEMA)
+
+    files = _write_keyed_group_files(
+        dataset,
+        ["lineId"],
+        lambda keys: f"test_parquetize_keyed/lineId={keys['lineId']}.parquet",
+        config,
+    )
+
+    assert [(keys, count) for keys, _, count, _ in files] == [
+        ({"lineId": "1"}, 2),
+        ({"lineId": "2"}, 3),
+        ({"lineId": "3"}, 1),
+    ]
+    assert [
+        pq.read_table(io.BytesIO(storage_manager.read(url))).to_pydict()
+        for _, url, _, _ in files
+    ] == [
+        {"lineId": ["1", "1"], "value": [1, 3]},
+        {"lineId": ["2", "2", "2"], "value": [2, 5, 6]},
+        {"lineId": ["3"], "value": [4]},
+    ]
+
+
+def _parquetized_component(create_simple_table):
+    source = create_simple_table("source")
+    parquet_table = load_parquetize_table_from_configuration(
+        f"{source.name}_parquetize", source.metadata
+    )
+    parquet_table.create(engine)
+    configuration = make_configuration(
+        source.name,
+        parquetize=ComponentParquetizeConfig(
+            batch="1h",
+            groups=[
+                ComponentParquetizeGroupConfig(group="6h"),
+                ComponentParquetizeGroupConfig(group="12h", keys=["lineId"]),
+            ],
+            schema=_SCHEMA,
+        ),
+    )
+    write_results(
+        configuration,
+        source,
+        [
+            (
+                [{"lineId": hour % 3, "value": hour}],
+                _START + timedelta(hours=hour, minutes=30),
+            )
+            for hour in range(30)
+        ],
+    )
+
+    run_parquetize(
+        configuration,
+        {source.name: source, configuration.parquetize_name: parquet_table},
+    )
+
+    return source, parquet_table, configuration
+
+
+def test_snapshots_are_batched_then_grouped(create_simple_table):
+    _, parquet_table, _ = _parquetized_component(create_simple_table)
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(
+                parquet_table.c.aggregation,
+                parquet_table.c.start_date,
+                parquet_table.c.count,
+                parquet_table.c["keys"],
+                parquet_table.c.data,
+            ).order_by(
+                parquet_table.c.aggregation,
+                parquet_table.c.start_date,
+                # The files of a group are recorded by key
+                parquet_table.c.id,
+            )
+        ).all()
+
+    keyed = [row for row in rows if row.aggregation == "12h"]
+    assert [row.keys for row in keyed[:3]] == [
+        {"lineId": str(line)} for line in range(3)
+    ]
+    # Each line has a value every 3 hours of the first 12 hours
+    assert [
+        pq.read_table(io.BytesIO(storage_manager.read(row.data)))
+        .column("value")
+        .to_pylist()
+        for row in keyed[:3]
+    ] == [[float(hour) for hour in range(line, 12, 3)] for line in range(3)]
+
+
+def test_dataset_paths_are_hive_partitions():
+    start = datetime(2023, 12, 25)
+    end = datetime(2024, 1, 1)
+
+    assert _dataset_path("name_parquetize", "1w", start, end) == (
+        "name_parquetize/aggregation=1w/year=2023/"
+        "2023-12-25_00-00-00_to_2024-01-01_00-00-00.parquet"
+    )
+    assert _dataset_path(
+        "name_parquetize", "1w", start, end, {"lineId": "7/a=b", "direction": 2}
+    ) == (
+        "name_parquetize/aggregation=1w/year=2023/lineId=7%2Fa%3Db/direction=2/"
+        "2023-12-25_00-00-00_to_2024-01-01_00-00-00.parquet"
+    )
+
+
+def test_manifests_list_the_partitions_and_their_files(create_simple_table):
+    source, parquet_table, configuration = _parquetized_component(create_simple_table)
+    root = os.path.join(storage_manager.directory, configuration.parquetize_name)
+
+    with open(os.path.join(root, DATASET_MANIFEST)) as file:
+        manifest = json.load(file)
+
+    assert manifest["partition_schema"] == {
+        "aggregation": "string",
+        "year": "int32",
+        "lineId": "string",
+    }
+    assert [
+        (partition["aggregation"], partition["year"])
+        for partition in manifest["partitions"]
+    ] == [("12h", 2024), ("1h", 2024), ("6h", 2024)]
+
+    with open(os.path.join(root, manifest["partitions"][0]["manifest"])) as file:
+        files = json.load(file)["files"]
+
+    assert files[0]["path"] == (
+        "aggregation=12h/year=2024/lineId=0/"
+        "2024-01-01_00-00-00_to_2024-01-01_12-00-00.parquet"
+    )
+    assert sum(file["count"] for file in files) == 24
+
+    # Hive readers accept the key columns kept in the files
+    dataset = ds.dataset(
+        os.path.join(root, "aggregation=12h"),
+        partitioning=ds.partitioning(
+            pa.schema([("year", pa.int32()), ("lineId", pa.string())]),
+            flavor="hive",
+        ),
+    )
+    assert dataset.to_table(filter=ds.field("lineId") == "1").num_rows == 8
+
+
+def test_only_the_changed_partition_manifests_are_rewritten(create_simple_table):
+    source, parquet_table, configuration = _parquetized_component(create_simple_table)
+    partition_manifest = os.path.join(
+        storage_manager.directory,
+        configuration.parquetize_name,
+        "aggregation=12h/year=2024",
+        DATASET_MANIFEST,
+    )
+    os.remove(partition_manifest)
+
+    run_parquetize(
+        configuration,
+        {source.name: source, configuration.parquetize_name: parquet_table},
+    )
+
+    assert not os.path.exists(partition_manifest)
@@ -0,0 +1,78 @@
+import pytest
+from azure.core.credentials import AzureSasCredential
+from azure.storage.blob import BlobServiceClient
+
+from src.data.storage import AzureBlobManager
+
+_ACCOUNT = (
+    "DefaultEndpointsProtocol=https;AccountName=account;EndpointSuffix=core.windows.net"
+)
+_URL = (
+    "https://account.blob.core.windows.net/container/"
+    "name_parquetize/aggregation%3D1d/file.parquet"
+)
+
+
+def _manager(blob_service_client: BlobServiceClient) -> AzureBlobManager:
+    manager = AzureBlobManager.__new__(AzureBlobManager)
+    manager.blob_service_client = blob_service_client
+    manager.container_client = blob_service_client.get_container_client("container")
+    return manager
+
+
+@pytest.mark.parametrize(
+    "connection_string, options",
+    [
+        (f"{_ACCOUNT};AccountKey=a2V5", {"account_key": "a2V5"}),
+        (
+            f"{_ACCOUNT};SharedAccessSignature=sv=2022-11-02&sig=a%2Bb",
+            {"sas_token": "sv=2022-11-02&sig=a%2Bb"},
+        ),
+    ],
+)
+def test_blobs_are_scanned_with_the_credential_of_the_client(
+    connection_string, options
+):
+    manager = AzureBlobManager(connection_string, "container")
+
+    assert manager.scan_source(_URL) == (
+        "az://container/name_parquetize/aggregation=1d/file.parquet",
+        {"account_name": "account", **options},
+    )
+
+
+def test_sas_credentials_are_passed_on():
+    manager = _manager(
+        BlobServiceClient(
+            "https://account.blob.core.windows.net",
+            credential=AzureSasCredential("sv=1&sig=x"),
+        )
+    )
+
+    assert manager.scan_source(_URL)[1] == {
+        "account_name": "account",
+        "sas_token": "sv=1&sig=x",
+    }
+
+
+class _TokenCredential:
+    def get_token(self, *scopes, **kwargs):
+        raise NotImplementedError
+
+
+@pytest.mark.parametrize(
+    "blob_service_client",
+    [
+        BlobServiceClient(
+            "https://account.blob.core.windows.net", credential=_TokenCredential()
+        ),
+        BlobServiceClient("https://account.blob.core.windows.net"),
+        BlobServiceClient.from_connection_string(
+            "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=a2V5;"
+            "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+        ),
+    ],
+    ids=["token", "anonymous", "emulator"],
+)
+def test_other_clients_fall_back_to_reading(blob_service_client):
+    assert _manager(blob_service_client).scan_source(_URL) is None
@@ -0,0 +1,109 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import src.data.write as write
+from conftest import make_configuration
+from src.data.engine import engine
+from src.data.storage import storage_manager
+from src.data.write import BufferedResultWriter, write_results
+
+_START = datetime(2024, 1, 1, 12)
+
+
+def _rows(table):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(table.c.date, table.c.data, table.c.hash, table.c.type).order_by(
+                table.c.date
+            )
+        ).all()
+
+
+def test_results_are_written_with_their_hash(simple_table):
+    configuration = make_configuration(simple_table.name)
+    results = [
+        ({"value": 1}, _START),
+        ("text", _START + timedelta(minutes=1)),
+        (None, _START + timedelta(minutes=2)),
+        (b"\x00bytes", _START + timedelta(minutes=3)),
+    ]
+
+    write_results(configuration, simple_table, results)
+    rows = _rows(simple_table)
+
+    assert [row.date for row in rows] == [date for _, date in results]
+    assert [row.type for row in rows] == ["json"] * 4
+
+    for row, payload in zip(rows, [b'{"value": 1}', b"text", None, b"\x00bytes"]):
+        if payload is None:
+            assert row.data is None and row.hash is None
+        else:
+            assert storage_manager.read(row.data) == payload
+            assert row.hash == hashlib.md5(payload).hexdigest()
+
+
+def test_no_results_write_nothing(simple_table):
+    write_results(make_configuration(simple_table.name), simple_table, [])
+
+    assert _rows(simple_table) == []
+
+
+def test_buffered_results_are_written_in_order_on_close(simple_table):
+    writer = BufferedResultWriter(
+        make_configuration(simple_table.name), simple_table, batch_size=3
+    )
+    dates = [_START + timedelta(minutes=minute) for minute in range(10)]
+
+    for minute, date in enumerate(dates):
+        writer.write({"minute": minute}, date)
+
+    writer.close()
+    rows = _rows(simple_table)
+
+    assert [row.date for row in rows] == dates
+    assert [json.loads(storage_manager.read(row.data)) for row in rows] == [
+        {"minute": minute} for minute in range(10)
+    ]
+
+
+def test_failed_batches_are_retried(simple_table, monkeypatch):
+    calls = []
+
+    def flaky(configuration, table, batch):
+        calls.append(len(batch))
+
+        if len(calls) == 1:
+            raise ConnectionError("database unavailable")
+
+        write_results(configuration, table, batch)
+
+    monkeypatch.setattr(write, "WRITE_BEHIND_BACKOFF", 0)
+    monkeypatch.setattr(write, "write_results", flaky)
+
+    writer = BufferedResultWriter(make_configuration(simple_table.name), simple_table)
+    writer.write({"value": 1}, _START)
+    writer.close()
+
+    assert calls == [1, 1]
+    assert [row.date for row in _rows(simple_table)] == [_START]
+
+
+def test_closing_gives_up_on_a_failing_batch(simple_table, monkeypatch):
+    calls = []
+
+    def failing(configuration, table, batch):
+        calls.append(len(batch))
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(write, "WRITE_BEHIND_BACKOFF", 0)
+    monkeypatch.setattr(write, "write_results", failing)
+
+    writer = BufferedResultWriter(make_configuration(simple_table.name), simple_table)
+    writer.write({"value": 1}, _START)
+    writer.close()
+
+    assert len(calls) == write.WRITE_BEHIND_CLOSE_ATTEMPTS
+    assert _rows(simple_table) == []